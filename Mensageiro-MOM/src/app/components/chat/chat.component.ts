@@ -1,7 +1,7 @@
 import { Component, type OnInit, type OnDestroy } from "@angular/core"
 import { CommonModule } from "@angular/common"
 import { FormsModule } from "@angular/forms"
-import { ChatService, type Message, type ChatRoom, type SendMessageRequest, type User, type RoomsResponse, type MessagesResponse } from "../../services/chat.service"
+import { ChatService, type Message, type ChatRoom, type SendMessageRequest, type User, type RoomsResponse, type MessagesResponse, type ChatSocketEvent } from "../../services/chat.service"
 import { FileService } from "../../services/file.service"
 import { KongStatusComponent } from "../kong-status/kong-status.component"
 import { FileManagerComponent } from "../file-manager/file-manager.component"
@@ -815,6 +815,10 @@ export class ChatComponent implements OnInit, OnDestroy {
 
   private subscription = new Subscription()
   private pollInterval = interval(2000)
+  private nextCursor: string | null = null
+  private socketSubscription: Subscription | null = null
+  private socketConnected = false
+  private reconnectTimer: ReturnType<typeof setTimeout> | null = null
 
   constructor(
     private chatService: ChatService,
@@ -830,6 +834,7 @@ export class ChatComponent implements OnInit, OnDestroy {
 
   ngOnDestroy(): void {
     this.subscription.unsubscribe()
+    this.disconnectSocket()
   }
 
   logout(): void {
@@ -851,7 +856,25 @@ export class ChatComponent implements OnInit, OnDestroy {
 
   selectRoom(room: ChatRoom): void {
     this.currentRoom = room
-    this.loadMessages(room.name)
+    this.disconnectSocket()
+    this.messages = []
+    this.nextCursor = null
+
+    if (!this.currentUser) {
+      this.loadMessages(room.name)
+      return
+    }
+
+    // Entrar na sala antes de carregar: só membros recebem notificações e o WebSocket
+    this.subscription.add(
+      this.chatService.joinRoom(room.id, this.currentUser.id).subscribe({
+        next: () => this.loadMessages(room.name),
+        error: (error) => {
+          console.error("Erro ao entrar na sala:", error)
+          this.loadMessages(room.name)
+        },
+      }),
+    )
   }
 
   loadMessages(roomName: string): void {
@@ -859,7 +882,13 @@ export class ChatComponent implements OnInit, OnDestroy {
       this.chatService.getMessages(roomName).subscribe({
         next: (response: MessagesResponse) => {
           this.messages = response.messages || []
+          this.nextCursor = response.next_cursor || null
           this.scrollToBottom()
+
+          // Abrir o WebSocket a partir da última mensagem carregada, sem lacunas
+          if (this.currentRoom?.name === roomName && !this.socketSubscription) {
+            this.connectSocket(roomName)
+          }
         },
         error: (error) => {
           console.error("Erro ao carregar mensagens:", error)
@@ -868,6 +897,99 @@ export class ChatComponent implements OnInit, OnDestroy {
     )
   }
 
+  loadNewMessages(roomName: string): void {
+    if (!this.nextCursor) {
+      this.loadMessages(roomName)
+      return
+    }
+
+    this.subscription.add(
+      this.chatService.getMessages(roomName, { after: this.nextCursor }).subscribe({
+        next: (response: MessagesResponse) => {
+          // Ignorar respostas de uma sala que já não está selecionada
+          if (this.currentRoom?.name !== roomName) return
+
+          this.appendMessages(response.messages || [])
+          this.nextCursor = response.next_cursor || this.nextCursor
+          if (response.has_more) {
+            this.loadNewMessages(roomName)
+          }
+        },
+        error: (error) => {
+          console.error("Erro ao carregar novas mensagens:", error)
+        },
+      }),
+    )
+  }
+
+  connectSocket(roomName: string): void {
+    this.disconnectSocket()
+
+    // A rota WebSocket aceita apenas nomes \w+; demais salas continuam no polling
+    if (!/^\w+$/.test(roomName) || !this.currentUser) return
+
+    const lastId = this.messages.length ? this.messages[this.messages.length - 1].id : null
+    this.socketSubscription = this.chatService.connectRoom(roomName, this.currentUser.id, lastId).subscribe({
+      next: (event: ChatSocketEvent) => this.handleSocketEvent(roomName, event),
+      error: () => this.scheduleReconnect(roomName),
+      complete: () => this.scheduleReconnect(roomName),
+    })
+  }
+
+  disconnectSocket(): void {
+    if (this.reconnectTimer) {
+      clearTimeout(this.reconnectTimer)
+      this.reconnectTimer = null
+    }
+    this.socketSubscription?.unsubscribe()
+    this.socketSubscription = null
+    this.socketConnected = false
+  }
+
+  private handleSocketEvent(roomName: string, event: ChatSocketEvent): void {
+    switch (event.type) {
+      case "open":
+        this.socketConnected = true
+        break
+      case "message":
+        this.appendMessages(event.message ? [event.message] : [])
+        this.nextCursor = event.cursor || this.nextCursor
+        break
+      case "history":
+        this.appendMessages(event.messages || [])
+        this.nextCursor = event.next_cursor || this.nextCursor
+        if (event.has_more) {
+          this.loadNewMessages(roomName)
+        }
+        break
+      case "resume_failed":
+        this.loadMessages(roomName)
+        break
+    }
+  }
+
+  private scheduleReconnect(roomName: string): void {
+    this.socketConnected = false
+    this.socketSubscription = null
+    if (this.currentRoom?.name !== roomName || this.reconnectTimer) return
+
+    this.reconnectTimer = setTimeout(() => {
+      this.reconnectTimer = null
+      if (this.currentRoom?.name === roomName) {
+        this.connectSocket(roomName)
+      }
+    }, 3000)
+  }
+
+  private appendMessages(messages: Message[]): void {
+    const known = new Set(this.messages.map((m) => m.id))
+    const fresh = messages.filter((m) => !known.has(m.id))
+    if (fresh.length) {
+      this.messages = [...this.messages, ...fresh]
+      this.scrollToBottom()
+    }
+  }
+
   createRoom(): void {
     if (!this.newRoomName.trim()) return
 
@@ -899,7 +1021,9 @@ export class ChatComponent implements OnInit, OnDestroy {
       this.chatService.sendMessage(request).subscribe({
         next: (response) => {
           this.newMessage = ""
-          this.loadMessages(this.currentRoom!.name)
+          if (!this.socketConnected) {
+            this.loadNewMessages(this.currentRoom!.name)
+          }
         },
         error: (error) => {
           console.error("Erro ao enviar mensagem:", error)
@@ -935,8 +1059,9 @@ export class ChatComponent implements OnInit, OnDestroy {
   startPolling(): void {
     this.subscription.add(
       this.pollInterval.subscribe(() => {
-        if (this.currentRoom) {
-          this.loadMessages(this.currentRoom.name)
+        // Com o WebSocket aberto as mensagens chegam por push
+        if (this.currentRoom && !this.socketConnected) {
+          this.loadNewMessages(this.currentRoom.name)
         }
         this.checkConnection()
       }),
@@ -1,5 +1,5 @@
 import { Injectable } from '@angular/core';
-import { HttpClient } from '@angular/common/http';
+import { HttpClient, HttpParams } from '@angular/common/http';
 import { Observable, BehaviorSubject } from 'rxjs';
 
 export interface User {
@@ -28,6 +28,7 @@ export interface ChatRoom {
   created_at: string;
   updated_at: string;
   message_count: number;
+  last_message_at?: string | null;
 }
 
 export interface SendMessageRequest {
@@ -45,9 +46,28 @@ export interface RoomsResponse {
 export interface MessagesResponse {
   messages: Message[];
   room?: string;
+  count?: number;
+  has_more?: boolean;
+  next_cursor?: string | null;
+  prev_cursor?: string | null;
   _links?: any;
 }
 
+export interface MessagesQuery {
+  after?: string | null;
+  before?: string | null;
+  limit?: number;
+}
+
+export interface ChatSocketEvent {
+  type: 'open' | 'message' | 'history' | 'resume_failed';
+  message?: Message;
+  messages?: Message[];
+  cursor?: string;
+  next_cursor?: string | null;
+  has_more?: boolean;
+}
+
 export interface LoginRequest {
   username: string;
   password: string;
@@ -65,6 +85,7 @@ export interface RegisterRequest {
 })
 export class ChatService {
   private apiUrl = 'http://localhost:8000';
+  private wsUrl = 'ws://localhost:8000';
   private messagesSubject = new BehaviorSubject<Message[]>([]);
   public messages$ = this.messagesSubject.asObservable();
 
@@ -104,8 +125,31 @@ export class ChatService {
     return this.http.get<RoomsResponse>(`${this.apiUrl}/api/rooms/`);
   }
 
-  getMessages(roomName: string): Observable<MessagesResponse> {
-    return this.http.get<MessagesResponse>(`${this.apiUrl}/api/messages/${roomName}/`);
+  getMessages(roomName: string, query: MessagesQuery = {}): Observable<MessagesResponse> {
+    let params = new HttpParams();
+    if (query.after) params = params.set('after', query.after);
+    if (query.before) params = params.set('before', query.before);
+    if (query.limit) params = params.set('limit', query.limit);
+    return this.http.get<MessagesResponse>(`${this.apiUrl}/api/messages/${roomName}/`, { params });
+  }
+
+  joinRoom(roomId: string, userId: string): Observable<any> {
+    return this.http.post(`${this.apiUrl}/api/rooms/${roomId}/join/`, { user_id: userId });
+  }
+
+  connectRoom(roomName: string, userId: string, lastId?: string | null): Observable<ChatSocketEvent> {
+    return new Observable<ChatSocketEvent>((observer) => {
+      let query = `?user_id=${encodeURIComponent(userId)}`;
+      if (lastId) query += `&last_id=${encodeURIComponent(lastId)}`;
+      const socket = new WebSocket(`${this.wsUrl}/ws/chat/${roomName}/${query}`);
+
+      socket.onopen = () => observer.next({ type: 'open' });
+      socket.onmessage = (event) => observer.next(JSON.parse(event.data));
+      socket.onerror = (error) => observer.error(error);
+      socket.onclose = () => observer.complete();
+
+      return () => socket.close();
+    });
   }
 
   sendMessage(request: SendMessageRequest): Observable<any> {
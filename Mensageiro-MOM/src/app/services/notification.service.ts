@@ -19,6 +19,9 @@ export interface Notification {
 
 export interface NotificationResponse {
   notifications: Notification[]
+  count?: number
+  has_more?: boolean
+  next_cursor?: string | null
   _links: any
 }
 
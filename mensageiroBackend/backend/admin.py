@@ -1,5 +1,5 @@
 from django.contrib import admin
-from .models import ChatRoom, Message, RabbitMQConnection, User
+from .models import ArchivedMessage, ChatRoom, Message, RabbitMQConnection, StoredFile, User
 
 @admin.register(User)
 class UserAdmin(admin.ModelAdmin):
@@ -10,13 +10,9 @@ class UserAdmin(admin.ModelAdmin):
 
 @admin.register(ChatRoom)
 class ChatRoomAdmin(admin.ModelAdmin):
-    list_display = ['name', 'created_at', 'updated_at', 'message_count']
+    list_display = ['name', 'created_at', 'updated_at', 'message_count', 'last_message_at']
     search_fields = ['name']
-    readonly_fields = ['id', 'created_at', 'updated_at']
-
-    def message_count(self, obj):
-        return obj.messages.count()
-    message_count.short_description = 'Mensagens'
+    readonly_fields = ['id', 'created_at', 'updated_at', 'message_count', 'last_message_at']
 
 @admin.register(Message)
 class MessageAdmin(admin.ModelAdmin):
@@ -37,6 +33,22 @@ class MessageAdmin(admin.ModelAdmin):
         return obj.content[:50] + '...' if len(obj.content) > 50 else obj.content
     content_preview.short_description = 'Conteúdo'
 
+@admin.register(ArchivedMessage)
+class ArchivedMessageAdmin(admin.ModelAdmin):
+    list_display = ['sender', 'room', 'timestamp', 'message_type', 'archived_at']
+    list_filter = ['message_type', 'room']
+    search_fields = ['content', 'sender__username', 'room__name']
+    readonly_fields = ['id', 'room', 'sender', 'content', 'timestamp', 'message_type', 'archived_at']
+    list_select_related = ['room', 'sender']
+
+@admin.register(StoredFile)
+class StoredFileAdmin(admin.ModelAdmin):
+    list_display = ['filename', 'room', 'uploader', 'size', 'created_at']
+    list_filter = ['created_at', 'room']
+    search_fields = ['filename', 'sha256']
+    readonly_fields = ['id', 'size', 'sha256', 'path', 'created_at']
+    list_select_related = ['room', 'uploader']
+
 @admin.register(RabbitMQConnection)
 class RabbitMQConnectionAdmin(admin.ModelAdmin):
     list_display = ['host', 'port', 'username', 'virtual_host', 'created_at']
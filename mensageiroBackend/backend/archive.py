@@ -0,0 +1,87 @@
+"""
+Camadas quente e fria das mensagens.
+
+As mensagens com mais de MESSAGE_HOT_DAYS dias saem da tabela messages
+para messages_archive (comando archive_messages), em lotes das mais
+antigas para as mais novas: toda mensagem arquivada de uma sala é
+anterior às que ficaram na tabela quente. A paginação por cursor lê as
+duas camadas como uma única sequência e só consulta o arquivo quando a
+página passa do início da janela quente.
+"""
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import transaction
+from django.utils import timezone
+
+from .models import ArchivedMessage, Message
+from .pagination import keyset_page
+from .signals import delete_without_signals
+
+
+def hot_cutoff():
+    return timezone.now() - timedelta(days=settings.MESSAGE_HOT_DAYS)
+
+
+def archive_messages(older_than=None, batch_size=None):
+    """Move para o arquivo as mensagens anteriores a older_than; retorna quantas"""
+    older_than = older_than or hot_cutoff()
+    batch_size = batch_size or settings.MESSAGE_ARCHIVE_BATCH_SIZE
+    moved = 0
+
+    while True:
+        with transaction.atomic():
+            batch = list(
+                Message.objects.filter(timestamp__lt=older_than).order_by('timestamp', 'id')[:batch_size]
+            )
+            if not batch:
+                return moved
+
+            ArchivedMessage.objects.bulk_create([
+                ArchivedMessage(
+                    id=message.id, room_id=message.room_id, sender_id=message.sender_id,
+                    content=message.content, timestamp=message.timestamp,
+                    message_type=message.message_type
+                )
+                for message in batch
+            ])
+            # Sem post_delete: as mensagens arquivadas continuam em ChatRoom.message_count
+            delete_without_signals(Message, 'id', [message.id for message in batch])
+        moved += len(batch)
+
+
+def find_message(message_id, **filters):
+    """Mensagem pelo id em qualquer camada; None se não existir"""
+    for model in (Message, ArchivedMessage):
+        message = model.objects.select_related('room', 'sender').filter(id=message_id, **filters).first()
+        if message is not None:
+            return message
+    return None
+
+
+def message_page(room_id, limit, after=None, before=None):
+    """
+    keyset_page sobre as mensagens da sala nas duas camadas: retorna
+    (mensagens em ordem crescente, has_more).
+    """
+    hot = Message.objects.filter(room_id=room_id).select_related('room', 'sender')
+    cold = ArchivedMessage.objects.filter(room_id=room_id).select_related('room', 'sender')
+
+    if after is not None:
+        # Polling a partir de uma mensagem da janela quente não chega ao arquivo
+        oldest = hot.order_by('timestamp', 'id').values_list('timestamp', 'id').first()
+        if oldest is not None and tuple(after) >= oldest:
+            return keyset_page(hot, 'timestamp', limit, after=after, before=before)
+
+        rows, has_more = keyset_page(cold, 'timestamp', limit, after=after, before=before)
+        if has_more:
+            return rows, True
+        newer, has_more = keyset_page(hot, 'timestamp', limit - len(rows), after=after, before=before)
+        return rows + newer, has_more
+
+    rows, has_more = keyset_page(hot, 'timestamp', limit, before=before)
+    if has_more:
+        return rows, True
+    # A página chegou ao início da janela quente: continua pelo arquivo
+    older, has_more = keyset_page(cold, 'timestamp', limit - len(rows), before=before)
+    return older + rows, has_more
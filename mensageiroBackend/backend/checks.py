@@ -0,0 +1,33 @@
+import re
+
+import redis
+from django.conf import settings
+from django.core.checks import Error, Tags, register
+
+REDIS_CACHE_BACKEND = 'django.core.cache.backends.redis.RedisCache'
+
+
+@register(Tags.caches)
+def check_shared_cache(app_configs, **kwargs):
+    """
+    O cache padrão é o Redis compartilhado (CACHE_REDIS_URL): sem ele cada
+    send_message e cada conexão WebSocket falharia. Avisa ao iniciar o
+    runserver (e demais comandos com verificações) em vez de na requisição.
+    """
+    errors = []
+    for alias, config in settings.CACHES.items():
+        if config['BACKEND'] != REDIS_CACHE_BACKEND:
+            continue
+        locations = config['LOCATION']
+        # Como o RedisCache: lista ou string separada por vírgula/ponto e vírgula
+        for url in re.split('[;,]', locations) if isinstance(locations, str) else locations:
+            try:
+                redis.Redis.from_url(url, socket_connect_timeout=1).ping()
+            except redis.RedisError as e:
+                errors.append(Error(
+                    f"Cache '{alias}' inacessível em {url}: {e}",
+                    hint='Inicie o redis-server ou, com um único processo, defina CACHE_REDIS_URL= '
+                         '(vazio) para usar memória local.',
+                    id='backend.E001',
+                ))
+    return errors
@@ -1,17 +1,35 @@
 import json
+import uuid
+from urllib.parse import parse_qs
+from channels.db import database_sync_to_async
 from channels.generic.websocket import AsyncWebsocketConsumer
-from .rabbitmq_service import rabbitmq_service
+from django.core.exceptions import ValidationError
+from .archive import find_message, message_page
+from .membership import is_member
+from .models import ChatRoom
+from .pagination import MAX_PAGE_SIZE, encode_cursor
+from .realtime import message_payload, room_group_name
 
 
 class ChatConsumer(AsyncWebsocketConsumer):
     """Consumer WebSocket para chat em tempo real"""
-    
+
     async def connect(self):
-        """Conecta ao WebSocket"""
+        """Conecta ao WebSocket (ws/chat/<sala>/?user_id=<id>[&last_id=<id>])"""
         self.room_name = self.scope['url_route']['kwargs']['room_name']
-        self.room_group_name = f'chat_{self.room_name}'
+        self.room_group_name = room_group_name(self.room_name)
+        query = parse_qs(self.scope.get('query_string', b'').decode())
+
+        # Apenas membros da sala entram no grupo que recebe as mensagens
+        try:
+            self.user_id = str(uuid.UUID(query.get('user_id', [''])[0]))
+        except ValueError:
+            self.user_id = None
+        if not self.user_id or not await self.is_room_member(self.user_id):
+            await self.close(code=4403)
+            return
 
-        # Junta-se ao grupo da sala
+        # Junta-se ao grupo da sala antes de ler o histórico para não perder mensagens
         await self.channel_layer.group_add(
             self.room_group_name,
             self.channel_name
@@ -19,6 +37,11 @@ class ChatConsumer(AsyncWebsocketConsumer):
 
         await self.accept()
 
+        # Reconexão: last_id é o id da última mensagem vista
+        last_id = query.get('last_id', [None])[0]
+        if last_id:
+            await self.resume(last_id)
+
     async def disconnect(self, close_code):
         """Desconecta do WebSocket"""
         # Sai do grupo da sala
@@ -30,6 +53,11 @@ class ChatConsumer(AsyncWebsocketConsumer):
     async def receive(self, text_data):
         """Recebe mensagem do WebSocket"""
         text_data_json = json.loads(text_data)
+
+        if text_data_json.get('type') == 'resume':
+            await self.resume(text_data_json.get('last_id'))
+            return
+
         message = text_data_json['message']
         sender = text_data_json['sender']
 
@@ -52,4 +80,52 @@ class ChatConsumer(AsyncWebsocketConsumer):
         await self.send(text_data=json.dumps({
             'message': message,
             'sender': sender
-        })) 
\ No newline at end of file
+        }))
+
+    async def message_created(self, event):
+        """Envia ao WebSocket uma mensagem persistida pela API"""
+        await self.send(text_data=json.dumps({
+            'type': 'message',
+            'message': event['message'],
+            'cursor': event['cursor']
+        }))
+
+    async def member_left(self, event):
+        """Usuário saiu da sala (leave_room): deixa de receber as mensagens dela"""
+        if event['user_id'] == self.user_id:
+            await self.channel_layer.group_discard(self.room_group_name, self.channel_name)
+            await self.close(code=4403)
+
+    async def resume(self, last_id):
+        """Reenvia as mensagens da sala posteriores a last_id"""
+        history = await self.get_history(last_id)
+        if history is None:
+            # Mensagem desconhecida: o cliente deve recarregar via REST
+            await self.send(text_data=json.dumps({'type': 'resume_failed'}))
+            return
+
+        await self.send(text_data=json.dumps({'type': 'history', **history}))
+
+    @database_sync_to_async
+    def is_room_member(self, user_id):
+        room_id = ChatRoom.objects.filter(name=self.room_name).values_list('id', flat=True).first()
+        return room_id is not None and is_member(room_id, user_id)
+
+    @database_sync_to_async
+    def get_history(self, last_id):
+        try:
+            # A última mensagem vista pode já estar no arquivo
+            last = find_message(last_id, room__name=self.room_name)
+        except (ValidationError, ValueError):
+            return None
+        if last is None:
+            return None
+
+        messages, has_more = message_page(last.room_id, MAX_PAGE_SIZE, after=(last.timestamp, last.id))
+        newest = messages[-1] if messages else last
+
+        return {
+            'messages': [message_payload(message) for message in messages],
+            'has_more': has_more,
+            'next_cursor': encode_cursor(newest.timestamp, newest.id)
+        }
@@ -0,0 +1,108 @@
+import os
+import re
+
+from django.http import FileResponse, HttpResponse, StreamingHttpResponse
+from django.utils.http import content_disposition_header, http_date, parse_etags
+
+# Tamanho dos blocos lidos do disco em respostas parciais
+CHUNK_SIZE = 64 * 1024
+
+RANGE_RE = re.compile(r'^bytes=(\d*)-(\d*)$')
+
+
+def file_etag(stat):
+    """ETag forte a partir de tamanho e mtime (muda quando o arquivo é regravado)"""
+    return f'"{stat.st_size:x}-{stat.st_mtime_ns:x}"'
+
+
+def parse_range(header, size):
+    """
+    Converte 'bytes=início-fim' em (início, fim inclusivo).
+
+    Retorna None se o cabeçalho não for um único intervalo em bytes (a
+    resposta é o arquivo inteiro) e lança ValueError se o intervalo não
+    puder ser atendido.
+    """
+    match = RANGE_RE.match(header.strip())
+    if not match or match.groups() == ('', ''):
+        return None
+
+    start, end = match.groups()
+    if start == '':
+        # Sufixo: últimos N bytes
+        length = int(end)
+        if length == 0 or size == 0:
+            raise ValueError('Intervalo vazio')
+        return max(size - length, 0), size - 1
+
+    start = int(start)
+    end = min(int(end), size - 1) if end else size - 1
+    if start >= size or start > end:
+        raise ValueError('Intervalo fora do arquivo')
+    return start, end
+
+
+def _read_range(path, start, length):
+    with open(path, 'rb') as f:
+        f.seek(start)
+        while length > 0:
+            chunk = f.read(min(CHUNK_SIZE, length))
+            if not chunk:
+                return
+            length -= len(chunk)
+            yield chunk
+
+
+def file_response(request, path, filename):
+    """
+    Resposta de download com ETag, If-None-Match, Range e If-Range.
+
+    O arquivo inteiro vai num FileResponse, que usa wsgi.file_wrapper
+    (sendfile) quando o servidor oferece; intervalos são lidos em blocos.
+    Em nenhum caso o arquivo é carregado inteiro na memória.
+    """
+    stat = os.stat(path)
+    etag = file_etag(stat)
+    headers = {
+        'ETag': etag,
+        'Last-Modified': http_date(stat.st_mtime),
+        'Accept-Ranges': 'bytes',
+    }
+
+    # If-None-Match usa comparação fraca (RFC 9110): W/"x" vale como "x"
+    if_none_match = request.headers.get('If-None-Match')
+    if if_none_match and (
+        etag in (tag.removeprefix('W/') for tag in parse_etags(if_none_match)) or if_none_match.strip() == '*'
+    ):
+        return HttpResponse(status=304, headers=headers)
+
+    byte_range = None
+    range_header = request.headers.get('Range')
+    if_range = request.headers.get('If-Range')
+    # If-Range com outro ETag (ou data): o arquivo mudou, envia inteiro. A
+    # comparação é forte: um ETag fraco nunca autoriza a resposta parcial
+    if range_header and (not if_range or if_range.strip() == etag):
+        try:
+            byte_range = parse_range(range_header, stat.st_size)
+        except ValueError:
+            response = HttpResponse(status=416, headers=headers)
+            response['Content-Range'] = f'bytes */{stat.st_size}'
+            return response
+
+    if byte_range is None:
+        response = FileResponse(open(path, 'rb'), as_attachment=True, filename=filename)
+        for name, value in headers.items():
+            response[name] = value
+        return response
+
+    start, end = byte_range
+    length = end - start + 1
+    response = StreamingHttpResponse(
+        _read_range(path, start, length), status=206, content_type='application/octet-stream'
+    )
+    for name, value in headers.items():
+        response[name] = value
+    response['Content-Range'] = f'bytes {start}-{end}/{stat.st_size}'
+    response['Content-Length'] = str(length)
+    response['Content-Disposition'] = content_disposition_header(True, filename)
+    return response
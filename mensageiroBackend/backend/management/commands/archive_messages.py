@@ -0,0 +1,28 @@
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+
+from backend.archive import archive_messages
+from backend.models import Message
+
+
+class Command(BaseCommand):
+    help = 'Move as mensagens mais antigas que MESSAGE_HOT_DAYS para a tabela de arquivo'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--days', type=int, default=settings.MESSAGE_HOT_DAYS,
+                            help='Mantém na tabela quente as mensagens dos últimos N dias')
+        parser.add_argument('--batch-size', type=int, default=settings.MESSAGE_ARCHIVE_BATCH_SIZE)
+        parser.add_argument('--dry-run', action='store_true', help='Apenas conta o que seria arquivado')
+
+    def handle(self, *args, **options):
+        older_than = timezone.now() - timedelta(days=options['days'])
+        if options['dry_run']:
+            count = Message.objects.filter(timestamp__lt=older_than).count()
+            self.stdout.write(f'{count} mensagens seriam arquivadas (anteriores a {older_than:%Y-%m-%d %H:%M})')
+            return
+
+        moved = archive_messages(older_than=older_than, batch_size=options['batch_size'])
+        self.stdout.write(f'{moved} mensagens arquivadas (anteriores a {older_than:%Y-%m-%d %H:%M})')
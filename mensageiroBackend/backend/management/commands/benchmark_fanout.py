@@ -0,0 +1,96 @@
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.db import connection, transaction
+
+from backend.models import ChatRoom, Notification, RoomMembership, User
+from backend.notifications import fan_out_notifications, schedule_fanout
+from backend.signals import delete_without_signals
+
+
+class Command(BaseCommand):
+    help = (
+        'Notificações de uma mensagem para os membros de uma sala grande: um INSERT por usuário '
+        'na requisição (como antes) contra o evento no outbox e o bulk_create do worker'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--users', type=int, default=10_000, help='Membros da sala além do remetente')
+        parser.add_argument('--chunk-size', type=int, default=settings.NOTIFICATION_FANOUT_CHUNK)
+        parser.add_argument('--room', default='benchmark_fanout')
+        parser.add_argument('--keep', action='store_true', help='Mantém sala, usuários e notificações criados')
+
+    def handle(self, *args, **options):
+        self.stdout.write(f'Banco: {connection.vendor}, {options["users"]} destinatários')
+        room, sender, members = self.prepare(options['room'], options['users'])
+        try:
+            seconds = self.per_user_loop(room, sender, members)
+            self.stdout.write(f'{"INSERT por usuário":<24} requisição {seconds * 1000:9.1f} ms')
+            delete_without_signals(Notification, 'room', [room.id])
+
+            request, worker = self.outbox_fanout(room, sender, options['chunk_size'])
+            created = Notification.objects.filter(room=room).count()
+            self.stdout.write(
+                f'{"outbox + bulk_create":<24} requisição {request * 1000:9.1f} ms   '
+                f'worker {worker * 1000:9.1f} ms ({created} notificações, blocos de {options["chunk_size"]})'
+            )
+        finally:
+            if not options['keep']:
+                self.cleanup(room)
+
+    def prepare(self, room_name, count):
+        room, _ = ChatRoom.objects.get_or_create(name=room_name)
+        sender, _ = User.objects.get_or_create(username=f'{room_name}_remetente')
+        existing = set(User.objects.filter(username__startswith=f'{room_name}_u').values_list('username', flat=True))
+        User.objects.bulk_create([
+            User(username=f'{room_name}_u{index}', password='x')
+            for index in range(count) if f'{room_name}_u{index}' not in existing
+        ], batch_size=1000)
+        members = list(User.objects.filter(username__startswith=f'{room_name}_u').order_by('username')[:count])
+        RoomMembership.objects.bulk_create(
+            [RoomMembership(room=room, user=user) for user in members], batch_size=1000, ignore_conflicts=True
+        )
+        return room, sender, members
+
+    def per_user_loop(self, room, sender, members):
+        # Caminho anterior, dentro do send_message: um create (e um commit) por destinatário
+        start = time.perf_counter()
+        for user in members:
+            Notification.objects.create(
+                user=user,
+                room=room,
+                notification_type='message',
+                title=f'Nova mensagem em #{room.name}',
+                message=f'{sender.username}: carga',
+                priority='medium',
+                data={'sender_id': str(sender.id)}
+            )
+        return time.perf_counter() - start
+
+    def outbox_fanout(self, room, sender, chunk_size):
+        start = time.perf_counter()
+        with transaction.atomic():
+            event = schedule_fanout(
+                room=room,
+                sender=sender,
+                notification_type='message',
+                title=f'Nova mensagem em #{room.name}',
+                message=f'{sender.username}: carga',
+                data={'sender_id': str(sender.id)}
+            )
+        request = time.perf_counter() - start
+
+        # O que process_fanouts faz com o evento, sem disputar o outbox com o relay
+        start = time.perf_counter()
+        with transaction.atomic():
+            fan_out_notifications(**event.payload, chunk_size=chunk_size)
+        worker = time.perf_counter() - start
+        event.delete()
+        return request, worker
+
+    def cleanup(self, room):
+        # Sem post_delete por notificação: os usuários são removidos em seguida
+        delete_without_signals(Notification, 'room', [room.id])
+        User.objects.filter(username__startswith=f'{room.name}_').delete()
+        room.delete()
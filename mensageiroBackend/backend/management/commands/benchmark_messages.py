@@ -0,0 +1,96 @@
+import statistics
+import time
+import uuid
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.utils import timezone
+from rest_framework.test import APIRequestFactory
+
+from backend.models import ChatRoom, Message, User
+from backend.pagination import encode_cursor
+from backend.signals import delete_without_signals
+from backend.views import get_messages
+
+
+class Command(BaseCommand):
+    help = (
+        'Latência do get_messages (primeira página, polling sem novidades e página antiga do '
+        'histórico) à medida que a sala cresce'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--sizes', default='1000,10000,100000,1000000',
+                            help='Quantidades de mensagens na sala, em ordem crescente')
+        parser.add_argument('--requests', type=int, default=200, help='Requisições medidas por leitura')
+        parser.add_argument('--limit', type=int, default=50)
+        parser.add_argument('--room', default='benchmark_messages')
+        parser.add_argument('--keep', action='store_true', help='Mantém a sala e as mensagens criadas')
+
+    def handle(self, *args, **options):
+        sizes = sorted(int(size) for size in options['sizes'].split(','))
+        room, _ = ChatRoom.objects.get_or_create(name=options['room'])
+        sender, _ = User.objects.get_or_create(username=options['room'])
+        # Um milissegundo entre mensagens, terminando agora
+        start = timezone.now() - timedelta(milliseconds=sizes[-1])
+
+        self.stdout.write(f'Banco: {connection.vendor}, limit={options["limit"]}')
+        try:
+            seeded = Message.objects.filter(room=room).count()
+            for size in sizes:
+                self.seed(room, sender, start, seeded, size)
+                seeded = max(seeded, size)
+                self.report(room, seeded, options)
+        finally:
+            if not options['keep']:
+                self.cleanup(room, sender)
+
+    def seed(self, room, sender, start, first, last, batch_size=10_000):
+        for offset in range(first, last, batch_size):
+            Message.objects.bulk_create([
+                Message(
+                    id=uuid.uuid4(), room=room, sender=sender, content=f'carga {index}',
+                    timestamp=start + timedelta(milliseconds=index)
+                )
+                for index in range(offset, min(offset + batch_size, last))
+            ])
+
+    def report(self, room, size, options):
+        limit = options['limit']
+        history = Message.objects.filter(room=room).order_by('timestamp', 'id')
+        newest = history.last()
+        # Página a 10% do início da sala: o cliente rolou quase todo o histórico
+        deep = history[size // 10]
+        reads = {
+            'primeira': {'limit': limit},
+            'polling': {'after': encode_cursor(newest.timestamp, newest.id), 'limit': limit},
+            'antiga': {'before': encode_cursor(deep.timestamp, deep.id), 'limit': limit},
+        }
+
+        line = [f'{size:>9} mensagens']
+        for label, params in reads.items():
+            latencies = self.measure(room.name, params, options['requests'])
+            line.append(
+                f'{label} p50 {statistics.median(latencies):6.2f} ms '
+                f'p95 {latencies[int(len(latencies) * 0.95) - 1]:6.2f} ms'
+            )
+        self.stdout.write('   '.join(line))
+
+    def measure(self, room_name, params, count):
+        factory = APIRequestFactory()
+        latencies = []
+        for _ in range(count):
+            request = factory.get(f'/api/messages/{room_name}/', params)
+            began = time.perf_counter()
+            response = get_messages(request, room_name=room_name)
+            latencies.append((time.perf_counter() - began) * 1000)
+            if response.status_code != 200:
+                raise CommandError(f'get_messages retornou {response.status_code}: {response.data}')
+        return sorted(latencies)
+
+    def cleanup(self, room, sender):
+        # Sem post_delete por mensagem: a sala é removida em seguida
+        delete_without_signals(Message, 'room', [room.id])
+        room.delete()
+        sender.delete()
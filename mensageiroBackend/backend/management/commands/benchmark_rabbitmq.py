@@ -0,0 +1,124 @@
+import statistics
+import threading
+import time
+
+import pika
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from backend.rabbitmq_service import BatchPublisher, RabbitMQService
+
+
+class Command(BaseCommand):
+    help = (
+        'Vazão de publicação no RabbitMQ local: uma conexão e declarações por mensagem (como antes '
+        'do pool), o publicador compartilhado do processo e os lotes do relay do outbox'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--messages', type=int, default=5000, help='Mensagens publicadas pelo pool')
+        parser.add_argument('--threads', type=int, default=4)
+        parser.add_argument('--unpooled-messages', type=int, default=200,
+                            help='Mensagens publicadas abrindo uma conexão por mensagem')
+        parser.add_argument('--batch-size', type=int, default=settings.OUTBOX_BATCH_SIZE,
+                            help='Mensagens por lote do publicador do relay')
+        parser.add_argument('--room', default='benchmark_rabbitmq')
+
+    def handle(self, *args, **options):
+        service = RabbitMQService(pool_size=options['threads'])
+        if not service.connect():
+            self.stdout.write(self.style.WARNING(
+                f'RabbitMQ indisponível em {settings.RABBITMQ_HOST}:{settings.RABBITMQ_PORT}; benchmark ignorado'
+            ))
+            return
+
+        message = {'room_name': options['room'], 'content': 'carga', 'sender': 'benchmark'}
+        confirms = 'com' if settings.RABBITMQ_PUBLISHER_CONFIRMS else 'sem'
+        self.stdout.write(f'RabbitMQ {settings.RABBITMQ_HOST}:{settings.RABBITMQ_PORT}, {confirms} publisher confirms')
+        try:
+            self.report('conexão por mensagem', self.run(
+                lambda: self.publish_unpooled(service, message), 1, options['unpooled_messages']
+            ))
+            self.report(f'pool ({options["threads"]} threads)', self.run(
+                lambda: service.publish_message(message), options['threads'], options['messages']
+            ))
+            self.report_batches(message, options['messages'], options['batch_size'])
+        finally:
+            with service.channel() as channel:
+                channel.queue_delete(queue=f'chat_room_{options["room"]}')
+            service.close_connection()
+
+    def publish_unpooled(self, service, message):
+        # Caminho anterior: conexão nova, todas as declarações e o envio
+        fresh = RabbitMQService(pool_size=1)
+        try:
+            connection = pika.BlockingConnection(service._parameters())
+        except pika.exceptions.AMQPError:
+            return False
+        try:
+            channel = connection.channel()
+            if settings.RABBITMQ_PUBLISHER_CONFIRMS:
+                channel.confirm_delivery()
+            fresh._declare_topology(channel)
+            fresh.publish_to_channel(channel, message)
+            return True
+        except pika.exceptions.AMQPError:
+            return False
+        finally:
+            connection.close()
+
+    def run(self, publish, threads, count):
+        latencies, failures = [], []
+        lock = threading.Lock()
+
+        def worker(share):
+            for _ in range(share):
+                began = time.perf_counter()
+                ok = publish()
+                elapsed = time.perf_counter() - began
+                with lock:
+                    (latencies if ok else failures).append(elapsed)
+
+        workers = [
+            threading.Thread(target=worker, args=(count // threads + (index < count % threads),))
+            for index in range(threads)
+        ]
+        start = time.perf_counter()
+        for thread in workers:
+            thread.start()
+        for thread in workers:
+            thread.join()
+        return sorted(latencies), len(failures), time.perf_counter() - start
+
+    def report_batches(self, message, count, batch_size):
+        # Como o relay: o lote inteiro enviado antes de aguardar os confirms
+        publisher = BatchPublisher()
+        latencies, confirmed = [], 0
+        start = time.perf_counter()
+        try:
+            for offset in range(0, count, batch_size):
+                began = time.perf_counter()
+                sent, error = publisher.publish_batch([message] * min(batch_size, count - offset))
+                latencies.append(time.perf_counter() - began)
+                confirmed += sent
+                if error is not None:
+                    break
+        finally:
+            publisher.close()
+        seconds = time.perf_counter() - start
+        latencies.sort()
+        self.stdout.write(
+            f'{f"lote de {batch_size} (relay)":<22} {confirmed / seconds:8.0f} msg/s   '
+            f'lote p50 {statistics.median(latencies) * 1000:6.2f} ms   {count - confirmed} falhas'
+        )
+
+    def report(self, label, result):
+        latencies, failures, seconds = result
+        if not latencies:
+            self.stdout.write(f'{label:<22} nenhuma mensagem confirmada ({failures} falhas)')
+            return
+        self.stdout.write(
+            f'{label:<22} {len(latencies) / seconds:8.0f} msg/s   '
+            f'p50 {statistics.median(latencies) * 1000:6.2f} ms   '
+            f'p95 {latencies[int(len(latencies) * 0.95) - 1] * 1000:6.2f} ms   {failures} falhas'
+        )
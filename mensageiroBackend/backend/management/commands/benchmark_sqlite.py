@@ -0,0 +1,143 @@
+import argparse
+import json
+import os
+import shutil
+import sqlite3
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from rest_framework.test import APIRequestFactory
+
+from backend.membership import join_room
+from backend.models import ChatRoom, User
+from backend.views import get_messages, send_message
+
+ROOM = 'benchmark_sqlite'
+
+
+class Command(BaseCommand):
+    help = (
+        'Leitores fazendo polling de get_messages e escritores chamando send_message, em processos '
+        'separados, sobre cópias do banco com o journal padrão (delete) e em WAL'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--readers', type=int, default=4)
+        parser.add_argument('--writers', type=int, default=4)
+        parser.add_argument('--seconds', type=float, default=10)
+        parser.add_argument('--modes', default='delete,wal', help='Modos de journal comparados')
+        # Usados pelos processos iniciados pelo próprio benchmark
+        parser.add_argument('--worker', choices=['prepare', 'reader', 'writer'], help=argparse.SUPPRESS)
+        parser.add_argument('--user-id', help=argparse.SUPPRESS)
+
+    def handle(self, *args, **options):
+        if options['worker']:
+            return self.run_worker(options)
+        if connection.vendor != 'sqlite':
+            raise CommandError(f'O banco configurado é {connection.display_name}, não SQLite')
+
+        workdir = tempfile.mkdtemp()
+        try:
+            for mode in options['modes'].split(','):
+                # Cópia consistente do banco atual; o benchmark não grava nele
+                path = os.path.join(workdir, f'{mode}.sqlite3')
+                with sqlite3.connect(settings.DATABASES['default']['NAME']) as source, \
+                        sqlite3.connect(path) as target:
+                    source.backup(target)
+                self.report(mode, self.run_mode(path, mode, options))
+        finally:
+            shutil.rmtree(workdir)
+
+    def spawn(self, path, mode, *args):
+        env = {**os.environ, 'SQLITE_PATH': path, 'SQLITE_JOURNAL_MODE': mode}
+        return subprocess.Popen(
+            [sys.executable, 'manage.py', 'benchmark_sqlite', *args],
+            cwd=settings.BASE_DIR, env=env, stdout=subprocess.PIPE, text=True
+        )
+
+    def run_mode(self, path, mode, options):
+        prepare = self.spawn(path, mode, '--worker', 'prepare', '--writers', str(options['writers']))
+        user_ids = json.loads(prepare.communicate()[0].splitlines()[-1])
+
+        seconds = str(options['seconds'])
+        workers = [self.spawn(path, mode, '--worker', 'reader', '--seconds', seconds)
+                   for _ in range(options['readers'])]
+        workers += [self.spawn(path, mode, '--worker', 'writer', '--seconds', seconds, '--user-id', user_id)
+                    for user_id in user_ids]
+        results = []
+        for worker in workers:
+            output = worker.communicate()[0].splitlines()
+            if worker.returncode or not output:
+                raise CommandError(f'Processo do benchmark terminou com código {worker.returncode}')
+            results.append(json.loads(output[-1]))
+        return results
+
+    def report(self, mode, results):
+        line = [f'journal_mode={mode:<7}']
+        for role, label in (('reader', 'leituras'), ('writer', 'escritas')):
+            stats = [result for result in results if result['role'] == role]
+            if not stats:
+                continue
+            ok = sum(result['ok'] for result in stats)
+            errors = sum(result['errors'] for result in stats)
+            seconds = max(result['seconds'] for result in stats)
+            p95 = max(result['p95_ms'] for result in stats)
+            worst = max(result['max_ms'] for result in stats)
+            line.append(
+                f'{label} {ok / seconds:7.0f}/s (p95 {p95:7.1f} ms, máx {worst:7.1f} ms, {errors} travadas)'
+            )
+        self.stdout.write('   '.join(line))
+
+    def run_worker(self, options):
+        if options['worker'] == 'prepare':
+            room, _ = ChatRoom.objects.get_or_create(name=ROOM)
+            user_ids = []
+            for index in range(options['writers']):
+                user, _ = User.objects.get_or_create(username=f'{ROOM}_{index}')
+                join_room(room, user)
+                user_ids.append(str(user.id))
+            self.stdout.write(json.dumps(user_ids))
+            return
+
+        factory = APIRequestFactory()
+        latencies, errors, cursor = [], 0, None
+        deadline = time.monotonic() + options['seconds']
+        start = time.perf_counter()
+        while time.monotonic() < deadline:
+            if options['worker'] == 'reader':
+                # Polling do cliente: mensagens novas desde o último cursor
+                params = {'after': cursor} if cursor else {}
+                request = factory.get(f'/api/messages/{ROOM}/', params)
+                began = time.perf_counter()
+                response = get_messages(request, room_name=ROOM)
+                ok = response.status_code == 200
+                if ok:
+                    cursor = response.data['next_cursor']
+            else:
+                request = factory.post('/api/send-message/', {
+                    'room_name': ROOM, 'sender_id': options['user_id'], 'content': 'carga'
+                }, format='json')
+                began = time.perf_counter()
+                ok = send_message(request).status_code == 201
+            elapsed = time.perf_counter() - began
+            if ok:
+                latencies.append(elapsed)
+            else:
+                errors += 1
+
+        latencies.sort()
+        self.stdout.write(json.dumps({
+            'role': options['worker'],
+            'ok': len(latencies),
+            'errors': errors,
+            'seconds': time.perf_counter() - start,
+            'p95_ms': latencies[int(len(latencies) * 0.95) - 1] * 1000 if latencies else 0,
+            'max_ms': latencies[-1] * 1000 if latencies else 0,
+            'mean_ms': statistics.mean(latencies) * 1000 if latencies else 0,
+        }))
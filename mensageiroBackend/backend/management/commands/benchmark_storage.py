@@ -0,0 +1,59 @@
+import os
+import random
+import shutil
+import tempfile
+import time
+import uuid
+
+from django.core.management.base import BaseCommand
+
+
+class Command(BaseCommand):
+    help = 'Compara busca e listagem de arquivos em diretório plano e em subdiretórios por hash'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--files', type=int, default=1_000_000)
+        parser.add_argument('--lookups', type=int, default=10_000)
+        parser.add_argument('--dir', default=None, help='Diretório de trabalho (padrão: temporário)')
+
+    def handle(self, *args, **options):
+        root = tempfile.mkdtemp(dir=options['dir'])
+        try:
+            # Nomes no formato dos blobs (64 caracteres hexadecimais)
+            names = [uuid.uuid4().hex + uuid.uuid4().hex for _ in range(options['files'])]
+            layouts = {
+                'plano': lambda name: os.path.join(root, 'plano', name),
+                'sharded': lambda name: os.path.join(root, 'sharded', name[:2], name[2:4], name),
+            }
+
+            for label, path_of in layouts.items():
+                self.stdout.write(f'Criando {len(names)} arquivos vazios ({label})...')
+                for name in names:
+                    path = path_of(name)
+                    try:
+                        open(path, 'wb').close()
+                    except FileNotFoundError:
+                        os.makedirs(os.path.dirname(path), exist_ok=True)
+                        open(path, 'wb').close()
+
+            sample = random.sample(names, min(options['lookups'], len(names)))
+            self.stdout.write('')
+            for label, path_of in layouts.items():
+                # Busca: stat de um arquivo conhecido (o download faz o mesmo)
+                start = time.perf_counter()
+                for name in sample:
+                    os.stat(path_of(name))
+                lookup = (time.perf_counter() - start) / len(sample) * 1e6
+
+                # Listagem: o diretório que contém um arquivo
+                directory = os.path.dirname(path_of(sample[0]))
+                start = time.perf_counter()
+                entries = len(os.listdir(directory))
+                listing = (time.perf_counter() - start) * 1e3
+
+                self.stdout.write(
+                    f'{label:<8} busca {lookup:8.1f} µs/arquivo   '
+                    f'listagem {listing:8.1f} ms ({entries} entradas)'
+                )
+        finally:
+            shutil.rmtree(root)
@@ -0,0 +1,107 @@
+import statistics
+import threading
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.db.models import Max, Q
+from rest_framework.test import APIRequestFactory
+
+from backend.membership import join_room
+from backend.models import ChatRoom, OutboxEvent, User
+from backend.views import send_message
+
+
+class Command(BaseCommand):
+    help = 'Vazão de escrita do send_message com várias threads no banco configurado (SQLite ou PostgreSQL)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--threads', type=int, default=8)
+        parser.add_argument('--messages', type=int, default=200, help='Mensagens por thread')
+        parser.add_argument('--room', default='benchmark_writes')
+        parser.add_argument('--keep', action='store_true', help='Mantém sala, usuários e eventos criados')
+
+    def handle(self, *args, **options):
+        self.stdout.write(self.describe_database())
+        room, users = self.prepare(options['room'], options['threads'])
+        last_event = OutboxEvent.objects.aggregate(last=Max('id'))['last'] or 0
+
+        try:
+            results = self.run(room, users, options['messages'])
+        finally:
+            if not options['keep']:
+                self.cleanup(room, users, last_event)
+
+        latencies = sorted(latency for latency, _ in results['ok'])
+        if not latencies:
+            raise CommandError(f'Nenhuma mensagem gravada: {results["errors"][:1]}')
+        seconds = results['seconds']
+        self.stdout.write(
+            f'{len(latencies)} mensagens em {seconds:.2f} s com {len(users)} threads: '
+            f'{len(latencies) / seconds:.0f} msg/s\n'
+            f'Latência: média {statistics.mean(latencies) * 1000:.1f} ms   '
+            f'p95 {latencies[int(len(latencies) * 0.95) - 1] * 1000:.1f} ms   '
+            f'máx {latencies[-1] * 1000:.1f} ms'
+        )
+        if results['errors']:
+            self.stdout.write(f'{len(results["errors"])} falhas, ex.: {results["errors"][0]}')
+
+    def describe_database(self):
+        with connection.cursor() as cursor:
+            if connection.vendor == 'sqlite':
+                cursor.execute('PRAGMA journal_mode')
+                return f'SQLite (journal_mode={cursor.fetchone()[0]})'
+            cursor.execute('SHOW server_version')
+            return f'PostgreSQL {cursor.fetchone()[0]}'
+
+    def prepare(self, room_name, count):
+        room, _ = ChatRoom.objects.get_or_create(name=room_name)
+        users = []
+        for index in range(count):
+            user, _ = User.objects.get_or_create(username=f'{room_name}_{index}')
+            join_room(room, user)
+            users.append(user)
+        return room, users
+
+    def run(self, room, users, count):
+        results = {'ok': [], 'errors': []}
+        lock = threading.Lock()
+        barrier = threading.Barrier(len(users) + 1)
+
+        def send(user):
+            factory = APIRequestFactory()
+            try:
+                barrier.wait()
+                for index in range(count):
+                    request = factory.post('/api/send-message/', {
+                        'room_name': room.name, 'sender_id': str(user.id), 'content': f'carga {index}'
+                    }, format='json')
+                    start = time.perf_counter()
+                    response = send_message(request)
+                    elapsed = time.perf_counter() - start
+                    with lock:
+                        if response.status_code == 201:
+                            results['ok'].append((elapsed, user.id))
+                        else:
+                            results['errors'].append(response.data.get('error'))
+            finally:
+                # Cada thread tem a sua conexão
+                connection.close()
+
+        threads = [threading.Thread(target=send, args=(user,)) for user in users]
+        for thread in threads:
+            thread.start()
+        barrier.wait()
+        start = time.perf_counter()
+        for thread in threads:
+            thread.join()
+        results['seconds'] = time.perf_counter() - start
+        return results
+
+    def cleanup(self, room, users, last_event):
+        # Eventos do teste não devem chegar ao RabbitMQ nem gerar notificações
+        OutboxEvent.objects.filter(id__gt=last_event).filter(
+            Q(payload__room=str(room.id)) | Q(payload__room_id=str(room.id))
+        ).delete()
+        room.delete()
+        User.objects.filter(id__in=[user.id for user in users]).delete()
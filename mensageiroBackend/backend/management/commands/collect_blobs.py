@@ -0,0 +1,18 @@
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from backend.storage import collect_garbage
+
+
+class Command(BaseCommand):
+    help = 'Remove do disco os blobs de arquivos que nenhum StoredFile referencia'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--grace', type=int, default=settings.BLOB_GC_GRACE,
+                            help='Mantém blobs modificados há menos de N segundos')
+        parser.add_argument('--dry-run', action='store_true', help='Apenas conta o que seria removido')
+
+    def handle(self, *args, **options):
+        removed, freed = collect_garbage(grace=options['grace'], dry_run=options['dry_run'])
+        action = 'seriam removidos' if options['dry_run'] else 'removidos'
+        self.stdout.write(f'{removed} blobs {action} ({freed} bytes)')
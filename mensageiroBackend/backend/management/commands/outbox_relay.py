@@ -0,0 +1,35 @@
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from backend.notifications import process_fanouts
+from backend.outbox import purge_published, relay_pending
+
+
+class Command(BaseCommand):
+    help = 'Publica no RabbitMQ os eventos pendentes do outbox e cria as notificações agendadas'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--once', action='store_true', help='Drena o outbox uma vez e termina')
+        parser.add_argument('--batch-size', type=int, default=settings.OUTBOX_BATCH_SIZE)
+
+    def handle(self, *args, **options):
+        self.stdout.write('Relay do outbox iniciado')
+        last_purge = 0.0
+
+        while True:
+            published = relay_pending(batch_size=options['batch_size'])
+            fanouts = process_fanouts(batch_size=options['batch_size'])
+            if published or fanouts:
+                self.stdout.write(f'{published} eventos publicados, {fanouts} fan-outs processados')
+                continue
+
+            if options['once']:
+                break
+
+            if time.monotonic() - last_purge > settings.OUTBOX_RETENTION:
+                purge_published()
+                last_purge = time.monotonic()
+
+            time.sleep(settings.OUTBOX_POLL_INTERVAL)
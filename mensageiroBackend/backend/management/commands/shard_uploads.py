@@ -0,0 +1,16 @@
+from django.core.management.base import BaseCommand
+
+from backend.storage import legacy_files, migrate_legacy_files
+
+
+class Command(BaseCommand):
+    help = 'Move os arquivos do diretório plano de UPLOAD_DIR para os blobs em subdiretórios (sem parar o serviço)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=500)
+        parser.add_argument('--limit', type=int, default=None, help='Migra no máximo N arquivos nesta execução')
+
+    def handle(self, *args, **options):
+        self.stdout.write(f'{legacy_files().count()} arquivos no diretório plano')
+        migrated, skipped = migrate_legacy_files(batch_size=options['batch_size'], limit=options['limit'])
+        self.stdout.write(f'{migrated} arquivos migrados, {skipped} ignorados (ausentes ou com hash divergente)')
@@ -0,0 +1,32 @@
+import json
+import os
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+
+class Command(BaseCommand):
+    help = 'Altera nível e amostragem dos logs do serviço SOAP em execução (todos os workers)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--level', choices=['DEBUG', 'INFO', 'WARNING', 'ERROR'])
+        parser.add_argument('--sample-rate', type=float, help='Fração dos registros abaixo de WARNING (0 a 1)')
+
+    def handle(self, *args, **options):
+        path = settings.SOAP_LOG_CONTROL_FILE
+        config = {}
+        if os.path.exists(path):
+            with open(path) as f:
+                config = json.load(f)
+
+        if options['level']:
+            config['level'] = options['level']
+        if options['sample_rate'] is not None:
+            config['sample_rate'] = options['sample_rate']
+
+        # Gravação atômica: os workers nunca leem um arquivo pela metade
+        temp_path = f'{path}.tmp'
+        with open(temp_path, 'w') as f:
+            json.dump(config, f)
+        os.replace(temp_path, path)
+        self.stdout.write(f'Configuração de log do SOAP: {config}')
@@ -0,0 +1,49 @@
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+
+from backend.sqlite import CHECKPOINT_MODES, checkpoint, status, vacuum
+
+
+class Command(BaseCommand):
+    help = 'Checkpoint do WAL, VACUUM e PRAGMA optimize do SQLite com o sistema no ar'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--checkpoint', nargs='?', const='TRUNCATE', choices=CHECKPOINT_MODES,
+                            help='Copia o WAL para o banco (padrão TRUNCATE, que também zera o -wal)')
+        parser.add_argument('--vacuum', action='store_true',
+                            help='Recupera as páginas livres; escritores esperam até o fim')
+        parser.add_argument('--optimize', action='store_true', help='Atualiza as estatísticas do planejador')
+
+    def handle(self, *args, **options):
+        if connection.vendor != 'sqlite':
+            raise CommandError(f'O banco configurado é {connection.display_name}, não SQLite')
+
+        self.report('Antes')
+        if options['vacuum']:
+            vacuum(connection)
+            self.stdout.write('VACUUM concluído')
+        if options['optimize']:
+            with connection.cursor() as cursor:
+                cursor.execute('PRAGMA optimize')
+            self.stdout.write('PRAGMA optimize concluído')
+        # O VACUUM em WAL grava o banco inteiro no -wal: o checkpoint vem depois
+        mode = options['checkpoint'] or ('TRUNCATE' if options['vacuum'] else None)
+        if mode:
+            busy, log, copied = checkpoint(connection, mode)
+            if log < 0:
+                self.stdout.write('Checkpoint ignorado: o banco não está em modo WAL')
+            elif busy:
+                self.stdout.write(self.style.WARNING(
+                    f'Checkpoint {mode} incompleto: leitores ativos ({copied}/{log} páginas copiadas)'
+                ))
+            else:
+                self.stdout.write(f'Checkpoint {mode}: {copied} páginas copiadas')
+        if options['vacuum'] or mode:
+            self.report('Depois')
+
+    def report(self, label):
+        info = status(connection)
+        self.stdout.write(
+            f'{label}: journal_mode={info["journal_mode"]}, '
+            f'{info["size"] / 1024 / 1024:.1f} MB, {info["free"] / 1024 / 1024:.1f} MB livres'
+        )
@@ -0,0 +1,186 @@
+import asyncio
+import json
+import socket
+import statistics
+import subprocess
+import sys
+import time
+import urllib.request
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from backend.membership import join_room
+from backend.models import ChatRoom, User
+
+
+class LoadRun:
+    def __init__(self, expected):
+        self.expected = expected
+        self.latencies = []
+        self.failed_sends = 0
+        self.finished = asyncio.Event()
+
+    def delivered(self, latency):
+        self.latencies.append(latency)
+        if len(self.latencies) >= self.expected:
+            self.finished.set()
+
+    def send_failed(self, receivers):
+        # Mensagem não gravada: ninguém vai recebê-la
+        self.failed_sends += 1
+        self.expected -= receivers
+        if len(self.latencies) >= self.expected:
+            self.finished.set()
+
+
+class Command(BaseCommand):
+    help = 'Teste de carga do chat em tempo real: N clientes WebSocket distribuídos entre vários processos Daphne'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--clients', type=int, default=500)
+        parser.add_argument('--senders', type=int, default=10, help='Clientes que enviam mensagens')
+        parser.add_argument('--messages', type=int, default=10, help='Mensagens por remetente')
+        parser.add_argument('--interval', type=float, default=0.05, help='Segundos entre envios de um remetente')
+        parser.add_argument('--workers', type=int, default=4, help='Processos Daphne iniciados pelo teste')
+        parser.add_argument('--base-port', type=int, default=8100)
+        parser.add_argument('--url', action='append', default=[],
+                            help='ws://host:porta de um Daphne já em execução (repetível; dispensa --workers); '
+                                 'as mensagens são enviadas por POST no http:// correspondente')
+        parser.add_argument('--room', default='loadtest')
+        parser.add_argument('--timeout', type=float, default=60)
+
+    def handle(self, *args, **options):
+        try:
+            import websockets  # noqa: F401
+        except ImportError:
+            raise CommandError('ws_loadtest requer o pacote websockets: pip install -r requirements-bench.txt')
+
+        users = self.prepare_room(options['room'], options['clients'])
+        processes = []
+        urls = options['url']
+        if not urls:
+            processes = self.start_workers(options['workers'], options['base_port'])
+            urls = [f'ws://127.0.0.1:{options["base_port"] + index}' for index in range(options['workers'])]
+
+        self.stdout.write(f'Channel layer: {settings.CHANNEL_LAYERS["default"]["BACKEND"]}')
+        self.stdout.write(f'{len(users)} clientes em {len(urls)} processos, {options["senders"]} remetentes\n')
+        try:
+            asyncio.run(self.run(urls, users, options))
+        finally:
+            for process in processes:
+                process.terminate()
+            for process in processes:
+                process.wait()
+
+    def prepare_room(self, room_name, count):
+        room, _ = ChatRoom.objects.get_or_create(name=room_name)
+        users = []
+        for index in range(count):
+            user, _ = User.objects.get_or_create(username=f'{room_name}_{index}')
+            join_room(room, user)
+            users.append(user)
+        return users
+
+    def start_workers(self, count, base_port):
+        processes = [
+            subprocess.Popen(
+                [sys.executable, '-m', 'daphne', '-p', str(base_port + index), 'mensageiroBackend.asgi:application'],
+                cwd=settings.BASE_DIR, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL
+            )
+            for index in range(count)
+        ]
+        deadline = time.monotonic() + 30
+        for index in range(count):
+            while True:
+                try:
+                    socket.create_connection(('127.0.0.1', base_port + index), timeout=1).close()
+                    break
+                except OSError:
+                    if time.monotonic() > deadline:
+                        for process in processes:
+                            process.terminate()
+                        raise CommandError(f'Daphne na porta {base_port + index} não iniciou')
+                    time.sleep(0.2)
+        return processes
+
+    async def connect(self, url, user, room):
+        from websockets.asyncio.client import connect
+
+        return await connect(f'{url}/ws/chat/{room}/?user_id={user.id}', max_queue=None)
+
+    async def listen(self, client, run):
+        from websockets.exceptions import ConnectionClosed
+
+        # Só mensagens persistidas: o evento message.created do grupo da sala
+        try:
+            async for text in client:
+                data = json.loads(text)
+                if data.get('type') == 'message':
+                    run.delivered(time.time() - json.loads(data['message']['content'])['sent_at'])
+        except ConnectionClosed:
+            pass
+
+    def post_message(self, url, room, user, index):
+        # Mesmo caminho dos clientes: /api/send-message/ grava a mensagem e publica no grupo
+        body = json.dumps({
+            'room_name': room,
+            'sender_id': str(user.id),
+            'content': json.dumps({'sent_at': time.time(), 'index': index}),
+        }).encode()
+        request = urllib.request.Request(
+            f'{url}/api/send-message/', body, {'Content-Type': 'application/json'}, method='POST'
+        )
+        try:
+            with urllib.request.urlopen(request, timeout=30) as response:
+                return response.status == 201
+        except OSError:
+            return False
+
+    async def send_messages(self, url, room, user, run, receivers, count, interval):
+        for index in range(count):
+            if not await asyncio.to_thread(self.post_message, url, room, user, index):
+                run.send_failed(receivers)
+            await asyncio.sleep(interval)
+
+    async def run(self, urls, users, options):
+        senders = min(options['senders'], len(users))
+        run = LoadRun(expected=senders * options['messages'] * len(users))
+
+        start = time.perf_counter()
+        clients = await asyncio.gather(*(
+            self.connect(urls[index % len(urls)], user, options['room'])
+            for index, user in enumerate(users)
+        ))
+        self.stdout.write(f'Conexões abertas em {time.perf_counter() - start:.2f} s')
+        listeners = [asyncio.create_task(self.listen(client, run)) for client in clients]
+
+        start = time.perf_counter()
+        await asyncio.gather(*(
+            self.send_messages(
+                'http' + urls[index % len(urls)].removeprefix('ws'), options['room'], users[index], run, len(users),
+                options['messages'], options['interval']
+            )
+            for index in range(senders)
+        ))
+        try:
+            await asyncio.wait_for(run.finished.wait(), options['timeout'])
+        except asyncio.TimeoutError:
+            pass
+        seconds = time.perf_counter() - start
+
+        for client in clients:
+            await client.close()
+        for listener in listeners:
+            listener.cancel()
+
+        latencies = sorted(run.latencies)
+        if not latencies:
+            raise CommandError('Nenhuma mensagem entregue')
+        self.stdout.write(
+            f'Entregues {len(latencies)}/{run.expected} em {seconds:.2f} s ({len(latencies) / seconds:.0f} msg/s), '
+            f'{run.failed_sends} envios falharam\n'
+            f'Latência: p50 {statistics.median(latencies) * 1000:.1f} ms   '
+            f'p95 {latencies[int(len(latencies) * 0.95) - 1] * 1000:.1f} ms   '
+            f'máx {latencies[-1] * 1000:.1f} ms'
+        )
@@ -0,0 +1,52 @@
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+
+from .models import RoomMembership
+from .realtime import disconnect_member
+
+
+def _cache_key(room_id, user_id):
+    return f'room_member:{room_id}:{user_id}'
+
+
+def is_member(room_id, user_id):
+    """
+    Se o usuário é membro da sala, em cache por ROOM_MEMBERS_CACHE_TTL.
+
+    Uma entrada por (sala, usuário): o custo não cresce com o tamanho da sala.
+    """
+    key = _cache_key(room_id, user_id)
+    member = cache.get(key)
+    if member is None:
+        member = RoomMembership.objects.filter(room_id=room_id, user_id=user_id).exists()
+        cache.set(key, member, settings.ROOM_MEMBERS_CACHE_TTL)
+    return member
+
+
+def _invalidate(room_id, user_id):
+    # Após o commit, para outra requisição não recarregar o cache com dados antigos
+    transaction.on_commit(lambda: cache.delete(_cache_key(room_id, user_id)))
+
+
+def join_room(room, user):
+    """Adiciona o usuário à sala; retorna (membership, created)"""
+    membership, created = RoomMembership.objects.get_or_create(room=room, user=user)
+    if created:
+        _invalidate(room.id, user.id)
+    return membership, created
+
+
+def leave_room(room, user):
+    """Remove o usuário da sala e fecha seus WebSockets nela; retorna False se ele não era membro"""
+    deleted, _ = RoomMembership.objects.filter(room=room, user=user).delete()
+    if deleted:
+        _invalidate(room.id, user.id)
+        disconnect_member(room, user)
+    return bool(deleted)
+
+
+def ensure_member(room, user):
+    """Quem envia mensagem ou arquivo numa sala passa a ser membro dela"""
+    if not is_member(room.id, user.id):
+        join_room(room, user)
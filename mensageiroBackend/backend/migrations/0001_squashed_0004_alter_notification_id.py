@@ -0,0 +1,106 @@
+# Generated by Django 4.2.7 on 2026-10-18 16:27
+#
+# Cria as tabelas já com chaves UUID: a 0002 converte chaves bigint em UUID,
+# o que só o SQLite aceita, e o PostgreSQL não conseguia migrar do zero.
+
+from django.db import migrations, models
+import django.db.models.deletion
+import uuid
+
+
+class Migration(migrations.Migration):
+
+    replaces = [('backend', '0001_initial'), ('backend', '0002_user_alter_chatroom_options_alter_message_options_and_more'), ('backend', '0003_notification'), ('backend', '0004_alter_notification_id')]
+
+    initial = True
+
+    dependencies = [
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ChatRoom',
+            fields=[
+                ('id', models.UUIDField(default=uuid.uuid4, editable=False, primary_key=True, serialize=False)),
+                ('name', models.CharField(max_length=100, unique=True)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+            options={
+                'verbose_name': 'Sala de Chat',
+                'verbose_name_plural': 'Salas de Chat',
+                'db_table': 'chat_rooms',
+            },
+        ),
+        migrations.CreateModel(
+            name='User',
+            fields=[
+                ('id', models.UUIDField(default=uuid.uuid4, editable=False, primary_key=True, serialize=False)),
+                ('username', models.CharField(max_length=50, unique=True)),
+                ('password', models.CharField(max_length=128)),
+                ('email', models.EmailField(blank=True, max_length=254, null=True)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('last_login', models.DateTimeField(blank=True, null=True)),
+                ('is_active', models.BooleanField(default=True)),
+            ],
+            options={
+                'verbose_name': 'Usuário',
+                'verbose_name_plural': 'Usuários',
+                'db_table': 'users',
+            },
+        ),
+        migrations.CreateModel(
+            name='RabbitMQConnection',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('host', models.CharField(default='localhost', max_length=255)),
+                ('port', models.IntegerField(default=5672)),
+                ('username', models.CharField(default='guest', max_length=100)),
+                ('password', models.CharField(default='guest', max_length=100)),
+                ('virtual_host', models.CharField(default='/', max_length=100)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+            options={
+                'verbose_name': 'Conexão RabbitMQ',
+                'verbose_name_plural': 'Conexões RabbitMQ',
+                'db_table': 'rabbitmq_connections',
+            },
+        ),
+        migrations.CreateModel(
+            name='Message',
+            fields=[
+                ('id', models.UUIDField(default=uuid.uuid4, editable=False, primary_key=True, serialize=False)),
+                ('content', models.TextField()),
+                ('timestamp', models.DateTimeField(auto_now_add=True)),
+                ('message_type', models.CharField(choices=[('text', 'Texto'), ('system', 'Sistema')], default='text', max_length=10)),
+                ('room', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='messages', to='backend.chatroom')),
+                ('sender', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='messages', to='backend.user')),
+            ],
+            options={
+                'ordering': ['timestamp'],
+                'verbose_name': 'Mensagem',
+                'verbose_name_plural': 'Mensagens',
+                'db_table': 'messages',
+            },
+        ),
+        migrations.CreateModel(
+            name='Notification',
+            fields=[
+                ('id', models.UUIDField(default=uuid.uuid4, editable=False, primary_key=True, serialize=False)),
+                ('notification_type', models.CharField(choices=[('message', 'Nova Mensagem'), ('file_upload', 'Arquivo Enviado'), ('user_join', 'Usuário Entrou'), ('user_leave', 'Usuário Saiu'), ('system', 'Sistema')], max_length=20)),
+                ('title', models.CharField(max_length=200)),
+                ('message', models.TextField()),
+                ('priority', models.CharField(choices=[('low', 'Baixa'), ('medium', 'Média'), ('high', 'Alta'), ('urgent', 'Urgente')], default='medium', max_length=10)),
+                ('is_read', models.BooleanField(default=False)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('data', models.JSONField(blank=True, default=dict)),
+                ('room', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, to='backend.chatroom')),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='notifications', to='backend.user')),
+            ],
+            options={
+                'db_table': 'notifications',
+                'ordering': ['-created_at'],
+            },
+        ),
+    ]
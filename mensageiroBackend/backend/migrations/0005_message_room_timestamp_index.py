@@ -0,0 +1,17 @@
+# Generated by Django 4.2.7 on 2026-10-18 15:49
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('backend', '0004_alter_notification_id'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='message',
+            index=models.Index(fields=['room', 'timestamp', 'id'], name='messages_room_ts_id_idx'),
+        ),
+    ]
@@ -0,0 +1,48 @@
+# Generated by Django 4.2.7 on 2026-10-18 15:57
+
+from django.db import migrations, models
+import django.db.models.deletion
+import uuid
+
+
+def backfill_memberships(apps, schema_editor):
+    """Quem já enviou mensagens em uma sala passa a ser membro dela"""
+    Message = apps.get_model('backend', 'Message')
+    RoomMembership = apps.get_model('backend', 'RoomMembership')
+
+    # Sem o ordering de Message, que entraria no DISTINCT (um par por mensagem)
+    pairs = Message.objects.values_list('room_id', 'sender_id').order_by().distinct()
+    RoomMembership.objects.bulk_create(
+        [RoomMembership(room_id=room_id, user_id=user_id) for room_id, user_id in pairs],
+        batch_size=500,
+        ignore_conflicts=True
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('backend', '0006_outboxevent'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='RoomMembership',
+            fields=[
+                ('id', models.UUIDField(default=uuid.uuid4, editable=False, primary_key=True, serialize=False)),
+                ('joined_at', models.DateTimeField(auto_now_add=True)),
+                ('room', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='memberships', to='backend.chatroom')),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='room_memberships', to='backend.user')),
+            ],
+            options={
+                'verbose_name': 'Membro da Sala',
+                'verbose_name_plural': 'Membros da Sala',
+                'db_table': 'room_memberships',
+            },
+        ),
+        migrations.AddConstraint(
+            model_name='roommembership',
+            constraint=models.UniqueConstraint(fields=('room', 'user'), name='room_membership_unique'),
+        ),
+        migrations.RunPython(backfill_memberships, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,40 @@
+# Generated by Django 4.2.7 on 2026-10-18 15:59
+
+from django.db import migrations, models
+from django.db.models import Count, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+
+
+def backfill_counters(apps, schema_editor):
+    """Preenche message_count/last_message_at com um único UPDATE"""
+    ChatRoom = apps.get_model('backend', 'ChatRoom')
+    Message = apps.get_model('backend', 'Message')
+
+    messages = Message.objects.filter(room=OuterRef('pk')).order_by()
+    ChatRoom.objects.update(
+        message_count=Coalesce(
+            Subquery(messages.values('room').annotate(total=Count('id')).values('total')[:1]), 0
+        ),
+        last_message_at=Subquery(messages.order_by('-timestamp').values('timestamp')[:1])
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('backend', '0007_roommembership'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='chatroom',
+            name='last_message_at',
+            field=models.DateTimeField(blank=True, editable=False, null=True),
+        ),
+        migrations.AddField(
+            model_name='chatroom',
+            name='message_count',
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+        migrations.RunPython(backfill_counters, migrations.RunPython.noop),
+    ]
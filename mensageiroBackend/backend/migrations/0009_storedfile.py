@@ -0,0 +1,101 @@
+# Generated by Django 4.2.7 on 2026-10-18 16:09
+
+import hashlib
+import os
+from datetime import datetime, timezone as dt_timezone
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+import django.utils.timezone
+import uuid
+
+
+def backfill_stored_files(apps, schema_editor):
+    """
+    Registra os arquivos já existentes em UPLOAD_DIR ('<file_id>_<nome>').
+
+    Sala e remetente vêm das notificações 'file_upload', que guardam o
+    file_id; arquivos sem notificação ficam sem sala.
+    """
+    StoredFile = apps.get_model('backend', 'StoredFile')
+    Notification = apps.get_model('backend', 'Notification')
+
+    if not os.path.isdir(settings.UPLOAD_DIR):
+        return
+
+    origins = {}
+    uploads = Notification.objects.filter(notification_type='file_upload').values_list('room_id', 'data')
+    for room_id, data in uploads.iterator():
+        if isinstance(data, dict) and data.get('file_id'):
+            origins.setdefault(data['file_id'], (room_id, data.get('uploader_id')))
+
+    files = []
+    for name in os.listdir(settings.UPLOAD_DIR):
+        file_id, _, filename = name.partition('_')
+        path = os.path.join(settings.UPLOAD_DIR, name)
+        try:
+            file_id = uuid.UUID(file_id)
+        except ValueError:
+            continue
+        if not filename or not os.path.isfile(path):
+            continue
+
+        digest = hashlib.sha256()
+        with open(path, 'rb') as f:
+            for block in iter(lambda: f.read(1024 * 1024), b''):
+                digest.update(block)
+
+        stat = os.stat(path)
+        room_id, uploader_id = origins.get(str(file_id), (None, None))
+        files.append(StoredFile(
+            id=file_id,
+            room_id=room_id,
+            uploader_id=uploader_id,
+            filename=filename,
+            size=stat.st_size,
+            sha256=digest.hexdigest(),
+            path=name,
+            created_at=datetime.fromtimestamp(stat.st_mtime, tz=dt_timezone.utc),
+        ))
+
+    # Remetentes removidos depois do upload
+    User = apps.get_model('backend', 'User')
+    uploader_ids = {f.uploader_id for f in files if f.uploader_id}
+    existing = {str(pk) for pk in User.objects.filter(id__in=uploader_ids).values_list('id', flat=True)}
+    for stored in files:
+        if stored.uploader_id and str(stored.uploader_id) not in existing:
+            stored.uploader_id = None
+
+    StoredFile.objects.bulk_create(files, batch_size=500, ignore_conflicts=True)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('backend', '0008_chatroom_message_counters'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='StoredFile',
+            fields=[
+                ('id', models.UUIDField(default=uuid.uuid4, editable=False, primary_key=True, serialize=False)),
+                ('filename', models.CharField(max_length=255)),
+                ('size', models.BigIntegerField()),
+                ('sha256', models.CharField(max_length=64)),
+                ('path', models.CharField(max_length=500)),
+                ('created_at', models.DateTimeField(default=django.utils.timezone.now)),
+                ('room', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='files', to='backend.chatroom')),
+                ('uploader', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='files', to='backend.user')),
+            ],
+            options={
+                'verbose_name': 'Arquivo',
+                'verbose_name_plural': 'Arquivos',
+                'db_table': 'stored_files',
+                'ordering': ['-created_at'],
+                'indexes': [models.Index(fields=['room', 'created_at', 'id'], name='stored_files_room_ts_idx'), models.Index(fields=['created_at', 'id'], name='stored_files_ts_idx')],
+            },
+        ),
+        migrations.RunPython(backfill_stored_files, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,17 @@
+# Generated by Django 4.2.7 on 2026-10-18 16:12
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('backend', '0009_storedfile'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='storedfile',
+            index=models.Index(fields=['sha256'], name='stored_files_sha256_idx'),
+        ),
+    ]
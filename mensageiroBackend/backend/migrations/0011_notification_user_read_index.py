@@ -0,0 +1,17 @@
+# Generated by Django 4.2.7 on 2026-10-18 16:22
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('backend', '0010_storedfile_sha256_index'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='notification',
+            index=models.Index(fields=['user', 'is_read'], name='notifications_user_read_idx'),
+        ),
+    ]
@@ -0,0 +1,48 @@
+# Generated by Django 4.2.7 on 2026-10-18 16:35
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('backend', '0012_notification_user_timestamp_indexes'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ArchivedMessage',
+            fields=[
+                ('id', models.UUIDField(editable=False, primary_key=True, serialize=False)),
+                ('content', models.TextField()),
+                ('timestamp', models.DateTimeField()),
+                ('message_type', models.CharField(choices=[('text', 'Texto'), ('system', 'Sistema')], default='text', max_length=10)),
+                ('archived_at', models.DateTimeField(auto_now_add=True)),
+            ],
+            options={
+                'verbose_name': 'Mensagem Arquivada',
+                'verbose_name_plural': 'Mensagens Arquivadas',
+                'db_table': 'messages_archive',
+                'ordering': ['timestamp'],
+            },
+        ),
+        migrations.AddIndex(
+            model_name='message',
+            index=models.Index(fields=['timestamp', 'id'], name='messages_ts_id_idx'),
+        ),
+        migrations.AddField(
+            model_name='archivedmessage',
+            name='room',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='archived_messages', to='backend.chatroom'),
+        ),
+        migrations.AddField(
+            model_name='archivedmessage',
+            name='sender',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='archived_messages', to='backend.user'),
+        ),
+        migrations.AddIndex(
+            model_name='archivedmessage',
+            index=models.Index(fields=['room', 'timestamp', 'id'], name='messages_archive_room_ts_idx'),
+        ),
+    ]
@@ -26,6 +26,9 @@ class ChatRoom(models.Model):
     name = models.CharField(max_length=100, unique=True)
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
+    # Mantidos por backend.signals a cada mensagem criada/removida
+    message_count = models.PositiveIntegerField(default=0, editable=False)
+    last_message_at = models.DateTimeField(null=True, blank=True, editable=False)
 
     class Meta:
         db_table = 'chat_rooms'
@@ -35,6 +38,25 @@ class ChatRoom(models.Model):
     def __str__(self):
         return self.name
 
+class RoomMembership(models.Model):
+    """Participação de um usuário em uma sala (escopo de notificações e WebSocket)"""
+    id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
+    room = models.ForeignKey(ChatRoom, on_delete=models.CASCADE, related_name='memberships')
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='room_memberships')
+    joined_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        db_table = 'room_memberships'
+        verbose_name = 'Membro da Sala'
+        verbose_name_plural = 'Membros da Sala'
+        constraints = [
+            # Também serve de índice (room, user) para listar membros de uma sala
+            models.UniqueConstraint(fields=['room', 'user'], name='room_membership_unique'),
+        ]
+
+    def __str__(self):
+        return f"{self.user.username} em {self.room.name}"
+
 class Message(models.Model):
     """Modelo para mensagens do chat"""
     MESSAGE_TYPES = [
@@ -54,10 +76,67 @@ class Message(models.Model):
         verbose_name = 'Mensagem'
         verbose_name_plural = 'Mensagens'
         ordering = ['timestamp']
+        indexes = [
+            # Paginação por cursor (room, timestamp, id) em get_messages
+            models.Index(fields=['room', 'timestamp', 'id'], name='messages_room_ts_id_idx'),
+            # Lotes do arquivamento, das mais antigas para as mais novas
+            models.Index(fields=['timestamp', 'id'], name='messages_ts_id_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.sender.username}: {self.content[:50]}"
+
+class ArchivedMessage(models.Model):
+    """Mensagem antiga movida de messages (backend.archive), com o mesmo id e timestamp"""
+    id = models.UUIDField(primary_key=True, editable=False)
+    room = models.ForeignKey(ChatRoom, on_delete=models.CASCADE, related_name='archived_messages')
+    sender = models.ForeignKey(User, on_delete=models.CASCADE, related_name='archived_messages')
+    content = models.TextField()
+    timestamp = models.DateTimeField()
+    message_type = models.CharField(max_length=10, choices=Message.MESSAGE_TYPES, default='text')
+    archived_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        db_table = 'messages_archive'
+        verbose_name = 'Mensagem Arquivada'
+        verbose_name_plural = 'Mensagens Arquivadas'
+        ordering = ['timestamp']
+        indexes = [
+            # Histórico por cursor quando a página passa da janela quente
+            models.Index(fields=['room', 'timestamp', 'id'], name='messages_archive_room_ts_idx'),
+        ]
 
     def __str__(self):
         return f"{self.sender.username}: {self.content[:50]}"
 
+class StoredFile(models.Model):
+    """Metadados de um arquivo enviado pelo serviço SOAP"""
+    id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)  # file_id
+    room = models.ForeignKey(ChatRoom, on_delete=models.SET_NULL, null=True, blank=True, related_name='files')
+    uploader = models.ForeignKey(User, on_delete=models.SET_NULL, null=True, blank=True, related_name='files')
+    filename = models.CharField(max_length=255)
+    size = models.BigIntegerField()
+    sha256 = models.CharField(max_length=64)
+    path = models.CharField(max_length=500)  # relativo a settings.UPLOAD_DIR; blob compartilhado por sha256
+    # default em vez de auto_now_add: o backfill preserva a data original
+    created_at = models.DateTimeField(default=timezone.now)
+
+    class Meta:
+        db_table = 'stored_files'
+        verbose_name = 'Arquivo'
+        verbose_name_plural = 'Arquivos'
+        ordering = ['-created_at']
+        indexes = [
+            # Listagem por sala, dos mais recentes para os mais antigos (keyset)
+            models.Index(fields=['room', 'created_at', 'id'], name='stored_files_room_ts_idx'),
+            models.Index(fields=['created_at', 'id'], name='stored_files_ts_idx'),
+            # Referências a um blob (deduplicação e coleta de lixo)
+            models.Index(fields=['sha256'], name='stored_files_sha256_idx'),
+        ]
+
+    def __str__(self):
+        return self.filename
+
 class RabbitMQConnection(models.Model):
     """Modelo para configurações do RabbitMQ"""
     host = models.CharField(max_length=255, default='localhost')
@@ -106,6 +185,41 @@ class Notification(models.Model):
     class Meta:
         ordering = ['-created_at']
         db_table = 'notifications'
+        indexes = [
+            # Listagem por usuário, das mais recentes para as mais antigas (keyset)
+            models.Index(fields=['user', 'created_at', 'id'], name='notifications_user_ts_idx'),
+            # Não lidas do usuário na mesma ordem e recontagem de notification_counts
+            models.Index(fields=['user', 'is_read', 'created_at', 'id'], name='notifications_user_read_ts_idx'),
+        ]
     
     def __str__(self):
-        return f"{self.title} - {self.user.username}"
\ No newline at end of file
+        return f"{self.title} - {self.user.username}"
+
+class OutboxEvent(models.Model):
+    """Evento para o RabbitMQ gravado na mesma transação que o originou"""
+    STATUS_CHOICES = [
+        ('pending', 'Pendente'),
+        ('published', 'Publicado'),
+        ('failed', 'Falhou'),  # rejeitado por erro que não é do broker
+    ]
+
+    event_type = models.CharField(max_length=50)
+    payload = models.JSONField()
+    status = models.CharField(max_length=10, choices=STATUS_CHOICES, default='pending')
+    attempts = models.PositiveIntegerField(default=0)
+    last_error = models.TextField(blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    published_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        db_table = 'outbox_events'
+        verbose_name = 'Evento de Saída'
+        verbose_name_plural = 'Eventos de Saída'
+        ordering = ['id']
+        indexes = [
+            # Relay: eventos pendentes na ordem de criação
+            models.Index(fields=['status', 'id'], name='outbox_status_id_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.event_type} #{self.id} ({self.status})"
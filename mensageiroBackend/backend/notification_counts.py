@@ -0,0 +1,79 @@
+"""
+Contadores de notificações por usuário (total e não lidas) em cache.
+
+São ajustados após o commit de cada criação, leitura e remoção, sem
+COUNT no banco. Quando ausentes (primeiro acesso, expiração ou falha ao
+incrementar) são recalculados com uma única consulta agregada; a
+expiração em NOTIFICATION_COUNTS_TTL corrige qualquer desvio.
+"""
+from django.conf import settings
+from django.core.cache import cache
+from django.core.exceptions import ValidationError
+from django.db import transaction
+from django.db.models import Count, Q
+
+from .models import Notification, User
+
+
+def _keys(user_id):
+    return (
+        f'notifications_total:{user_id}',
+        f'notifications_unread:{user_id}',
+        f'notifications_user:{user_id}',
+    )
+
+
+def get_counts(user_id):
+    """
+    Retorna {'username', 'total', 'unread'} do usuário, ou None se ele não
+    existir. Com o cache preenchido não acessa o banco.
+    """
+    total_key, unread_key, user_key = _keys(user_id)
+    cached = cache.get_many([total_key, unread_key, user_key])
+    if len(cached) == 3:
+        return {'username': cached[user_key], 'total': cached[total_key], 'unread': cached[unread_key]}
+
+    try:
+        username = User.objects.filter(id=user_id).values_list('username', flat=True).first()
+    except (ValidationError, ValueError):
+        return None
+    if username is None:
+        return None
+
+    # Uma consulta pelo índice (user, is_read)
+    counts = Notification.objects.filter(user_id=user_id).aggregate(
+        total=Count('id'),
+        unread=Count('id', filter=Q(is_read=False))
+    )
+    # add: não sobrescreve um valor gravado (ou invalidado e regravado) depois da consulta
+    for key, value in ((total_key, counts['total']), (unread_key, counts['unread']), (user_key, username)):
+        cache.add(key, value, settings.NOTIFICATION_COUNTS_TTL)
+    return {'username': username, **counts}
+
+
+def _adjust(user_id, total, unread):
+    for key, delta in zip(_keys(user_id), (total, unread)):
+        if not delta:
+            continue
+        try:
+            cache.incr(key, delta)
+        except ValueError:
+            # Contador fora do cache: a próxima leitura recalcula os dois
+            cache.delete_many(_keys(user_id))
+            return
+
+
+def count_change(user_id, total=0, unread=0):
+    """Ajusta os contadores do usuário após o commit da transação corrente"""
+    transaction.on_commit(lambda: _adjust(user_id, total, unread))
+
+
+def count_created(user_ids):
+    """Notificações não lidas criadas em lote, uma por usuário"""
+    user_ids = list(user_ids)
+    transaction.on_commit(lambda: [_adjust(user_id, 1, 1) for user_id in user_ids])
+
+
+def forget_user(user_id):
+    """Descarta o nome de usuário em cache (ex.: após renomear)"""
+    cache.delete(_keys(user_id)[2])
@@ -0,0 +1,90 @@
+from django.conf import settings
+from django.db import transaction
+
+from .models import Notification, RoomMembership, User
+from .notification_counts import count_created
+from .outbox import NOTIFICATION_FANOUT, claim_pending, enqueue_event, record_failure, take_pending
+
+
+def schedule_fanout(room, sender, notification_type, title, message, data, priority='medium'):
+    """
+    Agenda notificações para os demais membros sem inseri-las na requisição.
+
+    Grava um único evento no outbox (na transação corrente); o worker
+    outbox_relay cria as notificações em lote com process_fanouts().
+    """
+    return enqueue_event(NOTIFICATION_FANOUT, {
+        'room_id': str(room.id) if room else None,
+        'sender_id': str(sender.id),
+        'notification_type': notification_type,
+        'title': title,
+        'message': message,
+        'priority': priority,
+        'data': data,
+    })
+
+
+def fan_out_notifications(room_id, sender_id, notification_type, title, message, priority, data,
+                          chunk_size=None):
+    """
+    Cria a notificação para cada destinatário com bulk_create em blocos.
+
+    Notificações de sala vão apenas para os membros dela; sem sala, para
+    todos os usuários exceto o remetente.
+    """
+    chunk_size = chunk_size or settings.NOTIFICATION_FANOUT_CHUNK
+    if room_id is None:
+        recipients, key = User.objects.exclude(id=sender_id), 'id'
+    else:
+        recipients, key = RoomMembership.objects.filter(room_id=room_id).exclude(user_id=sender_id), 'user_id'
+    recipients = recipients.order_by(key)
+    created = 0
+    last_id = None
+
+    # Paginação pela chave: não mantém um cursor aberto enquanto insere
+    while True:
+        page = recipients if last_id is None else recipients.filter(**{f'{key}__gt': last_id})
+        user_ids = list(page.values_list(key, flat=True)[:chunk_size])
+        if not user_ids:
+            return created
+
+        Notification.objects.bulk_create([
+            Notification(
+                user_id=user_id,
+                room_id=room_id,
+                notification_type=notification_type,
+                title=title,
+                message=message,
+                priority=priority,
+                data=data
+            )
+            for user_id in user_ids
+        ], batch_size=chunk_size)
+        # bulk_create não dispara post_save
+        count_created(user_ids)
+
+        created += len(user_ids)
+        last_id = user_ids[-1]
+
+
+def process_fanouts(batch_size=None):
+    """Processa eventos de fan-out pendentes; retorna quantos foram processados"""
+    batch_size = batch_size or settings.OUTBOX_BATCH_SIZE
+    processed = 0
+
+    with claim_pending(NOTIFICATION_FANOUT, batch_size) as events:
+        for event in events:
+            try:
+                # Tudo ou nada por evento: uma queda no meio não duplica notificações
+                with transaction.atomic():
+                    if not take_pending(event.id):
+                        # Processado por outro relay desde que o lote foi lido
+                        continue
+                    fan_out_notifications(**event.payload)
+                processed += 1
+            except Exception as e:
+                # Erros transitórios (ex.: banco travado) são tentados novamente
+                exhausted = event.attempts + 1 >= settings.OUTBOX_MAX_ATTEMPTS
+                record_failure(event, e, status='failed' if exhausted else 'pending')
+
+    return processed
@@ -0,0 +1,130 @@
+import logging
+from contextlib import contextmanager, nullcontext
+from datetime import timedelta
+
+import pika
+from django.conf import settings
+from django.db import connection, transaction
+from django.utils import timezone
+
+from .models import OutboxEvent
+from .rabbitmq_service import get_batch_publisher
+
+logger = logging.getLogger(__name__)
+
+# Tipos de evento
+CHAT_MESSAGE = 'chat_message'  # publicado no RabbitMQ pelo relay
+NOTIFICATION_FANOUT = 'notification_fanout'  # processado por backend.notifications
+
+
+def enqueue_event(event_type, payload):
+    """
+    Registra um evento na transação corrente.
+
+    Deve ser chamado dentro do mesmo transaction.atomic() que grava os dados
+    do evento: se a transação for desfeita o evento também é.
+    """
+    return OutboxEvent.objects.create(event_type=event_type, payload=payload)
+
+
+def enqueue_chat_message(message, **extra):
+    """
+    Registra o evento CHAT_MESSAGE da mensagem, no mesmo formato para todos
+    os pontos de envio (REST e SOAP); extra acrescenta campos (ex.: file_info).
+    """
+    return enqueue_event(CHAT_MESSAGE, {
+        'id': str(message.id),
+        'room': str(message.room_id),
+        'room_name': message.room.name,
+        'sender': str(message.sender_id),
+        'sender_username': message.sender.username,
+        'content': message.content,
+        'timestamp': message.timestamp.isoformat(),
+        'message_type': message.message_type,
+        **extra
+    })
+
+
+@contextmanager
+def claim_pending(event_type, batch_size):
+    """
+    Fornece o próximo lote de eventos pendentes do tipo, em ordem de criação.
+
+    Com vários workers no PostgreSQL cada um trava um lote diferente. No
+    SQLite não há travas por linha, e segurar a transação bloquearia os
+    escritores.
+    """
+    pending = OutboxEvent.objects.filter(status='pending', event_type=event_type).order_by('id')
+
+    if connection.features.has_select_for_update_skip_locked:
+        context = transaction.atomic()
+        pending = pending.select_for_update(skip_locked=True)
+    else:
+        context = nullcontext()
+
+    with context:
+        yield list(pending[:batch_size])
+
+
+def mark_processed(event_ids):
+    OutboxEvent.objects.filter(id__in=event_ids).update(
+        status='published', published_at=timezone.now()
+    )
+
+
+def take_pending(event_id):
+    """
+    Marca o evento como processado se ainda estiver pendente.
+
+    Retorna False se outro worker já o levou: no SQLite claim_pending não
+    trava os eventos e dois relays podem receber o mesmo lote. Chamado na
+    transação do processamento, que desfaz a marcação se ele falhar.
+    """
+    return OutboxEvent.objects.filter(id=event_id, status='pending').update(
+        status='published', published_at=timezone.now()
+    ) == 1
+
+
+def record_failure(event, error, status):
+    event.attempts += 1
+    event.last_error = str(error)
+    event.status = status
+    event.save(update_fields=['attempts', 'last_error', 'status'])
+    logger.error(f"Erro ao processar evento {event.id} do outbox: {error}")
+
+
+def relay_pending(publisher=None, batch_size=None):
+    """
+    Publica um lote de eventos pendentes e retorna quantos foram confirmados.
+
+    O lote inteiro é enviado ao broker antes de aguardar os confirms (um
+    round-trip por lote). Eventos só são marcados como publicados após o
+    confirm; uma queda do relay ou do broker no meio do lote faz os
+    restantes serem reenviados na próxima execução (at-least-once), na
+    mesma ordem.
+    """
+    publisher = publisher or get_batch_publisher()
+    batch_size = batch_size or settings.OUTBOX_BATCH_SIZE
+
+    with claim_pending(CHAT_MESSAGE, batch_size) as events:
+        if not events:
+            return 0
+
+        confirmed, error = publisher.publish_batch([event.payload for event in events])
+        mark_processed([event.id for event in events[:confirmed]])
+        if error is not None:
+            # Falha do broker: o evento continua pendente e a ordem é preservada;
+            # evento inválido não pode bloquear os seguintes
+            broker_error = isinstance(error, (pika.exceptions.AMQPError, OSError))
+            record_failure(events[confirmed], error, status='pending' if broker_error else 'failed')
+
+    return confirmed
+
+
+def purge_published(older_than=None):
+    """Remove eventos já publicados há mais de OUTBOX_RETENTION"""
+    older_than = older_than or timedelta(seconds=settings.OUTBOX_RETENTION)
+    deleted, _ = OutboxEvent.objects.filter(
+        status='published', published_at__lt=timezone.now() - older_than
+    ).delete()
+    return deleted
@@ -0,0 +1,105 @@
+from datetime import timezone as dt_timezone
+from urllib.parse import urlencode
+import uuid
+
+from django.db.models import Q
+from django.utils.dateparse import parse_datetime
+
+# Tamanho padrão e máximo de página para listagens por cursor
+DEFAULT_PAGE_SIZE = 50
+MAX_PAGE_SIZE = 200
+
+
+def encode_cursor(timestamp, pk):
+    """Gera o cursor '<timestamp>,<id>' de um registro (timestamp em UTC)"""
+    timestamp = timestamp.astimezone(dt_timezone.utc)
+    return f"{timestamp.strftime('%Y-%m-%dT%H:%M:%S.%fZ')},{pk}"
+
+
+def decode_cursor(value):
+    """Converte '<timestamp>,<id>' em (datetime, UUID); None se ausente"""
+    if not value:
+        return None
+
+    try:
+        raw_timestamp, raw_id = value.rsplit(',', 1)
+        timestamp = parse_datetime(raw_timestamp.strip())
+        pk = uuid.UUID(raw_id.strip())
+    except ValueError:
+        raise ValueError('Cursor inválido, use <timestamp>,<id>')
+
+    if timestamp is None or timestamp.tzinfo is None:
+        raise ValueError('Cursor inválido, timestamp deve conter fuso horário')
+
+    return timestamp, pk
+
+
+def parse_page_size(value, default=DEFAULT_PAGE_SIZE, maximum=MAX_PAGE_SIZE):
+    """Valida o parâmetro 'limit', limitado a 'maximum'"""
+    if value in (None, ''):
+        return default
+
+    try:
+        size = int(value)
+    except (TypeError, ValueError):
+        raise ValueError('limit deve ser um número inteiro')
+
+    if size < 1:
+        raise ValueError('limit deve ser maior que zero')
+
+    return min(size, maximum)
+
+
+def cursor_filter(cursor, time_field, forward=True):
+    """
+    Filtro de keyset para registros depois (forward) ou antes do cursor
+    na ordem (time_field, id).
+
+    O limite simples em time_field permite que o banco percorra o índice
+    composto como um intervalo; a disjunção só desempata registros com o
+    mesmo timestamp.
+    """
+    timestamp, pk = cursor
+    if forward:
+        return Q(**{f'{time_field}__gte': timestamp}) & (
+            Q(**{f'{time_field}__gt': timestamp}) | Q(id__gt=pk)
+        )
+    return Q(**{f'{time_field}__lte': timestamp}) & (
+        Q(**{f'{time_field}__lt': timestamp}) | Q(id__lt=pk)
+    )
+
+
+def keyset_page(queryset, time_field, limit, after=None, before=None):
+    """
+    Retorna (registros em ordem crescente, has_more) para uma página.
+
+    - after: registros mais novos que o cursor (polling incremental)
+    - before: registros mais antigos que o cursor (histórico)
+    - sem cursor: os registros mais recentes
+
+    has_more indica que existem mais registros na direção percorrida.
+    """
+    ascending = (time_field, 'id')
+    descending = (f'-{time_field}', '-id')
+
+    if after is not None:
+        queryset = queryset.filter(cursor_filter(after, time_field, forward=True))
+        if before is not None:
+            queryset = queryset.filter(cursor_filter(before, time_field, forward=False))
+        rows = list(queryset.order_by(*ascending)[:limit + 1])
+        return rows[:limit], len(rows) > limit
+
+    if before is not None:
+        queryset = queryset.filter(cursor_filter(before, time_field, forward=False))
+
+    rows = list(queryset.order_by(*descending)[:limit + 1])
+    has_more = len(rows) > limit
+    rows = rows[:limit]
+    rows.reverse()
+    return rows, has_more
+
+
+def cursor_link(path, **params):
+    """Monta href com os parâmetros de cursor codificados"""
+    query = urlencode({key: value for key, value in params.items() if value is not None})
+    return f'{path}?{query}' if query else path
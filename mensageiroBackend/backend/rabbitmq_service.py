@@ -1,120 +1,442 @@
 import pika
 import json
 import logging
+import os
+import queue
+import threading
+import time
+from contextlib import contextmanager
 from django.conf import settings
 
 logger = logging.getLogger(__name__)
 
 
+def connection_parameters():
+    credentials = pika.PlainCredentials(
+        settings.RABBITMQ_USER,
+        settings.RABBITMQ_PASS
+    )
+
+    return pika.ConnectionParameters(
+        host=settings.RABBITMQ_HOST,
+        port=settings.RABBITMQ_PORT,
+        virtual_host=settings.RABBITMQ_VHOST,
+        credentials=credentials
+    )
+
+
+def prepare_message(message_data):
+    """Corpo JSON e fila da sala de uma mensagem de chat"""
+    return json.dumps(message_data), f"chat_room_{message_data['room_name']}"
+
+
+class PooledChannel:
+    """Conexão bloqueante com seu canal; usada por uma thread de cada vez"""
+
+    def __init__(self, connection):
+        self.connection = connection
+        self.channel = connection.channel()
+        if settings.RABBITMQ_PUBLISHER_CONFIRMS:
+            # basic_publish só retorna após o ack do broker (NackError/UnroutableError se falhar)
+            self.channel.confirm_delivery()
+
+    @property
+    def is_open(self):
+        return self.connection.is_open and self.channel.is_open
+
+    def close(self):
+        try:
+            if self.connection.is_open:
+                self.connection.close()
+        except Exception as e:
+            logger.error(f"Erro ao fechar conexão: {e}")
+
+
 class RabbitMQService:
-    def __init__(self):
-        self.connection = None
-        self.channel = None
-    
-    def connect(self):
+    """
+    Publicador compartilhado pelo processo.
+
+    Mantém um pool limitado de conexões/canais reaproveitados entre
+    requisições, reconecta com backoff exponencial quando o broker cai e
+    declara cada fila/exchange apenas uma vez por conexão ao broker.
+    """
+
+    def __init__(self, pool_size=None):
+        self.pool_size = pool_size or settings.RABBITMQ_POOL_SIZE
+        self._pool = queue.LifoQueue(maxsize=self.pool_size)
+        self._created = 0
+        self._lock = threading.Lock()
+        self._declared = set()
+        self._failures = 0
+        self._retry_at = 0.0
+
+    def _parameters(self):
+        return connection_parameters()
+
+    def _open(self):
+        """Abre uma nova conexão, respeitando o backoff após falhas"""
+        with self._lock:
+            if time.monotonic() < self._retry_at:
+                raise pika.exceptions.AMQPConnectionError('Aguardando para reconectar ao RabbitMQ')
+
         try:
-            credentials = pika.PlainCredentials(
-                settings.RABBITMQ_USER,
-                settings.RABBITMQ_PASS
-            )
-            
-            parameters = pika.ConnectionParameters(
-                host=settings.RABBITMQ_HOST,
-                port=settings.RABBITMQ_PORT,
-                virtual_host=settings.RABBITMQ_VHOST,
-                credentials=credentials
-            )
-            
-            self.connection = pika.BlockingConnection(parameters)
-            self.channel = self.connection.channel()
-            
-            self.channel.queue_declare(queue='chat_messages', durable=True)
-            self.channel.queue_declare(queue='system_messages', durable=True)
-            
-            self.channel.exchange_declare(
+            pooled = PooledChannel(pika.BlockingConnection(self._parameters()))
+        except Exception:
+            with self._lock:
+                self._failures += 1
+                delay = min(
+                    settings.RABBITMQ_RECONNECT_BACKOFF * 2 ** (self._failures - 1),
+                    settings.RABBITMQ_RECONNECT_BACKOFF_MAX
+                )
+                self._retry_at = time.monotonic() + delay
+            raise
+
+        with self._lock:
+            self._failures = 0
+            self._retry_at = 0.0
+
+        try:
+            self._declare_topology(pooled.channel)
+        except Exception:
+            pooled.close()
+            raise
+        return pooled
+
+    def _declare_topology(self, channel):
+        self._declare_queue(channel, 'chat_messages')
+        self._declare_queue(channel, 'system_messages')
+
+        if 'exchange:chat_exchange' not in self._declared:
+            channel.exchange_declare(
                 exchange='chat_exchange',
                 exchange_type='fanout',
                 durable=True
             )
-            
-            return True
-            
+            self._declared.add('exchange:chat_exchange')
+
+    def _declare_queue(self, channel, name):
+        key = f'queue:{name}'
+        if key not in self._declared:
+            channel.queue_declare(queue=name, durable=True)
+            self._declared.add(key)
+
+    def _acquire(self):
+        try:
+            pooled = self._pool.get_nowait()
+        except queue.Empty:
+            with self._lock:
+                can_create = self._created < self.pool_size
+                if can_create:
+                    self._created += 1
+            if not can_create:
+                pooled = self._pool.get(timeout=settings.RABBITMQ_POOL_TIMEOUT)
+            else:
+                try:
+                    return self._open()
+                except Exception:
+                    with self._lock:
+                        self._created -= 1
+                    raise
+
+        # Processar heartbeats pendentes e detectar conexões encerradas pelo broker
+        try:
+            pooled.connection.process_data_events(time_limit=0)
+        except Exception:
+            pass
+        if not pooled.is_open:
+            self._discard(pooled)
+            return self._acquire()
+        return pooled
+
+    def _release(self, pooled):
+        self._pool.put_nowait(pooled)
+
+    def _discard(self, pooled):
+        pooled.close()
+        with self._lock:
+            self._created -= 1
+            # O broker pode ter reiniciado: declarar novamente na próxima conexão
+            self._declared.clear()
+
+    @contextmanager
+    def channel(self):
+        """Empresta um canal do pool; descarta a conexão se ocorrer erro"""
+        pooled = self._acquire()
+        try:
+            yield pooled.channel
+        except Exception:
+            self._discard(pooled)
+            raise
+        else:
+            self._release(pooled)
+
+    def connect(self):
+        try:
+            with self.channel():
+                return True
         except Exception as e:
             logger.error(f"Erro ao conectar com RabbitMQ: {e}")
             return False
-    
+
     def test_connection(self):
-        try:
-            if not self.connection or self.connection.is_closed:
-                return self.connect()
-            return True
-        except Exception as e:
-            logger.error(f"Erro ao testar conexão: {e}")
-            return False
-    
+        return self.connect()
+
     def get_connection_status(self):
         """Retorna o status da conexão com RabbitMQ"""
-        try:
-            # Tentar conectar se não estiver conectado
-            if not self.connection or self.connection.is_closed:
-                if self.connect():
-                    return 'connected'
-                else:
-                    return 'disconnected'
-            
-            # Se já estiver conectado, testar se ainda está ativo
+        return 'connected' if self.connect() else 'disconnected'
+
+    def publish_to_channel(self, channel, message_data):
+        """Publica no canal já emprestado do pool (fila da sala + chat_exchange)"""
+        message_body, room_queue = prepare_message(message_data)
+        self._declare_queue(channel, room_queue)
+
+        channel.basic_publish(
+            exchange='',
+            routing_key=room_queue,
+            body=message_body,
+            properties=pika.BasicProperties(delivery_mode=2)
+        )
+
+        channel.basic_publish(
+            exchange='chat_exchange',
+            routing_key='',
+            body=message_body,
+            properties=pika.BasicProperties(delivery_mode=2)
+        )
+
+    def publish_message(self, message_data):
+        """Publica de forma síncrona; retorna False se o broker não confirmar"""
+        # Uma nova tentativa cobre conexões do pool encerradas enquanto ociosas
+        for attempt in range(2):
             try:
-                # Fazer uma operação simples para testar a conexão
-                self.channel.queue_declare(queue='health_check', durable=False, auto_delete=True)
-                return 'connected'
+                with self.channel() as channel:
+                    self.publish_to_channel(channel, message_data)
+                return True
+
             except Exception as e:
-                logger.warning(f"Conexão perdida, tentando reconectar: {e}")
-                if self.connect():
-                    return 'connected'
-                else:
-                    return 'disconnected'
-                    
-        except Exception as e:
-            logger.error(f"Erro ao verificar status da conexão: {e}")
-            return 'disconnected'
-    
-    def publish_message(self, message_data):
-        try:
-            if not self.connection or self.connection.is_closed:
-                if not self.connect():
-                    return False
-            
-            message_body = json.dumps(message_data)
-            room_queue = f"chat_room_{message_data['room_name']}"
-            self.channel.queue_declare(queue=room_queue, durable=True)
-            
-            self.channel.basic_publish(
-                exchange='',
-                routing_key=room_queue,
-                body=message_body,
-                properties=pika.BasicProperties(delivery_mode=2)
-            )
-            
-            self.channel.basic_publish(
-                exchange='chat_exchange',
-                routing_key='',
-                body=message_body,
-                properties=pika.BasicProperties(delivery_mode=2)
-            )
-            
-            return True
-            
-        except Exception as e:
-            logger.error(f"Erro ao publicar mensagem: {e}")
-            return False
-    
+                logger.error(f"Erro ao publicar mensagem (tentativa {attempt + 1}): {e}")
+
+        return False
+
     def close_connection(self):
+        while True:
+            try:
+                pooled = self._pool.get_nowait()
+            except queue.Empty:
+                break
+            self._discard(pooled)
+
+
+class BatchPublisher:
+    """
+    Publicador em lote do relay do outbox, com publisher confirms assíncronos.
+
+    No BlockingConnection em modo confirm cada basic_publish espera o ack do
+    broker (dois round-trips por evento). Aqui o lote inteiro é enviado pela
+    SelectConnection e só depois as confirmações são aguardadas: um
+    round-trip por lote. Usado por uma única thread.
+    """
+
+    def __init__(self, timeout=None):
+        self.timeout = timeout or settings.RABBITMQ_CONFIRM_TIMEOUT
+        self._connection = None
+        self._channel = None
+        self._ready = False
+        self._declared = set()
+        self._error = None
+        self._done = None
+        self._next_tag = 1  # delivery tag do próximo basic_publish no canal
+        self._unconfirmed = set()
+        self._nacked = set()
+
+    def publish_batch(self, messages):
+        """
+        Publica as mensagens em ordem e aguarda as confirmações do lote.
+
+        Retorna (confirmadas, erro): quantas mensagens do início do lote o
+        broker confirmou e o erro que impediu a seguinte (None se todas).
+        Uma mensagem inválida encerra o lote; as seguintes não são enviadas.
+        """
+        prepared, invalid = [], None
+        for message_data in messages:
+            try:
+                prepared.append(prepare_message(message_data))
+            except Exception as e:
+                invalid = e
+                break
+
+        if not prepared:
+            return 0, invalid
         try:
-            if self.connection and not self.connection.is_closed:
-                self.connection.close()
+            confirmed = self._publish(prepared)
+        except (pika.exceptions.AMQPError, OSError) as e:
+            logger.error(f"Erro ao publicar lote no RabbitMQ: {e}")
+            self.close()
+            return 0, e
+
+        if confirmed < len(prepared):
+            error = self._error or pika.exceptions.NackError([])
+            # Confirmações pendentes não podem ser contadas no próximo lote
+            self.close()
+            return confirmed, error
+        return confirmed, invalid
+
+    def _publish(self, prepared):
+        self._process_events()
+        if not self._ready:
+            self._connect()
+
+        first = self._next_tag
+        for body, room_queue in prepared:
+            self._declare_queue(room_queue)
+            for exchange, routing_key in (('', room_queue), ('chat_exchange', '')):
+                self._channel.basic_publish(
+                    exchange=exchange,
+                    routing_key=routing_key,
+                    body=body,
+                    properties=pika.BasicProperties(delivery_mode=2)
+                )
+                self._unconfirmed.add(self._next_tag)
+                self._next_tag += 1
+
+        self._run_until(lambda: not self._unconfirmed or self._nacked or self._error is not None)
+        failed = self._unconfirmed | self._nacked
+        # Duas publicações (fila da sala e chat_exchange) por mensagem
+        return (min(failed) - first) // 2 if failed else len(prepared)
+
+    def _connect(self):
+        self.close()
+        self._error = None
+        self._next_tag = 1
+        self._unconfirmed.clear()
+        self._nacked.clear()
+        self._connection = pika.SelectConnection(
+            connection_parameters(),
+            on_open_callback=self._on_connection_open,
+            on_open_error_callback=self._on_connection_error,
+            on_close_callback=self._on_connection_closed
+        )
+        self._run_until(lambda: self._ready or self._error is not None)
+        if not self._ready:
+            error = self._error or pika.exceptions.AMQPConnectionError('Tempo esgotado ao conectar')
+            self.close()
+            raise error
+
+    def _declare_queue(self, name):
+        if name not in self._declared:
+            self._channel.queue_declare(queue=name, durable=True)
+            self._declared.add(name)
+
+    def _process_events(self):
+        # Heartbeats e fechamentos ocorridos enquanto o relay estava parado
+        if self._connection is not None and self._ready:
+            self._connection.ioloop.call_later(0, self._connection.ioloop.stop)
+            self._connection.ioloop.start()
+
+    def _run_until(self, done):
+        """Roda o ioloop até done() ou o timeout"""
+        if done():
+            return
+        ioloop = self._connection.ioloop
+
+        def timed_out():
+            self._fail(pika.exceptions.AMQPConnectionError(f'Sem resposta do RabbitMQ em {self.timeout} s'))
+            ioloop.stop()
+
+        self._done = done
+        timer = ioloop.call_later(self.timeout, timed_out)
+        try:
+            ioloop.start()
+        finally:
+            ioloop.remove_timeout(timer)
+            self._done = None
+
+    def _check(self):
+        if self._done is not None and self._done():
+            self._connection.ioloop.stop()
+
+    def _fail(self, error):
+        self._ready = False
+        if self._error is None:
+            self._error = error if isinstance(error, Exception) else pika.exceptions.AMQPConnectionError(error)
+        self._check()
+
+    def _on_connection_open(self, connection):
+        connection.channel(on_open_callback=self._on_channel_open)
+
+    def _on_connection_error(self, connection, error):
+        self._fail(error)
+
+    def _on_connection_closed(self, connection, reason):
+        self._channel = None
+        self._fail(reason)
+
+    def _on_channel_open(self, channel):
+        self._channel = channel
+        channel.add_on_close_callback(self._on_channel_closed)
+        channel.confirm_delivery(ack_nack_callback=self._on_confirm, callback=self._on_confirm_mode)
+
+    def _on_channel_closed(self, channel, reason):
+        self._fail(reason)
+
+    def _on_confirm_mode(self, frame):
+        self._declare_queue('chat_messages')
+        self._declare_queue('system_messages')
+        self._channel.exchange_declare(exchange='chat_exchange', exchange_type='fanout', durable=True)
+        self._ready = True
+        self._check()
+
+    def _on_confirm(self, frame):
+        method = frame.method
+        if method.multiple:
+            tags = {tag for tag in self._unconfirmed if tag <= method.delivery_tag}
+        else:
+            tags = {method.delivery_tag}
+        self._unconfirmed -= tags
+        if isinstance(method, pika.spec.Basic.Nack):
+            self._nacked |= tags
+        self._check()
+
+    def close(self):
+        connection = self._connection
+        self._channel = None
+        self._ready = False
+        self._declared.clear()
+        if connection is None:
+            return
+        try:
+            if not (connection.is_closed or connection.is_closing):
+                connection.close()
+            self._run_until(lambda: connection.is_closed)
+            connection.ioloop.close()
         except Exception as e:
             logger.error(f"Erro ao fechar conexão: {e}")
+        finally:
+            self._connection = None
+
+
+_service = None
+_service_pid = None
+_service_lock = threading.Lock()
+_batch_publisher = None
+_batch_publisher_pid = None
 
 
 def get_rabbitmq_service():
-    return RabbitMQService() 
\ No newline at end of file
+    """Retorna o publicador do processo (recriado após fork de workers)"""
+    global _service, _service_pid
+    if _service is None or _service_pid != os.getpid():
+        with _service_lock:
+            if _service is None or _service_pid != os.getpid():
+                _service = RabbitMQService()
+                _service_pid = os.getpid()
+    return _service
+
+
+def get_batch_publisher():
+    """Retorna o publicador em lote do processo (o relay usa uma só thread)"""
+    global _batch_publisher, _batch_publisher_pid
+    if _batch_publisher is None or _batch_publisher_pid != os.getpid():
+        _batch_publisher = BatchPublisher()
+        _batch_publisher_pid = os.getpid()
+    return _batch_publisher
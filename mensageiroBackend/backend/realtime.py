@@ -0,0 +1,64 @@
+import hashlib
+import json
+import logging
+import re
+
+from asgiref.sync import async_to_sync
+from channels.layers import get_channel_layer
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import transaction
+
+from .pagination import encode_cursor
+from .serializers import MessageSerializer
+
+logger = logging.getLogger(__name__)
+
+# Nomes de grupo aceitos pelo channel layer (sem '.', reservado para o hash)
+_VALID_GROUP_NAME = re.compile(r'^[a-zA-Z0-9_-]{1,80}$')
+
+
+def room_group_name(room_name):
+    """Nome do grupo do channel layer para a sala"""
+    if _VALID_GROUP_NAME.match(room_name):
+        return f'chat_{room_name}'
+    # Nomes com acentos/espaços não são válidos como grupo: usar um hash estável
+    digest = hashlib.sha1(room_name.encode('utf-8')).hexdigest()[:20]
+    return f'chat.{digest}'
+
+
+def message_payload(message):
+    """Mensagem no mesmo formato do REST, serializável pelo channel layer"""
+    return json.loads(json.dumps(MessageSerializer(message).data, cls=DjangoJSONEncoder))
+
+
+def message_event(message):
+    """Evento 'message.created' tratado por ChatConsumer.message_created"""
+    return {
+        'type': 'message.created',
+        'message': message_payload(message),
+        'cursor': encode_cursor(message.timestamp, message.id),
+    }
+
+
+def broadcast_message(message):
+    """Envia a mensagem persistida ao grupo chat_<sala> após o commit"""
+    transaction.on_commit(lambda: _group_send(message.room.name, lambda: message_event(message)))
+
+
+def disconnect_member(room, user):
+    """Após o commit, fecha os WebSockets do usuário na sala (ChatConsumer.member_left)"""
+    transaction.on_commit(lambda: _group_send(room.name, lambda: {
+        'type': 'member.left',
+        'user_id': str(user.id),
+    }))
+
+
+def _group_send(room_name, build_event):
+    channel_layer = get_channel_layer()
+    if channel_layer is None:
+        return
+
+    try:
+        async_to_sync(channel_layer.group_send)(room_group_name(room_name), build_event())
+    except Exception as e:
+        logger.error(f"Erro ao enviar evento ao channel layer: {e}")
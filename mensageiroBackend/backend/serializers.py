@@ -48,14 +48,10 @@ class UserLoginSerializer(serializers.Serializer):
             raise serializers.ValidationError("Username e password são obrigatórios.")
 
 class ChatRoomSerializer(serializers.ModelSerializer):
-    message_count = serializers.SerializerMethodField()
-
     class Meta:
         model = ChatRoom
-        fields = ['id', 'name', 'created_at', 'updated_at', 'message_count']
-
-    def get_message_count(self, obj):
-        return obj.messages.count()
+        fields = ['id', 'name', 'created_at', 'updated_at', 'message_count', 'last_message_at']
+        read_only_fields = ['id', 'created_at', 'updated_at', 'message_count', 'last_message_at']
 
 class MessageSerializer(serializers.ModelSerializer):
     sender_username = serializers.CharField(source='sender.username', read_only=True)
@@ -0,0 +1,79 @@
+from django.db import connection
+from django.db.models import F, OuterRef, Subquery, Value
+from django.db.models.functions import Coalesce, Greatest
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from .models import ArchivedMessage, ChatRoom, Message, Notification, User
+from .notification_counts import count_change, forget_user
+
+
+def latest_message_timestamp():
+    """
+    Subquery com o timestamp da mensagem mais recente da sala (usa o índice
+    room/timestamp), no arquivo se não restar nenhuma na tabela quente
+    """
+    return Coalesce(*(
+        Subquery(model.objects.filter(room=OuterRef('pk')).order_by('-timestamp').values('timestamp')[:1])
+        for model in (Message, ArchivedMessage)
+    ))
+
+
+def delete_without_signals(model, field_name, values):
+    """
+    DELETE direto no banco das linhas com field_name em values.
+
+    Não carrega os objetos nem dispara post_delete: os contadores acima não
+    mudam (mensagens arquivadas continuam contadas; limpeza de benchmarks).
+    Retorna quantas linhas foram removidas.
+    """
+    field = model._meta.get_field(field_name)
+    values = [field.get_db_prep_value(value, connection) for value in values]
+    if not values:
+        return 0
+    with connection.cursor() as cursor:
+        cursor.execute(
+            f'DELETE FROM {connection.ops.quote_name(model._meta.db_table)} '
+            f'WHERE {connection.ops.quote_name(field.column)} IN ({", ".join(["%s"] * len(values))})',
+            values
+        )
+        return cursor.rowcount
+
+
+@receiver(post_save, sender=Message)
+def count_created_message(sender, instance, created, **kwargs):
+    """Atualiza o contador da sala com um UPDATE atômico, sem COUNT sobre as mensagens"""
+    # loaddata (raw) traz a sala com os contadores já calculados
+    if not created or kwargs.get('raw'):
+        return
+    timestamp = Value(instance.timestamp)
+    ChatRoom.objects.filter(pk=instance.room_id).update(
+        message_count=F('message_count') + 1,
+        last_message_at=Greatest(Coalesce(F('last_message_at'), timestamp), timestamp)
+    )
+
+
+@receiver(post_delete, sender=Message)
+def count_deleted_message(sender, instance, **kwargs):
+    ChatRoom.objects.filter(pk=instance.room_id, message_count__gt=0).update(
+        message_count=F('message_count') - 1,
+        last_message_at=latest_message_timestamp()
+    )
+
+
+@receiver(post_save, sender=Notification)
+def count_created_notification(sender, instance, created, **kwargs):
+    """Criações individuais; bulk_create e update() ajustam os contadores onde são feitos"""
+    if created and not kwargs.get('raw'):
+        count_change(instance.user_id, total=1, unread=0 if instance.is_read else 1)
+
+
+@receiver(post_delete, sender=Notification)
+def count_deleted_notification(sender, instance, **kwargs):
+    count_change(instance.user_id, total=-1, unread=0 if instance.is_read else -1)
+
+
+@receiver(post_save, sender=User)
+def forget_cached_username(sender, instance, created, **kwargs):
+    if not created:
+        forget_user(instance.id)
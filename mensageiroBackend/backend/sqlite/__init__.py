@@ -0,0 +1,57 @@
+"""
+Ajustes do SQLite para implantações em um único servidor.
+
+Cada conexão nova recebe os PRAGMAs de SQLITE_PRAGMAS. Em modo WAL quem
+lê (polling do get_messages) não bloqueia quem escreve (send_message,
+uploads do serviço SOAP em outro processo) e vice-versa; o checkpoint
+devolve as páginas do WAL ao arquivo principal.
+"""
+from django.conf import settings
+from django.db.backends.signals import connection_created
+from django.dispatch import receiver
+
+CHECKPOINT_MODES = ('PASSIVE', 'FULL', 'RESTART', 'TRUNCATE')
+
+
+@receiver(connection_created)
+def apply_pragmas(sender, connection, **kwargs):
+    if connection.vendor != 'sqlite':
+        return
+    with connection.cursor() as cursor:
+        # busy_timeout primeiro: a troca de journal_mode também espera a trava
+        for name, value in settings.SQLITE_PRAGMAS.items():
+            cursor.execute(f'PRAGMA {name} = {value}')
+
+
+def pragma(connection, name):
+    with connection.cursor() as cursor:
+        cursor.execute(f'PRAGMA {name}')
+        return cursor.fetchone()[0]
+
+
+def status(connection):
+    """Modo do journal, tamanho do banco e páginas livres (recuperáveis com VACUUM)"""
+    page_size = pragma(connection, 'page_size')
+    return {
+        'journal_mode': pragma(connection, 'journal_mode'),
+        'size': pragma(connection, 'page_count') * page_size,
+        'free': pragma(connection, 'freelist_count') * page_size,
+    }
+
+
+def checkpoint(connection, mode='TRUNCATE'):
+    """
+    Copia o WAL para o banco; TRUNCATE também zera o arquivo -wal.
+    Retorna (ocupado, páginas no WAL, páginas copiadas).
+    """
+    if mode not in CHECKPOINT_MODES:
+        raise ValueError(f'Modo de checkpoint inválido: {mode}')
+    with connection.cursor() as cursor:
+        cursor.execute(f'PRAGMA wal_checkpoint({mode})')
+        return cursor.fetchone()
+
+
+def vacuum(connection):
+    """Reescreve o banco sem as páginas livres; escritores esperam até o fim"""
+    with connection.cursor() as cursor:
+        cursor.execute('VACUUM')
@@ -0,0 +1,15 @@
+"""
+Backend SQLite do Django com transações BEGIN IMMEDIATE.
+
+Com o BEGIN padrão (DEFERRED) a transação só pede a trava de escrita no
+primeiro INSERT/UPDATE; se outro processo gravou depois da sua primeira
+leitura, o SQLite responde "database is locked" na hora, sem esperar o
+busy_timeout. Pedindo a trava no início os escritores esperam a vez.
+Equivale ao OPTIONS['transaction_mode'] do Django 5.1.
+"""
+from django.db.backends.sqlite3 import base
+
+
+class DatabaseWrapper(base.DatabaseWrapper):
+    def _start_transaction_under_autocommit(self):
+        self.cursor().execute('BEGIN IMMEDIATE')
@@ -0,0 +1,226 @@
+"""
+Armazenamento dos arquivos enviados.
+
+O conteúdo fica em blobs endereçados pelo SHA-256
+(UPLOAD_DIR/blobs/ab/cd/<sha256>): o mesmo arquivo compartilhado em
+várias salas é gravado uma única vez e nenhum diretório acumula mais que
+uma fração dos arquivos (65.536 subdiretórios). Cada StoredFile é uma
+referência ao blob; blobs sem referências são removidos por
+collect_garbage.
+
+Arquivos anteriores ficam em UPLOAD_DIR como '<file_id>_<nome>' até
+serem movidos por migrate_legacy_files.
+"""
+import hashlib
+import os
+import re
+import time
+from itertools import islice
+
+from django.conf import settings
+from django.core.exceptions import ValidationError
+
+from .models import StoredFile
+from .pagination import cursor_filter
+
+SHA256_RE = re.compile(r'^[0-9a-f]{64}$')
+
+# Blobs consultados no banco por vez durante a coleta
+GC_BATCH_SIZE = 500
+# Sufixo do blob renomeado pela coleta antes de ser removido
+TOMBSTONE_SUFFIX = '.gc'
+# Blocos lidos ao conferir o hash de arquivos antigos
+HASH_CHUNK_SIZE = 1024 * 1024
+
+
+def find_stored_file(file_id):
+    """Busca o arquivo pela chave primária; None se o id não existir ou for inválido"""
+    try:
+        return StoredFile.objects.select_related('room', 'uploader').filter(id=file_id).first()
+    except (ValidationError, ValueError):
+        return None
+
+
+def stored_file_path(stored):
+    """Caminho absoluto do arquivo em disco"""
+    return os.path.join(settings.UPLOAD_DIR, stored.path)
+
+
+def blob_path(sha256):
+    """Caminho do blob relativo a UPLOAD_DIR, em dois níveis de prefixo do hash"""
+    return os.path.join(settings.BLOB_DIR, sha256[:2], sha256[2:4], sha256)
+
+
+def store_blob(temp_path, sha256):
+    """
+    Move o arquivo recebido para o blob do seu conteúdo e retorna o
+    caminho relativo.
+
+    Se o blob já existe o arquivo temporário é descartado, sem nova
+    escrita; o mtime do blob é renovado para que a coleta não o remova
+    antes de o StoredFile ser criado.
+    """
+    relative = blob_path(sha256)
+    target = os.path.join(settings.UPLOAD_DIR, relative)
+
+    try:
+        os.utime(target)
+    except FileNotFoundError:
+        os.makedirs(os.path.dirname(target), exist_ok=True)
+        os.replace(temp_path, target)
+    else:
+        os.remove(temp_path)
+
+    return relative
+
+
+def _iter_blobs(root, cutoff):
+    for directory, _, names in os.walk(root):
+        for name in names:
+            path = os.path.join(directory, name)
+            try:
+                if name.endswith(TOMBSTONE_SUFFIX) and SHA256_RE.match(name[:-len(TOMBSTONE_SUFFIX)]):
+                    # Coleta anterior interrompida: devolve o blob e decide de novo
+                    name, path = name[:-len(TOMBSTONE_SUFFIX)], path[:-len(TOMBSTONE_SUFFIX)]
+                    os.replace(path + TOMBSTONE_SUFFIX, path)
+                if SHA256_RE.match(name) and os.path.getmtime(path) <= cutoff:
+                    yield name, path
+            except FileNotFoundError:
+                continue
+
+
+def _remove_blob(sha256, path, cutoff):
+    """
+    Remove o blob se continuar sem referências; retorna o tamanho liberado
+    ou None se ele foi mantido.
+
+    O blob é renomeado antes da última verificação: a partir daí um upload
+    do mesmo conteúdo não o encontra (store_blob grava um blob novo), e um
+    upload que o reutilizou antes do rename aparece no mtime ou no banco.
+    """
+    tombstone = path + TOMBSTONE_SUFFIX
+    try:
+        os.rename(path, tombstone)
+    except FileNotFoundError:
+        return None
+
+    stat = os.stat(tombstone)
+    if stat.st_mtime > cutoff or StoredFile.objects.filter(sha256=sha256).exists():
+        # Mesmo conteúdo: substituir um blob gravado nesse meio tempo é inofensivo
+        os.replace(tombstone, path)
+        return None
+
+    os.remove(tombstone)
+    return stat.st_size
+
+
+def collect_garbage(grace=None, dry_run=False):
+    """
+    Remove blobs que nenhum StoredFile referencia.
+
+    Blobs modificados há menos de `grace` segundos são mantidos: o upload
+    grava o blob antes de criar o StoredFile. Retorna (blobs removidos,
+    bytes liberados).
+    """
+    grace = settings.BLOB_GC_GRACE if grace is None else grace
+    root = os.path.join(settings.UPLOAD_DIR, settings.BLOB_DIR)
+    cutoff = time.time() - grace
+    removed = freed = 0
+
+    blobs = _iter_blobs(root, cutoff)
+    while batch := list(islice(blobs, GC_BATCH_SIZE)):
+        referenced = set(
+            StoredFile.objects.filter(sha256__in=[sha256 for sha256, _ in batch])
+            .values_list('sha256', flat=True)
+        )
+        for sha256, path in batch:
+            if sha256 in referenced:
+                continue
+            if dry_run:
+                try:
+                    stat = os.stat(path)
+                except FileNotFoundError:
+                    continue
+                size = None if stat.st_mtime > cutoff else stat.st_size
+            else:
+                size = _remove_blob(sha256, path, cutoff)
+            if size is not None:
+                removed += 1
+                freed += size
+
+    return removed, freed
+
+
+def file_sha256(path):
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for block in iter(lambda: f.read(HASH_CHUNK_SIZE), b''):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def legacy_files():
+    """StoredFile ainda no diretório plano de UPLOAD_DIR"""
+    return StoredFile.objects.exclude(path__startswith=settings.BLOB_DIR + os.sep)
+
+
+def migrate_legacy_file(stored):
+    """
+    Move um arquivo do diretório plano para o blob do seu conteúdo.
+
+    Pode rodar com o serviço no ar: o blob é criado por hard link (o
+    arquivo antigo continua válido), o caminho é trocado no banco só se
+    ainda for o antigo e só então o arquivo antigo é removido; downloads
+    já abertos seguem lendo o mesmo inode. Retorna False se o arquivo não
+    existir ou não corresponder ao sha256 registrado.
+    """
+    legacy_path = stored_file_path(stored)
+    try:
+        sha256 = file_sha256(legacy_path)
+    except FileNotFoundError:
+        return False
+    if sha256 != stored.sha256:
+        return False
+
+    relative = blob_path(sha256)
+    target = os.path.join(settings.UPLOAD_DIR, relative)
+    os.makedirs(os.path.dirname(target), exist_ok=True)
+    try:
+        os.link(legacy_path, target)
+    except FileExistsError:
+        pass
+    # Renova o mtime para a coleta não remover o blob antes do UPDATE
+    os.utime(target)
+
+    updated = StoredFile.objects.filter(id=stored.id, path=stored.path).update(path=relative)
+    if updated and not StoredFile.objects.filter(path=stored.path).exists():
+        os.remove(legacy_path)
+    return bool(updated)
+
+
+def migrate_legacy_files(batch_size=500, limit=None):
+    """
+    Migra arquivos antigos em lotes; retorna (migrados, ignorados).
+
+    Percorre por cursor (created_at, id) no índice stored_files_ts_idx: os
+    ignorados continuam em legacy_files() sem que cada lote precise excluí-los.
+    """
+    migrated = skipped = 0
+    cursor = None
+
+    while limit is None or migrated + skipped < limit:
+        size = batch_size if limit is None else min(batch_size, limit - migrated - skipped)
+        pending = legacy_files()
+        if cursor is not None:
+            pending = pending.filter(cursor_filter(cursor, 'created_at'))
+        batch = list(pending.order_by('created_at', 'id')[:size])
+        if not batch:
+            break
+        for stored in batch:
+            if migrate_legacy_file(stored):
+                migrated += 1
+            else:
+                skipped += 1
+        cursor = (batch[-1].created_at, batch[-1].id)
+
+    return migrated, skipped
@@ -0,0 +1,21 @@
+from django.test.runner import DiscoverRunner
+from django.test.utils import override_settings
+
+
+class TestRunner(DiscoverRunner):
+    """Roda os testes com o cache em memória local, sem exigir o Redis de CACHES.
+
+    Testes que precisam do cache compartilhado entre processos sobrescrevem
+    CACHES com TEST_CACHE_REDIS_URL.
+    """
+
+    def setup_test_environment(self, **kwargs):
+        super().setup_test_environment(**kwargs)
+        self._local_cache = override_settings(CACHES={
+            'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'}
+        })
+        self._local_cache.enable()
+
+    def teardown_test_environment(self, **kwargs):
+        self._local_cache.disable()
+        super().teardown_test_environment(**kwargs)
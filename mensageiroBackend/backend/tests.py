@@ -1,3 +1,1539 @@
-from django.test import TestCase
+import asyncio
+import base64
+import hashlib
+import io
+import itertools
+import json
+import logging
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+import tracemalloc
+import uuid
+from datetime import timedelta
+from types import SimpleNamespace
+from unittest import mock, skipUnless
+from xml.etree import ElementTree
 
-# Create your tests here.
+import pika
+import redis
+from asgiref.sync import sync_to_async
+from channels.testing import WebsocketCommunicator
+from channels_redis.core import RedisChannelLayer
+from django.conf import settings
+from django.core.cache import cache
+from django.core.management import call_command
+from django.db import connection, transaction
+from django.test import SimpleTestCase, TestCase, TransactionTestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+from rest_framework.test import APIClient, APIRequestFactory
+
+from mensageiroBackend.asgi import application
+
+from .archive import archive_messages
+from .checks import check_shared_cache
+from .downloads import parse_range
+from .membership import is_member
+from .models import ArchivedMessage, ChatRoom, Message, Notification, OutboxEvent, RoomMembership, StoredFile, User
+from .notifications import fan_out_notifications, process_fanouts
+from .outbox import relay_pending
+from .rabbitmq_service import BatchPublisher, RabbitMQService, get_rabbitmq_service
+from .realtime import room_group_name
+from .serializers import UserLoginSerializer
+from .storage import collect_garbage, migrate_legacy_files, stored_file_path
+from .views import MessageViewSet
+from soap_service import server as soap_server
+from soap_service import telemetry
+from soap_service.mtom import MultipartReader, parse_content_type
+from soap_service.soap_stream import parse_soap_request
+
+
+class GetMessagesCursorTests(TestCase):
+    """Paginação por cursor em /api/messages/<room_name>/"""
+
+    def setUp(self):
+        self.client = APIClient()
+        self.room = ChatRoom.objects.create(name='geral')
+        self.user = User.objects.create(username='ana', password='x')
+        self.messages = [
+            Message.objects.create(room=self.room, sender=self.user, content=f'msg {i}')
+            for i in range(5)
+        ]
+
+    def get(self, **params):
+        return self.client.get('/api/messages/geral/', params)
+
+    def test_without_cursor_returns_latest_page(self):
+        response = self.get(limit=2)
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual([m['content'] for m in response.data['messages']], ['msg 3', 'msg 4'])
+        self.assertTrue(response.data['has_more'])
+
+    def test_after_returns_only_new_messages(self):
+        cursor = self.get(limit=2).data['next_cursor']
+        self.assertEqual(self.get(after=cursor).data['messages'], [])
+
+        Message.objects.create(room=self.room, sender=self.user, content='nova')
+        response = self.get(after=cursor)
+
+        self.assertEqual([m['content'] for m in response.data['messages']], ['nova'])
+        self.assertNotEqual(response.data['next_cursor'], cursor)
+
+    def test_before_walks_history(self):
+        cursor = self.get(limit=2).data['prev_cursor']
+        response = self.get(before=cursor, limit=2)
+
+        self.assertEqual([m['content'] for m in response.data['messages']], ['msg 1', 'msg 2'])
+        self.assertTrue(response.data['has_more'])
+
+    def test_invalid_cursor_is_rejected(self):
+        self.assertEqual(self.get(after='invalido').status_code, 400)
+        self.assertEqual(self.get(limit=0).status_code, 400)
+
+
+# Testes do consumer não dependem de um Redis rodando
+IN_MEMORY_CHANNEL_LAYERS = {'default': {'BACKEND': 'channels.layers.InMemoryChannelLayer'}}
+
+# Dois bancos de um redis-server local fazem o papel de duas instâncias
+TEST_REDIS_HOSTS = os.environ.get('TEST_REDIS_HOSTS', 'redis://localhost:6379/14,redis://localhost:6379/15').split(',')
+
+
+def redis_available(urls):
+    try:
+        return all(redis.Redis.from_url(url, socket_connect_timeout=0.2).ping() for url in urls)
+    except redis.RedisError:
+        return False
+
+
+# Banco do redis-server local para o cache compartilhado entre processos
+TEST_CACHE_REDIS_URL = os.environ.get('TEST_CACHE_REDIS_URL', 'redis://localhost:6379/13')
+SHARED_CACHES = {
+    'default': {'BACKEND': 'django.core.cache.backends.redis.RedisCache', 'LOCATION': TEST_CACHE_REDIS_URL}
+}
+
+
+def run_in_other_process(code):
+    """Executa código num processo Django separado (manage.py shell) com o banco de teste e SHARED_CACHES"""
+    env = dict(os.environ, CACHE_REDIS_URL=TEST_CACHE_REDIS_URL)
+    env['POSTGRES_DB' if connection.vendor == 'postgresql' else 'SQLITE_PATH'] = str(connection.settings_dict['NAME'])
+    result = subprocess.run(
+        [sys.executable, 'manage.py', 'shell', '-c', code],
+        cwd=settings.BASE_DIR, env=env, capture_output=True, text=True
+    )
+    if result.returncode:
+        raise AssertionError(result.stderr)
+
+
+@override_settings(CHANNEL_LAYERS=IN_MEMORY_CHANNEL_LAYERS)
+class ChatConsumerTests(TransactionTestCase):
+    """Push de mensagens persistidas e retomada por last_id no ChatConsumer"""
+
+    def setUp(self):
+        self.room = ChatRoom.objects.create(name='geral')
+        self.user = User.objects.create(username='ana', password='x')
+        RoomMembership.objects.create(room=self.room, user=self.user)
+        self.first = Message.objects.create(room=self.room, sender=self.user, content='primeira')
+
+    async def connect(self, query=''):
+        communicator = WebsocketCommunicator(application, f'/ws/chat/geral/?user_id={self.user.id}{query}')
+        connected, _ = await communicator.connect()
+        self.assertTrue(connected)
+        return communicator
+
+    async def test_non_member_is_rejected(self):
+        outsider = await sync_to_async(User.objects.create)(username='bia', password='x')
+        communicator = WebsocketCommunicator(application, f'/ws/chat/geral/?user_id={outsider.id}')
+
+        connected, code = await communicator.connect()
+
+        self.assertFalse(connected)
+        self.assertEqual(code, 4403)
+
+    async def test_persisted_message_is_pushed_to_room_group(self):
+        communicator = await self.connect()
+
+        await sync_to_async(APIClient().post)('/api/send-message/', {
+            'room_name': 'geral', 'sender_id': str(self.user.id), 'content': 'olá'
+        }, format='json')
+        event = await communicator.receive_json_from()
+
+        self.assertEqual(event['type'], 'message')
+        self.assertEqual(event['message']['content'], 'olá')
+        self.assertIn(',', event['cursor'])
+        await communicator.disconnect()
+
+    async def test_leaving_the_room_closes_the_socket(self):
+        communicator = await self.connect()
+
+        await sync_to_async(APIClient().post)(
+            f'/api/rooms/{self.room.id}/leave/', {'user_id': str(self.user.id)}, format='json'
+        )
+
+        self.assertEqual(await communicator.receive_output(), {'type': 'websocket.close', 'code': 4403})
+
+    async def test_invalid_user_id_is_rejected(self):
+        communicator = WebsocketCommunicator(application, '/ws/chat/geral/?user_id=invalido')
+
+        connected, code = await communicator.connect()
+
+        self.assertFalse(connected)
+        self.assertEqual(code, 4403)
+
+    async def test_reconnect_resumes_from_last_seen_id(self):
+        await sync_to_async(Message.objects.create)(room=self.room, sender=self.user, content='perdida')
+        communicator = await self.connect(f'&last_id={self.first.id}')
+
+        event = await communicator.receive_json_from()
+
+        self.assertEqual(event['type'], 'history')
+        self.assertEqual([m['content'] for m in event['messages']], ['perdida'])
+        self.assertFalse(event['has_more'])
+        await communicator.disconnect()
+
+    async def test_unknown_last_id_asks_for_reload(self):
+        communicator = await self.connect('&last_id=invalido')
+
+        event = await communicator.receive_json_from()
+
+        self.assertEqual(event['type'], 'resume_failed')
+        await communicator.disconnect()
+
+
+@skipUnless(redis_available(TEST_REDIS_HOSTS), 'redis-server indisponível')
+class ShardedChannelLayerTests(SimpleTestCase):
+    """Grupos de salas distribuídos entre instâncias Redis"""
+
+    def setUp(self):
+        self.layer = RedisChannelLayer(hosts=TEST_REDIS_HOSTS, prefix=f'teste{uuid.uuid4().hex[:8]}')
+
+    async def test_group_send_reaches_members_on_every_shard(self):
+        # Uma sala por instância: os grupos ficam em Redis diferentes
+        groups = {}
+        for index in range(100):
+            group = room_group_name(f'sala{index}')
+            groups.setdefault(self.layer.consistent_hash(group), group)
+        self.assertEqual(len(groups), len(TEST_REDIS_HOSTS))
+
+        for group in groups.values():
+            channels = [await self.layer.new_channel() for _ in range(3)]
+            for channel in channels:
+                await self.layer.group_add(group, channel)
+
+            await self.layer.group_send(group, {'type': 'message.created', 'group': group})
+
+            for channel in channels:
+                event = await asyncio.wait_for(self.layer.receive(channel), 2)
+                self.assertEqual(event['group'], group)
+
+        await self.layer.flush()
+        await self.layer.close_pools()
+
+
+class RabbitMQServiceTests(SimpleTestCase):
+    """Pool de canais e cache de declarações do publicador"""
+
+    def message(self, room='geral'):
+        return {'id': '1', 'room_name': room, 'content': 'olá'}
+
+    @mock.patch('backend.rabbitmq_service.pika.BlockingConnection')
+    def test_reuses_connection_and_declares_once(self, connection_class):
+        service = RabbitMQService(pool_size=2)
+        channel = connection_class.return_value.channel.return_value
+
+        for _ in range(100):
+            self.assertTrue(service.publish_message(self.message()))
+
+        connection_class.assert_called_once()
+        declared = [call.kwargs['queue'] for call in channel.queue_declare.call_args_list]
+        self.assertEqual(sorted(declared), ['chat_messages', 'chat_room_geral', 'system_messages'])
+        channel.exchange_declare.assert_called_once()
+        self.assertEqual(channel.basic_publish.call_count, 200)
+
+    @mock.patch('backend.rabbitmq_service.pika.BlockingConnection')
+    def test_broken_connection_is_replaced(self, connection_class):
+        service = RabbitMQService(pool_size=1)
+        channel = connection_class.return_value.channel.return_value
+        channel.basic_publish.side_effect = [pika.exceptions.StreamLostError('perdida'), None, None]
+
+        self.assertTrue(service.publish_message(self.message()))
+        self.assertEqual(connection_class.call_count, 2)
+
+    @mock.patch('backend.rabbitmq_service.pika.BlockingConnection')
+    def test_backoff_after_connection_failure(self, connection_class):
+        service = RabbitMQService(pool_size=1)
+        connection_class.side_effect = pika.exceptions.AMQPConnectionError('recusada')
+
+        self.assertFalse(service.publish_message(self.message()))
+        self.assertFalse(service.publish_message(self.message()))
+
+        # A segunda chamada não tenta conectar enquanto o backoff não expira
+        connection_class.assert_called_once()
+
+    def test_service_is_shared_by_the_process(self):
+        self.assertIs(get_rabbitmq_service(), get_rabbitmq_service())
+
+
+class FakeSelectConnection:
+    """Broker simulado: cada volta do ioloop abre o canal e confirma o que foi publicado"""
+
+    def __init__(self, parameters, on_open_callback, on_open_error_callback, on_close_callback, nack=()):
+        self.is_closed = self.is_closing = False
+        self.nack = set(nack)  # delivery tags rejeitadas
+        self.published = self.confirmed = 0
+        self.events = [lambda: on_open_callback(self)]
+        self.ioloop = mock.Mock()
+        self.ioloop.start.side_effect = self.run
+        self.channel_ = mock.Mock()
+        self.channel_.confirm_delivery.side_effect = self.confirm_delivery
+        self.channel_.basic_publish.side_effect = self.basic_publish
+
+    def channel(self, on_open_callback):
+        self.events.append(lambda: on_open_callback(self.channel_))
+
+    def confirm_delivery(self, ack_nack_callback, callback):
+        self.on_confirm = ack_nack_callback
+        self.events.append(lambda: callback(None))
+
+    def basic_publish(self, **kwargs):
+        self.published += 1
+
+    def close(self):
+        self.is_closed = True
+
+    def run(self):
+        while self.events:
+            self.events.pop(0)()
+        for tag in range(self.confirmed + 1, self.published + 1):
+            method = pika.spec.Basic.Nack(tag) if tag in self.nack else pika.spec.Basic.Ack(tag)
+            self.on_confirm(SimpleNamespace(method=method))
+        self.confirmed = self.published
+
+
+class BatchPublisherTests(SimpleTestCase):
+    """Lotes do relay publicados com confirms assíncronos"""
+
+    def setUp(self):
+        self.connections = []
+        patcher = mock.patch('backend.rabbitmq_service.pika.SelectConnection', side_effect=self.connect)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.nack = ()
+
+    def connect(self, *args, **kwargs):
+        connection = FakeSelectConnection(*args, **kwargs, nack=self.nack)
+        self.connections.append(connection)
+        return connection
+
+    def messages(self, count):
+        return [{'id': str(index), 'room_name': 'geral', 'content': 'olá'} for index in range(count)]
+
+    def test_batch_is_published_before_waiting_for_confirms(self):
+        publisher = BatchPublisher()
+
+        self.assertEqual(publisher.publish_batch(self.messages(50)), (50, None))
+        self.assertEqual(publisher.publish_batch(self.messages(50)), (50, None))
+
+        connection, = self.connections
+        self.assertEqual(connection.channel_.basic_publish.call_count, 200)
+        # Conexão, confirms do primeiro lote e, no segundo, eventos pendentes + confirms
+        self.assertEqual(connection.ioloop.start.call_count, 4)
+        declared = [call.kwargs['queue'] for call in connection.channel_.queue_declare.call_args_list]
+        self.assertEqual(declared, ['chat_messages', 'system_messages', 'chat_room_geral'])
+
+    def test_nack_confirms_only_the_messages_before_it(self):
+        # Tags 1-2 são a primeira mensagem; a 4 é o chat_exchange da segunda
+        self.nack = {4}
+        publisher = BatchPublisher()
+
+        confirmed, error = publisher.publish_batch(self.messages(3))
+
+        self.assertEqual(confirmed, 1)
+        self.assertIsInstance(error, pika.exceptions.NackError)
+        # O próximo lote usa uma conexão nova, sem confirms pendentes
+        self.nack = ()
+        self.assertEqual(publisher.publish_batch(self.messages(2)), (2, None))
+        self.assertEqual(len(self.connections), 2)
+
+    def test_invalid_message_ends_the_batch(self):
+        publisher = BatchPublisher()
+        messages = self.messages(3)
+        del messages[1]['room_name']
+
+        confirmed, error = publisher.publish_batch(messages)
+
+        self.assertEqual(confirmed, 1)
+        self.assertIsInstance(error, KeyError)
+        self.assertEqual(self.connections[0].channel_.basic_publish.call_count, 2)
+
+    def test_connection_failure_is_returned(self):
+        publisher = BatchPublisher()
+        with mock.patch('backend.rabbitmq_service.pika.SelectConnection',
+                        side_effect=pika.exceptions.AMQPConnectionError('recusada')):
+            confirmed, error = publisher.publish_batch(self.messages(1))
+
+        self.assertEqual(confirmed, 0)
+        self.assertIsInstance(error, pika.exceptions.AMQPConnectionError)
+
+
+class OutboxTests(TestCase):
+    """Eventos gravados com a mensagem e drenados pelo relay"""
+
+    def setUp(self):
+        self.room = ChatRoom.objects.create(name='geral')
+        self.user = User.objects.create(username='ana', password='x')
+        self.publisher = mock.Mock()
+        self.publisher.publish_batch.side_effect = lambda messages: (len(messages), None)
+
+    def send(self, content='olá'):
+        return APIClient().post('/api/send-message/', {
+            'room_name': 'geral', 'sender_id': str(self.user.id), 'content': content
+        }, format='json')
+
+    def test_send_message_writes_outbox_event(self):
+        response = self.send()
+
+        self.assertEqual(response.status_code, 201)
+        event = OutboxEvent.objects.get(event_type='chat_message')
+        self.assertEqual(event.status, 'pending')
+        self.assertEqual(event.payload['id'], response.data['id'])
+
+    def test_both_send_endpoints_enqueue_the_same_events(self):
+        self.send('a')
+        response = APIClient().post(f'/api/rooms/{self.room.id}/send_message/', {
+            'room_name': 'geral', 'sender_id': str(self.user.id), 'content': 'b'
+        }, format='json')
+
+        self.assertEqual(response.status_code, 201)
+        first, second = OutboxEvent.objects.filter(event_type='chat_message').order_by('id')
+        self.assertEqual(first.payload.keys(), second.payload.keys())
+        self.assertEqual(second.payload['room'], str(self.room.id))
+        self.assertEqual(second.payload['sender'], str(self.user.id))
+        self.assertEqual(OutboxEvent.objects.filter(event_type='notification_fanout').count(), 2)
+
+    def test_relay_publishes_and_marks_events(self):
+        self.send('a')
+        self.send('b')
+
+        self.assertEqual(relay_pending(publisher=self.publisher), 2)
+        # Um único lote para o publicador
+        batch, = self.publisher.publish_batch.call_args.args
+        self.assertEqual([message['content'] for message in batch], ['a', 'b'])
+        self.assertFalse(OutboxEvent.objects.filter(event_type='chat_message', status='pending').exists())
+
+    def test_broker_failure_keeps_events_pending_in_order(self):
+        self.send('a')
+        self.send('b')
+        self.publisher.publish_batch.side_effect = [(1, pika.exceptions.AMQPConnectionError('caiu'))]
+
+        self.assertEqual(relay_pending(publisher=self.publisher), 1)
+        pending = OutboxEvent.objects.get(event_type='chat_message', status='pending')
+        self.assertEqual((pending.payload['content'], pending.attempts), ('b', 1))
+
+        self.publisher.publish_batch.side_effect = lambda messages: (len(messages), None)
+        self.assertEqual(relay_pending(publisher=self.publisher), 1)
+
+    def test_invalid_event_does_not_block_the_outbox(self):
+        OutboxEvent.objects.create(event_type='chat_message', payload={})
+        self.send('a')
+        self.publisher.publish_batch.side_effect = [(0, KeyError('room_name')), (1, None)]
+
+        relay_pending(publisher=self.publisher)
+        relay_pending(publisher=self.publisher)
+
+        self.assertEqual(OutboxEvent.objects.filter(status='failed').count(), 1)
+        self.assertEqual(OutboxEvent.objects.filter(status='published').count(), 1)
+
+
+class NotificationFanoutTests(TestCase):
+    """Notificações criadas em lote pelo worker, fora da requisição"""
+
+    def setUp(self):
+        self.room = ChatRoom.objects.create(name='geral')
+        self.sender = User.objects.create(username='ana', password='x')
+        members = User.objects.bulk_create([User(username=f'user{i}', password='x') for i in range(25)])
+        RoomMembership.objects.bulk_create([RoomMembership(room=self.room, user=user) for user in members])
+        # Usuários que não entraram na sala não recebem as notificações dela
+        User.objects.bulk_create([User(username=f'outro{i}', password='x') for i in range(5)])
+
+    def test_send_message_does_not_insert_notifications(self):
+        response = APIClient().post('/api/send-message/', {
+            'room_name': 'geral', 'sender_id': str(self.sender.id), 'content': 'olá'
+        }, format='json')
+
+        self.assertEqual(response.status_code, 201)
+        self.assertFalse(Notification.objects.exists())
+        self.assertEqual(OutboxEvent.objects.filter(event_type='notification_fanout').count(), 1)
+
+        self.assertEqual(process_fanouts(), 1)
+        self.assertEqual(Notification.objects.count(), 25)
+        self.assertFalse(Notification.objects.filter(user=self.sender).exists())
+        self.assertFalse(Notification.objects.filter(user__username__startswith='outro').exists())
+        # Quem envia passa a ser membro da sala
+        self.assertTrue(RoomMembership.objects.filter(room=self.room, user=self.sender).exists())
+
+    def test_event_taken_by_another_relay_is_skipped(self):
+        APIClient().post('/api/send-message/', {
+            'room_name': 'geral', 'sender_id': str(self.sender.id), 'content': 'olá'
+        }, format='json')
+        # Lote lido por dois relays antes de qualquer um processá-lo (SQLite, sem travas)
+        stale = list(OutboxEvent.objects.filter(event_type='notification_fanout'))
+
+        self.assertEqual(process_fanouts(), 1)
+        with mock.patch('backend.notifications.claim_pending') as claim_pending:
+            claim_pending.return_value.__enter__.return_value = stale
+            self.assertEqual(process_fanouts(), 0)
+
+        self.assertEqual(Notification.objects.count(), 25)
+
+    def test_fan_out_uses_chunked_bulk_inserts(self):
+        # 3 blocos de ids + 3 INSERTs em lote + a consulta final vazia
+        with self.assertNumQueries(7):
+            created = fan_out_notifications(
+                room_id=self.room.id, sender_id=self.sender.id, notification_type='message',
+                title='t', message='m', priority='medium', data={}, chunk_size=10
+            )
+
+        self.assertEqual(created, 25)
+
+
+class NotificationCountTests(TestCase):
+    """Contadores de total/não lidas em cache usados por /api/notifications/stats/"""
+
+    def setUp(self):
+        cache.clear()
+        self.room = ChatRoom.objects.create(name='geral')
+        self.sender = User.objects.create(username='ana', password='x')
+        self.user = User.objects.create(username='bia', password='x')
+        RoomMembership.objects.create(room=self.room, user=self.user)
+        self.client = APIClient()
+
+    def stats(self):
+        response = self.client.get('/api/notifications/stats/', {'user_id': str(self.user.id)})
+        self.assertEqual(response.status_code, 200)
+        return response.data['total_notifications'], response.data['unread_notifications']
+
+    def notify(self, count=1):
+        for _ in range(count):
+            Notification.objects.create(user=self.user, title='t', message='m')
+
+    def test_counts_follow_every_change(self):
+        self.assertEqual(self.stats(), (0, 0))
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.notify(2)
+            fan_out_notifications(
+                room_id=self.room.id, sender_id=self.sender.id, notification_type='message',
+                title='t', message='m', priority='medium', data={}
+            )
+        self.assertEqual(self.stats(), (3, 3))
+
+        notification = Notification.objects.filter(user=self.user).first()
+        url = f'/api/notifications/{notification.id}/'
+        with self.captureOnCommitCallbacks(execute=True):
+            self.client.post(url + 'mark_as_read/')
+            # Marcar de novo não muda o contador
+            self.client.post(url + 'mark_as_read/')
+        self.assertEqual(self.stats(), (3, 2))
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.client.post(url + 'mark_as_unread/')
+        self.assertEqual(self.stats(), (3, 3))
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.client.post('/api/notifications/mark_all_as_read/', {'user_id': str(self.user.id)}, format='json')
+            self.client.delete(url)
+        self.assertEqual(self.stats(), (2, 0))
+
+        cache.clear()
+        self.assertEqual(self.stats(), (2, 0))
+
+    def test_cached_stats_do_not_query_database(self):
+        self.notify(3)
+        self.stats()
+
+        with self.assertNumQueries(0):
+            self.assertEqual(self.stats(), (3, 3))
+
+    def test_recount_does_not_overwrite_newer_counters(self):
+        self.notify(2)
+        total_key = f'notifications_total:{self.user.id}'
+        # Contador gravado por outro processo enquanto esta leitura recontava
+        cache.set(total_key, 3)
+
+        with mock.patch('backend.notification_counts.cache.get_many', return_value={}):
+            self.assertEqual(self.stats(), (2, 2))
+
+        self.assertEqual(cache.get(total_key), 3)
+
+    def test_unknown_user(self):
+        response = self.client.get('/api/notifications/stats/', {'user_id': str(uuid.uuid4())})
+
+        self.assertEqual(response.status_code, 404)
+
+
+@skipUnless(redis_available([TEST_CACHE_REDIS_URL]), 'redis-server indisponível')
+@override_settings(CACHES=SHARED_CACHES, CHANNEL_LAYERS=IN_MEMORY_CHANNEL_LAYERS)
+class SharedNotificationCountTests(TransactionTestCase):
+    """Contadores atualizados pelo outbox_relay e lidos pelo processo web"""
+
+    def setUp(self):
+        cache.clear()
+        self.room = ChatRoom.objects.create(name='geral')
+        self.sender = User.objects.create(username='ana', password='x')
+        self.user = User.objects.create(username='bia', password='x')
+        RoomMembership.objects.create(room=self.room, user=self.user)
+        self.client = APIClient()
+
+    def stats(self):
+        response = self.client.get('/api/notifications/stats/', {'user_id': str(self.user.id)})
+        return response.data['total_notifications'], response.data['unread_notifications']
+
+    def test_fanout_in_relay_process_updates_web_counts(self):
+        self.assertEqual(self.stats(), (0, 0))
+        self.client.post('/api/send-message/', {
+            'room_name': 'geral', 'sender_id': str(self.sender.id), 'content': 'olá'
+        }, format='json')
+
+        run_in_other_process('from backend.notifications import process_fanouts; process_fanouts()')
+
+        # Contadores incrementados pelo outro processo, sem recontar no banco
+        with self.assertNumQueries(0):
+            self.assertEqual(self.stats(), (1, 1))
+
+
+class RoomMembershipTests(TestCase):
+    """Entrada e saída de salas em /api/rooms/<id>/join|leave/"""
+
+    def setUp(self):
+        self.room = ChatRoom.objects.create(name='geral')
+        self.user = User.objects.create(username='ana', password='x')
+        self.client = APIClient()
+
+    def test_join_and_leave(self):
+        url = f'/api/rooms/{self.room.id}/'
+        body = {'user_id': str(self.user.id)}
+
+        self.assertEqual(self.client.post(url + 'join/', body, format='json').status_code, 201)
+        self.assertEqual(self.client.post(url + 'join/', body, format='json').status_code, 200)
+        self.assertEqual(RoomMembership.objects.count(), 1)
+
+        self.assertEqual(self.client.post(url + 'leave/', body, format='json').status_code, 200)
+        self.assertEqual(self.client.post(url + 'leave/', body, format='json').status_code, 404)
+        self.assertFalse(RoomMembership.objects.exists())
+
+    def test_membership_check_is_cached_per_user(self):
+        others = User.objects.bulk_create([User(username=f'user{i}', password='x') for i in range(50)])
+        RoomMembership.objects.bulk_create([RoomMembership(room=self.room, user=user) for user in others])
+        cache.clear()
+
+        with self.assertNumQueries(1):
+            self.assertFalse(is_member(self.room.id, self.user.id))
+        with self.assertNumQueries(0):
+            self.assertFalse(is_member(self.room.id, self.user.id))
+
+        url = f'/api/rooms/{self.room.id}/'
+        body = {'user_id': str(self.user.id)}
+        with self.captureOnCommitCallbacks(execute=True):
+            self.client.post(url + 'join/', body, format='json')
+        self.assertTrue(is_member(self.room.id, self.user.id))
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.client.post(url + 'leave/', body, format='json')
+        self.assertFalse(is_member(self.room.id, self.user.id))
+        self.assertTrue(is_member(self.room.id, others[0].id))
+
+    def test_join_requires_user_id(self):
+        response = self.client.post(f'/api/rooms/{self.room.id}/join/', {}, format='json')
+
+        self.assertEqual(response.status_code, 400)
+
+    def test_join_rejects_unknown_user(self):
+        response = self.client.post(
+            f'/api/rooms/{self.room.id}/join/', {'user_id': str(uuid.uuid4())}, format='json'
+        )
+
+        self.assertEqual(response.status_code, 404)
+        self.assertEqual(response.data['error'], 'Usuário não encontrado')
+        self.assertFalse(RoomMembership.objects.exists())
+
+
+@skipUnless(redis_available([TEST_CACHE_REDIS_URL]), 'redis-server indisponível')
+@override_settings(CACHES=SHARED_CACHES, CHANNEL_LAYERS=IN_MEMORY_CHANNEL_LAYERS)
+class SharedRoomMembersCacheTests(TransactionTestCase):
+    """Membros das salas no cache compartilhado pelos processos (Daphne, WSGI, SOAP)"""
+
+    def setUp(self):
+        cache.clear()
+        self.room = ChatRoom.objects.create(name='geral')
+        self.user = User.objects.create(username='ana', password='x')
+
+    async def test_join_in_other_process_is_seen_by_consumer(self):
+        # Este processo guarda em cache a sala ainda sem o usuário
+        self.assertFalse(await sync_to_async(is_member)(self.room.id, self.user.id))
+
+        await sync_to_async(run_in_other_process)(
+            'from backend.membership import join_room; from backend.models import ChatRoom, User; '
+            f'join_room(ChatRoom.objects.get(pk="{self.room.id}"), User.objects.get(pk="{self.user.id}"))'
+        )
+        communicator = WebsocketCommunicator(application, f'/ws/chat/geral/?user_id={self.user.id}')
+        connected, _ = await communicator.connect()
+
+        self.assertTrue(connected)
+        await communicator.disconnect()
+
+
+class SharedCacheCheckTests(SimpleTestCase):
+    """Verificação de sistema do cache Redis padrão"""
+
+    def test_unreachable_redis_is_reported(self):
+        caches = {'default': {**SHARED_CACHES['default'], 'LOCATION': 'redis://127.0.0.1:1/0'}}
+        with self.settings(CACHES=caches):
+            errors = check_shared_cache(None)
+
+        self.assertEqual([error.id for error in errors], ['backend.E001'])
+        self.assertIn('CACHE_REDIS_URL', errors[0].hint)
+
+    def test_local_memory_cache_is_not_checked(self):
+        self.assertEqual(check_shared_cache(None), [])
+
+
+class ChatRoomCounterTests(TestCase):
+    """message_count/last_message_at desnormalizados em ChatRoom"""
+
+    def setUp(self):
+        self.user = User.objects.create(username='ana', password='x')
+
+    def test_counters_follow_inserts_and_deletes(self):
+        room = ChatRoom.objects.create(name='geral')
+        first = Message.objects.create(room=room, sender=self.user, content='1')
+        last = Message.objects.create(room=room, sender=self.user, content='2')
+
+        room.refresh_from_db()
+        self.assertEqual(room.message_count, 2)
+        self.assertEqual(room.last_message_at, last.timestamp)
+
+        last.delete()
+        room.refresh_from_db()
+        self.assertEqual(room.message_count, 1)
+        self.assertEqual(room.last_message_at, first.timestamp)
+
+    def test_loaddata_keeps_dumped_counters(self):
+        # Caminho de migração SQLite -> PostgreSQL: dumpdata e loaddata
+        room = ChatRoom.objects.create(name='geral')
+        for content in ('1', '2'):
+            Message.objects.create(room=room, sender=self.user, content=content)
+        fixture = os.path.join(tempfile.mkdtemp(), 'dados.json')
+        self.addCleanup(shutil.rmtree, os.path.dirname(fixture))
+        call_command('dumpdata', 'backend.user', 'backend.chatroom', 'backend.message', output=fixture)
+
+        ChatRoom.objects.all().delete()
+        call_command('loaddata', fixture, verbosity=0)
+
+        room.refresh_from_db()
+        self.assertEqual(room.message_count, 2)
+        self.assertEqual(Message.objects.count(), 2)
+
+    def test_room_list_query_count_does_not_grow_with_rooms(self):
+        for i in range(10):
+            room = ChatRoom.objects.create(name=f'sala{i}')
+            Message.objects.create(room=room, sender=self.user, content='olá')
+
+        with self.assertNumQueries(1):
+            response = APIClient().get('/api/rooms/')
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual({room['message_count'] for room in response.data['rooms']}, {1})
+
+
+class QueryCountTests(TestCase):
+    """Listagens não podem fazer consultas por linha (N+1)"""
+
+    def setUp(self):
+        self.room = ChatRoom.objects.create(name='geral')
+        self.client = APIClient()
+
+    def add_rows(self, count):
+        users = User.objects.bulk_create(
+            [User(username=f'u{User.objects.count()}_{i}', password='x') for i in range(count)]
+        )
+        for user in users:
+            Message.objects.create(room=self.room, sender=user, content='olá')
+            Notification.objects.create(user=user, room=self.room, title='t', message='m')
+
+    def assertConstantQueries(self, request):
+        """Mesmo número de consultas com 2 e com 12 linhas"""
+        counts = []
+        for rows in (2, 10):
+            self.add_rows(rows)
+            with CaptureQueriesContext(connection) as queries:
+                response = request()
+            self.assertEqual(response.status_code, 200)
+            counts.append(len(queries))
+        self.assertEqual(counts[0], counts[1], 'consultas por linha na listagem')
+
+    def get(self, url):
+        return lambda: self.client.get(url)
+
+    def test_get_messages(self):
+        self.assertConstantQueries(self.get('/api/messages/geral/'))
+
+    def test_room_messages(self):
+        self.assertConstantQueries(self.get(f'/api/rooms/{self.room.id}/messages/'))
+
+    def test_message_viewset(self):
+        # MessageViewSet não está roteado em urls.py
+        factory = APIRequestFactory()
+        list_view = MessageViewSet.as_view({'get': 'list'})
+        self.assertConstantQueries(lambda: list_view(factory.get('/', {'room': 'geral'})).render())
+
+        message = Message.objects.first()
+        retrieve_view = MessageViewSet.as_view({'get': 'retrieve'})
+        with self.assertNumQueries(1):
+            retrieve_view(factory.get('/'), pk=message.id).render()
+
+    def test_notification_list(self):
+        self.assertConstantQueries(self.get('/api/notifications/'))
+
+    def test_notification_retrieve(self):
+        self.add_rows(1)
+        notification = Notification.objects.get()
+
+        with self.assertNumQueries(1):
+            self.client.get(f'/api/notifications/{notification.id}/')
+
+
+class QueryPlanTests(TestCase):
+    """
+    EXPLAIN de cada consulta dos endpoints mais usados (SQLite ou
+    PostgreSQL): todas devem usar índice, sem varredura completa da tabela
+    nem ordenação fora do índice.
+    """
+
+    def setUp(self):
+        cache.clear()
+        self.room = ChatRoom.objects.create(name='geral')
+        self.user = User.objects.create(username='ana', password='x')
+        self.other = User.objects.create(username='bia', password='x')
+        RoomMembership.objects.create(room=self.room, user=self.other)
+        for index in range(3):
+            Message.objects.create(room=self.room, sender=self.user, content=f'm{index}')
+            Notification.objects.create(user=self.user, room=self.room, title='t', message='m')
+        StoredFile.objects.create(room=self.room, uploader=self.user, filename='a.txt',
+                                  size=1, sha256='0' * 64, path='a.txt')
+        self.client = APIClient()
+
+    def explain(self, sql):
+        with connection.cursor() as cursor:
+            if connection.vendor == 'postgresql':
+                # Com tabelas pequenas o PostgreSQL prefere varrer e ordenar mesmo
+                # havendo índice; desligados, só aparecem se não houver outro caminho
+                for option in ('enable_seqscan', 'enable_bitmapscan', 'enable_sort'):
+                    cursor.execute(f'SET LOCAL {option} = off')
+                cursor.execute(f'EXPLAIN {sql}')
+                return [row[0] for row in cursor.fetchall()]
+            cursor.execute(f'EXPLAIN QUERY PLAN {sql}')
+            return [row[-1] for row in cursor.fetchall()]
+
+    def is_full_scan(self, step):
+        if connection.vendor == 'postgresql':
+            step = step.strip().lstrip('-> ')
+            return step.startswith(('Seq Scan', 'Sort'))
+        return step.startswith('SCAN') or 'TEMP B-TREE' in step
+
+    def assertIndexed(self, action):
+        """Executa action e confere o plano de cada SELECT/UPDATE/DELETE"""
+        with CaptureQueriesContext(connection) as queries:
+            action()
+        checked = 0
+        for query in queries:
+            sql = query['sql']
+            if not sql.startswith(('SELECT', 'UPDATE', 'DELETE')):
+                continue
+            plan = self.explain(sql)
+            self.assertFalse([step for step in plan if self.is_full_scan(step)],
+                             f'varredura completa em:\n{sql}\n' + '\n'.join(plan))
+            checked += 1
+        self.assertTrue(checked, 'nenhuma consulta executada')
+
+    def get(self, url, **params):
+        return lambda: self.assertEqual(self.client.get(url, params).status_code, 200)
+
+    def test_message_history(self):
+        self.assertIndexed(self.get('/api/messages/geral/', limit=2))
+        cursor = self.client.get('/api/messages/geral/', {'limit': 2}).data['prev_cursor']
+        self.assertIndexed(self.get('/api/messages/geral/', limit=2, before=cursor))
+
+    def test_message_history_across_archive(self):
+        Message.objects.filter(content='m0').update(timestamp=timezone.now() - timedelta(days=60))
+        archive_messages()
+        self.assertIndexed(self.get('/api/messages/geral/', limit=3))
+        cursor = self.client.get('/api/messages/geral/', {'limit': 3}).data['prev_cursor']
+        self.assertIndexed(self.get('/api/messages/geral/', limit=2, after=cursor))
+
+    def test_send_message(self):
+        self.assertIndexed(lambda: self.client.post('/api/send-message/', {
+            'room_name': 'geral', 'sender_id': str(self.user.id), 'content': 'olá'
+        }, format='json'))
+        self.assertIndexed(process_fanouts)
+
+    def test_notification_list(self):
+        user_id = str(self.user.id)
+        self.assertIndexed(self.get('/api/notifications/', user_id=user_id, limit=2))
+        self.assertIndexed(self.get('/api/notifications/', user_id=user_id, is_read='false', limit=2))
+
+    def test_notification_stats_and_mark_all(self):
+        user_id = str(self.user.id)
+        self.assertIndexed(self.get('/api/notifications/stats/', user_id=user_id))
+        self.assertIndexed(lambda: self.client.post(
+            '/api/notifications/mark_all_as_read/', {'user_id': user_id}, format='json'
+        ))
+
+    def test_login_lookup(self):
+        # username é único: o índice dele basta para a busca por (username, password, is_active)
+        self.assertIndexed(lambda: UserLoginSerializer(data={'username': 'ana', 'password': 'x'}).is_valid())
+
+    def test_soap_list_files(self):
+        client = soap_test_client(self)
+        envelope = soap_envelope('list_files', {'room_name': 'geral', 'limit': '10'})
+        self.assertIndexed(lambda: client.post('/soap', data=envelope, content_type='text/xml'))
+
+
+@skipUnless(connection.vendor == 'sqlite', 'PRAGMAs e BEGIN IMMEDIATE são do SQLite')
+class SqliteConnectionTests(TransactionTestCase):
+    """Ajustes aplicados pelo backend.sqlite a cada conexão"""
+
+    def test_pragmas_are_applied_on_connect(self):
+        connection.close()
+        with connection.cursor() as cursor:
+            cursor.execute('PRAGMA synchronous')
+            self.assertEqual(cursor.fetchone()[0], 1)  # NORMAL
+            cursor.execute('PRAGMA busy_timeout')
+            self.assertEqual(cursor.fetchone()[0], 5000)
+
+    def test_transactions_take_write_lock_up_front(self):
+        with CaptureQueriesContext(connection) as queries:
+            with transaction.atomic():
+                User.objects.create(username='ana', password='x')
+
+        self.assertEqual(queries[0]['sql'], 'BEGIN IMMEDIATE')
+
+
+class EndpointPaginationTests(TestCase):
+    """Paginação por cursor em /api/rooms/<id>/messages/ e /api/notifications/"""
+
+    def setUp(self):
+        self.room = ChatRoom.objects.create(name='geral')
+        self.user = User.objects.create(username='ana', password='x')
+        self.client = APIClient()
+
+    def test_room_messages_are_bounded_and_linked(self):
+        for i in range(5):
+            Message.objects.create(room=self.room, sender=self.user, content=str(i))
+
+        data = self.client.get(f'/api/rooms/{self.room.id}/messages/', {'limit': 2}).data
+        self.assertEqual([m['content'] for m in data['messages']], ['3', '4'])
+        self.assertTrue(data['has_more'])
+
+        data = self.client.get(data['_links']['previous']['href']).data
+        self.assertEqual([m['content'] for m in data['messages']], ['1', '2'])
+
+    def test_room_messages_limit_is_capped(self):
+        Message.objects.create(room=self.room, sender=self.user, content='olá')
+
+        data = self.client.get(f'/api/rooms/{self.room.id}/messages/', {'limit': 10000}).data
+        self.assertIn('limit=200', data['_links']['next']['href'])
+
+        response = self.client.get(f'/api/rooms/{self.room.id}/messages/', {'limit': 'x'})
+        self.assertEqual(response.status_code, 400)
+
+    def test_notifications_walk_newest_first(self):
+        for i in range(5):
+            Notification.objects.create(user=self.user, title=str(i), message='m')
+
+        seen = []
+        url = f'/api/notifications/?user_id={self.user.id}&limit=2'
+        while url:
+            data = self.client.get(url).data
+            self.assertLessEqual(len(data['notifications']), 2)
+            seen += [n['title'] for n in data['notifications']]
+            url = data['_links'].get('next', {}).get('href')
+
+        self.assertEqual(seen, ['4', '3', '2', '1', '0'])
+        self.assertFalse(data['has_more'])
+
+
+
+class MessageArchiveTests(TestCase):
+    """Mensagens antigas em messages_archive, lidas junto com as recentes"""
+
+    def setUp(self):
+        self.room = ChatRoom.objects.create(name='geral')
+        self.user = User.objects.create(username='ana', password='x')
+        self.client = APIClient()
+        now = timezone.now()
+        for i in range(6):
+            message = Message.objects.create(room=self.room, sender=self.user, content=f'msg {i}')
+            # msg 0-3 fora da janela quente, msg 4-5 dentro dela
+            age = timedelta(days=40 - i) if i < 4 else timedelta(minutes=10 - i)
+            Message.objects.filter(id=message.id).update(timestamp=now - age)
+        self.moved = archive_messages(batch_size=3)
+
+    def get(self, **params):
+        return self.client.get('/api/messages/geral/', params).data
+
+    def test_old_messages_move_to_archive(self):
+        self.assertEqual(self.moved, 4)
+        self.assertEqual(Message.objects.count(), 2)
+        self.assertEqual(
+            sorted(ArchivedMessage.objects.values_list('content', flat=True)),
+            ['msg 0', 'msg 1', 'msg 2', 'msg 3']
+        )
+        # Continuam contadas na sala
+        self.room.refresh_from_db()
+        self.assertEqual(self.room.message_count, 6)
+        self.assertEqual(archive_messages(), 0)
+
+    def test_pages_cross_from_hot_to_archive(self):
+        data = self.get(limit=3)
+        self.assertEqual([m['content'] for m in data['messages']], ['msg 3', 'msg 4', 'msg 5'])
+        self.assertTrue(data['has_more'])
+
+        data = self.get(before=data['prev_cursor'], limit=3)
+        self.assertEqual([m['content'] for m in data['messages']], ['msg 0', 'msg 1', 'msg 2'])
+        self.assertFalse(data['has_more'])
+
+        data = self.get(after=data['next_cursor'], limit=2)
+        self.assertEqual([m['content'] for m in data['messages']], ['msg 3', 'msg 4'])
+        self.assertTrue(data['has_more'])
+
+    def test_room_messages_walk_both_tiers(self):
+        seen = []
+        url = f'/api/rooms/{self.room.id}/messages/?limit=4'
+        while url:
+            data = self.client.get(url).data
+            seen = [m['content'] for m in data['messages']] + seen
+            url = data['has_more'] and data['_links']['previous']['href']
+
+        self.assertEqual(seen, [f'msg {i}' for i in range(6)])
+
+    def test_polling_in_hot_window_skips_archive(self):
+        cursor = self.get(limit=2)['next_cursor']
+        Message.objects.create(room=self.room, sender=self.user, content='nova')
+
+        with CaptureQueriesContext(connection) as queries:
+            data = self.get(after=cursor)
+
+        self.assertEqual([m['content'] for m in data['messages']], ['nova'])
+        self.assertFalse(any('messages_archive' in query['sql'] for query in queries))
+
+
+
+def soap_test_client(testcase):
+    """
+    Cliente de teste do serviço SOAP. Como o Client do Django, não fecha a
+    conexão do banco a cada requisição: ela guarda a transação do teste, e
+    no PostgreSQL fechá-la desfaria os dados do setUp.
+    """
+    patcher = mock.patch.object(soap_server, 'close_old_connections', lambda: None)
+    patcher.start()
+    testcase.addCleanup(patcher.stop)
+    return soap_server.app.test_client()
+
+
+def soap_envelope(operation, fields):
+    body = ''.join(f'<{name}>{value}</{name}>' for name, value in fields.items())
+    return (
+        '<?xml version="1.0" encoding="UTF-8"?>'
+        '<soap:Envelope xmlns:soap="http://schemas.xmlsoap.org/soap/envelope/">'
+        f'<soap:Body><{operation}>{body}</{operation}></soap:Body></soap:Envelope>'
+    ).encode()
+
+
+class LazyUploadStream:
+    """Envelope upload_file com `size` bytes gerados sob demanda"""
+
+    def __init__(self, size, block=48 * 1024):
+        head, tail = soap_envelope('upload_file', {'filename': 'big.bin', 'file_data': '|'}).split(b'|')
+        self.parts = itertools.chain([head], self._encoded(size, block), [tail])
+        self.buffer = b''
+
+    @staticmethod
+    def _encoded(size, block):
+        for offset in range(0, size, block):
+            yield base64.b64encode(b'x' * min(block, size - offset)) + b'\n'
+
+    def read(self, n):
+        while len(self.buffer) < n:
+            part = next(self.parts, None)
+            if part is None:
+                break
+            self.buffer += part
+        chunk, self.buffer = self.buffer[:n], self.buffer[n:]
+        return chunk
+
+
+class SoapTestCase(TestCase):
+    """Servidor SOAP (Flask) com UPLOAD_DIR temporário"""
+
+    def setUp(self):
+        self.upload_dir = tempfile.mkdtemp()
+        override = self.settings(UPLOAD_DIR=self.upload_dir)
+        override.enable()
+        self.addCleanup(override.disable)
+        # A migração 0009 registra os arquivos do UPLOAD_DIR real no banco de testes
+        StoredFile.objects.all().delete()
+        self.client = soap_test_client(self)
+
+    def tearDown(self):
+        shutil.rmtree(self.upload_dir)
+
+    def stored_files(self):
+        """Arquivos gravados em UPLOAD_DIR, incluindo subdiretórios de blobs"""
+        return [os.path.join(directory, name)
+                for directory, _, names in os.walk(self.upload_dir) for name in names]
+
+
+class SoapStreamingUploadTests(SoapTestCase):
+    """Upload SOAP lido em blocos e decodificado direto para o disco"""
+
+    def test_upload_is_decoded_to_disk(self):
+        content = os.urandom(100_000)
+        encoded = base64.encodebytes(content).decode()  # com quebras de linha
+
+        response = self.client.post('/soap', data=soap_envelope('upload_file', {
+            'username': 'ana', 'room_name': 'geral', 'filename': 'foto.png', 'file_data': encoded
+        }), content_type='text/xml')
+
+        self.assertEqual(response.status_code, 200)
+        self.assertIn(b'<file_size>100000</file_size>', response.data)
+        [stored] = self.stored_files()
+        with open(stored, 'rb') as f:
+            self.assertEqual(f.read(), content)
+        self.assertTrue(Message.objects.filter(room__name='geral', message_type='system').exists())
+
+        metadata = StoredFile.objects.get(sha256=hashlib.sha256(content).hexdigest())
+        self.assertEqual(os.path.join(self.upload_dir, metadata.path), stored)
+        self.assertEqual((metadata.filename, metadata.size), ('foto.png', 100_000))
+        self.assertEqual((metadata.room.name, metadata.uploader.username), ('geral', 'ana'))
+
+    def test_invalid_base64_leaves_no_partial_file(self):
+        response = self.client.post('/soap', data=soap_envelope('upload_file', {
+            'filename': 'x.txt', 'file_data': 'não é base64'
+        }), content_type='text/xml')
+
+        self.assertEqual(response.status_code, 500)
+        self.assertEqual(os.listdir(self.upload_dir), [])
+
+    def test_peak_memory_does_not_grow_with_file_size(self):
+        tracemalloc.start()
+        try:
+            operation, params = parse_soap_request(LazyUploadStream(16 * 1024 * 1024), self.upload_dir)
+            _, peak = tracemalloc.get_traced_memory()
+        finally:
+            tracemalloc.stop()
+
+        self.assertEqual(operation, (None, 'upload_file'))
+        self.assertEqual(params['file_data'].size, 16 * 1024 * 1024)
+        self.assertLess(peak, 2 * 1024 * 1024)
+
+
+
+def mtom_upload(content, boundary='limite'):
+    envelope = soap_envelope('upload_file', {
+        'username': 'ana', 'room_name': 'geral', 'filename': 'foto.png',
+        'file_data': '<xop:Include xmlns:xop="http://www.w3.org/2004/08/xop/include" href="cid:foto%40cliente"/>'
+    })
+    body = (
+        f'--{boundary}\r\nContent-Type: application/xop+xml; type="text/xml"\r\nContent-ID: <raiz>\r\n\r\n'
+    ).encode() + envelope + (
+        f'\r\n--{boundary}\r\nContent-Type: application/octet-stream\r\nContent-ID: <foto@cliente>\r\n\r\n'
+    ).encode() + content + f'\r\n--{boundary}--\r\n'.encode()
+    content_type = f'multipart/related; type="application/xop+xml"; boundary={boundary}; start="<raiz>"'
+    return body, content_type
+
+
+class SoapMtomTests(SoapTestCase):
+    """Anexos binários MTOM/XOP no FileService, com base64 inline como alternativa"""
+
+    def test_mtom_upload_is_stored_raw(self):
+        content = os.urandom(50_000) + b'\r\n--limit' + os.urandom(10)
+        body, content_type = mtom_upload(content)
+
+        response = self.client.post('/soap', data=body, content_type=content_type)
+
+        self.assertEqual(response.status_code, 200)
+        [stored] = self.stored_files()
+        with open(stored, 'rb') as f:
+            self.assertEqual(f.read(), content)
+
+    def test_boundary_split_across_reads(self):
+        content = os.urandom(3000)
+        body, content_type = mtom_upload(content)
+
+        operation, params = parse_soap_request(io.BytesIO(body), self.upload_dir, content_type, chunk_size=7)
+
+        self.assertEqual((operation, params['username']), ((None, 'upload_file'), 'ana'))
+        with open(params['file_data'].path, 'rb') as f:
+            self.assertEqual(f.read(), content)
+
+    def test_missing_attachment_is_a_fault(self):
+        body, content_type = mtom_upload(b'x')
+        body = body.replace(b'<foto@cliente>', b'<outro@cliente>')
+
+        response = self.client.post('/soap', data=body, content_type=content_type)
+
+        self.assertEqual(response.status_code, 500)
+        self.assertEqual(os.listdir(self.upload_dir), [])
+
+    def test_download_negotiates_mtom(self):
+        content = os.urandom(20_000)
+        file_id = str(uuid.uuid4())
+        with open(os.path.join(self.upload_dir, f'{file_id}_foto.png'), 'wb') as f:
+            f.write(content)
+        StoredFile.objects.create(id=file_id, filename='foto.png', size=len(content),
+                                  sha256=hashlib.sha256(content).hexdigest(), path=f'{file_id}_foto.png')
+        request = soap_envelope('download_file', {'file_id': file_id})
+
+        inline = self.client.post('/soap', data=request, content_type='text/xml')
+        self.assertIn(base64.b64encode(content[:300]), inline.data)
+
+        response = self.client.post('/soap', data=request, content_type='text/xml',
+                                    headers={'Accept': 'multipart/related, text/xml'})
+        media_type, params = parse_content_type(response.content_type)
+        self.assertEqual(media_type, 'multipart/related')
+        parts = [(headers, b''.join(body)) for headers, body
+                 in MultipartReader([response.data], params['boundary']).parts()]
+
+        self.assertIn(b'xop:Include', parts[0][1])
+        self.assertEqual(parts[1][1], content)
+        self.assertEqual(parts[1][0]['content-id'], f'<{file_id}@mensageiro.soap.service>')
+
+    def test_options_advertises_mtom(self):
+        response = self.client.options('/soap')
+
+        self.assertIn('multipart/related', response.headers['Accept-Post'])
+
+
+class BlobStorageTests(SoapTestCase):
+    """Conteúdo repetido gravado uma vez e blobs sem referência coletados"""
+
+    def upload(self, room_name, content):
+        response = self.client.post('/soap', data=soap_envelope('upload_file', {
+            'username': 'ana', 'room_name': room_name, 'filename': 'foto.png',
+            'file_data': base64.b64encode(content).decode()
+        }), content_type='text/xml')
+        self.assertEqual(response.status_code, 200)
+
+    def test_identical_uploads_share_one_blob(self):
+        content = os.urandom(5000)
+        self.upload('geral', content)
+        self.upload('outra', content)
+
+        [blob] = self.stored_files()
+        first, second = StoredFile.objects.filter(sha256=hashlib.sha256(content).hexdigest())
+        self.assertNotEqual(first.id, second.id)
+        self.assertEqual(first.path, second.path)
+        self.assertTrue(blob.endswith(hashlib.sha256(content).hexdigest()))
+
+    def test_garbage_collection_keeps_referenced_blobs(self):
+        self.upload('geral', b'mantido')
+        self.upload('geral', b'removido')
+        StoredFile.objects.filter(sha256=hashlib.sha256(b'removido').hexdigest()).delete()
+
+        # Dentro do período de carência nada é removido
+        self.assertEqual(collect_garbage(), (0, 0))
+        self.assertEqual(collect_garbage(grace=0), (1, len(b'removido')))
+
+        [blob] = self.stored_files()
+        self.assertTrue(blob.endswith(hashlib.sha256(b'mantido').hexdigest()))
+
+    def test_blob_reused_during_collection_is_kept(self):
+        self.upload('geral', b'reenviado')
+        sha256 = hashlib.sha256(b'reenviado').hexdigest()
+        stored = StoredFile.objects.get(sha256=sha256)
+        StoredFile.objects.filter(id=stored.id).delete()
+        rename = os.rename
+
+        def upload_during_rename(source, target):
+            # O mesmo conteúdo chega entre a consulta do lote e o rename do blob
+            StoredFile.objects.create(id=uuid.uuid4(), filename='foto.png', size=stored.size,
+                                      sha256=sha256, path=stored.path)
+            rename(source, target)
+
+        with mock.patch('backend.storage.os.rename', side_effect=upload_during_rename):
+            self.assertEqual(collect_garbage(grace=0), (0, 0))
+
+        self.assertEqual(self.stored_files(), [stored_file_path(stored)])
+        self.assertEqual(collect_garbage(grace=0), (0, 0))
+
+    def test_interrupted_collection_restores_blob(self):
+        self.upload('geral', b'interrompido')
+        stored = StoredFile.objects.get()
+        os.rename(stored_file_path(stored), stored_file_path(stored) + '.gc')
+
+        self.assertEqual(collect_garbage(grace=0), (0, 0))
+        self.assertEqual(self.stored_files(), [stored_file_path(stored)])
+
+
+class SoapResponseTests(SoapTestCase):
+    """Despacho por nome qualificado e respostas com escape de XML"""
+
+    def test_values_are_escaped(self):
+        response = self.client.post('/soap', data=soap_envelope('upload_file', {
+            'username': 'ana', 'room_name': 'geral', 'filename': 'a&amp;b&lt;c&gt;.txt',
+            'file_data': base64.b64encode(b'x').decode()
+        }), content_type='text/xml')
+
+        root = ElementTree.fromstring(response.data)
+        self.assertEqual(root.find('.//filename').text, 'a&b<c>.txt')
+
+    def test_dispatch_uses_qualified_operation(self):
+        def envelope(namespace):
+            return (
+                '<soap:Envelope xmlns:soap="http://schemas.xmlsoap.org/soap/envelope/">'
+                f'<soap:Body><op:list_files xmlns:op="{namespace}"/></soap:Body></soap:Envelope>'
+            )
+
+        qualified = self.client.post('/soap', data=envelope('http://mensageiro.soap.service'), content_type='text/xml')
+        self.assertEqual(qualified.status_code, 200)
+        other = self.client.post('/soap', data=envelope('urn:outro'), content_type='text/xml')
+        self.assertEqual(other.status_code, 500)
+
+    def test_large_list_renders_in_chunks(self):
+        now, room = timezone.now(), SimpleNamespace(name='geral')
+        files = [
+            SimpleNamespace(id=index, filename=f'<{index}>.txt', size=index, created_at=now, room=room, uploader=None)
+            for index in range(100_000)
+        ]
+
+        chunks = list(soap_server.render_file_list(files))
+
+        self.assertGreater(len(chunks), 10)
+        root = ElementTree.fromstring(b''.join(chunks))
+        self.assertEqual(len(root.findall('.//file')), 100_000)
+        self.assertEqual(root.find('.//file/filename').text, '<0>.txt')
+
+    def test_wsdl_is_served_from_cached_bytes(self):
+        response = self.client.get('/?wsdl')
+
+        self.assertEqual(response.data, soap_server.WSDL_BYTES)
+
+
+class SoapTelemetryTests(SoapTestCase):
+    """Logs estruturados com amostragem e tempo por fase das operações"""
+
+    def test_upload_logs_phase_timings(self):
+        with self.assertLogs('soap_service', 'INFO') as logs:
+            self.client.post('/soap', data=soap_envelope('upload_file', {
+                'username': 'ana', 'room_name': 'geral', 'filename': 'a.txt',
+                'file_data': base64.b64encode(b'conteudo').decode()
+            }), content_type='text/xml')
+
+        [line] = [message for message in logs.output if 'soap_request' in message]
+        self.assertIn('operation=upload_file status=ok', line)
+        for phase in ('parse', 'decode', 'hash', 'disk_write', 'store', 'db', 'publish'):
+            self.assertIn(f' {phase}_ms=', line)
+
+        stats = self.client.get('/metrics').get_json()['upload_file']
+        self.assertGreaterEqual(stats['count'], 1)
+        self.assertIn('disk_write', stats['phases'])
+
+    def test_sampling_keeps_warnings(self):
+        sampler = telemetry.SamplingFilter(rate=0)
+        record = lambda level: logging.LogRecord('soap_service', level, '', 0, 'x', None, None)
+
+        self.assertFalse(sampler.filter(record(logging.INFO)))
+        self.assertTrue(sampler.filter(record(logging.WARNING)))
+
+    def test_level_switched_at_runtime_by_control_file(self):
+        path = os.path.join(self.upload_dir, 'logging.json')
+        with open(path, 'w') as f:
+            json.dump({'level': 'DEBUG', 'sample_rate': 0.5}, f)
+        self.addCleanup(telemetry.apply_log_settings, telemetry.logger.level, telemetry.sampler.rate)
+
+        telemetry.LogControl(path, interval=0).refresh()
+
+        self.assertTrue(telemetry.logger.isEnabledFor(logging.DEBUG))
+        self.assertEqual(telemetry.sampler.rate, 0.5)
+
+
+class LegacyFileMigrationTests(SoapTestCase):
+    """Arquivos '<file_id>_<nome>' movidos para os blobs em subdiretórios"""
+
+    def legacy_file(self, content, filename='antigo.txt', sha256=None):
+        file_id = uuid.uuid4()
+        path = f'{file_id}_{filename}'
+        with open(os.path.join(self.upload_dir, path), 'wb') as f:
+            f.write(content)
+        return StoredFile.objects.create(id=file_id, filename=filename, size=len(content),
+                                         sha256=sha256 or hashlib.sha256(content).hexdigest(), path=path)
+
+    def test_legacy_files_move_to_shared_blob(self):
+        first = self.legacy_file(b'repetido')
+        second = self.legacy_file(b'repetido')
+
+        self.assertEqual(migrate_legacy_files(batch_size=1), (2, 0))
+
+        first.refresh_from_db()
+        second.refresh_from_db()
+        self.assertEqual(first.path, second.path)
+        self.assertTrue(first.path.startswith(os.path.join('blobs', first.sha256[:2], first.sha256[2:4])))
+        [blob] = self.stored_files()
+        with open(blob, 'rb') as f:
+            self.assertEqual(f.read(), b'repetido')
+
+        response = self.client.post('/soap', data=soap_envelope('download_file', {'file_id': str(first.id)}),
+                                    content_type='text/xml')
+        self.assertIn(base64.b64encode(b'repetido'), response.get_data())
+
+    def test_mismatched_or_missing_files_are_skipped(self):
+        changed = self.legacy_file(b'alterado', sha256='0' * 64)
+        missing = self.legacy_file(b'x')
+        os.remove(os.path.join(self.upload_dir, missing.path))
+
+        self.assertEqual(migrate_legacy_files(), (0, 2))
+        changed.refresh_from_db()
+        self.assertTrue(os.path.exists(stored_file_path(changed)))
+
+    def test_batches_walk_past_skipped_files_by_cursor(self):
+        for _ in range(3):
+            self.legacy_file(b'alterado', sha256='0' * 64)
+        migrated = self.legacy_file(b'valido')
+
+        with CaptureQueriesContext(connection) as queries:
+            self.assertEqual(migrate_legacy_files(batch_size=2), (1, 3))
+
+        # Lotes não acumulam os ids ignorados em NOT IN (...)
+        selects = [query['sql'] for query in queries if query['sql'].startswith('SELECT')]
+        self.assertFalse([sql for sql in selects if 'NOT' in sql and ' IN (' in sql])
+        migrated.refresh_from_db()
+        self.assertTrue(migrated.path.startswith('blobs'))
+
+
+class SoapListFilesTests(SoapTestCase):
+    """list_files consulta os metadados indexados, filtrando por sala"""
+
+    def setUp(self):
+        super().setUp()
+        uploader = User.objects.create(username='ana')
+        geral = ChatRoom.objects.create(name='geral')
+        outra = ChatRoom.objects.create(name='outra')
+        for index in range(3):
+            StoredFile.objects.create(room=geral, uploader=uploader, filename=f'geral{index}.txt',
+                                      size=index, sha256='0' * 64, path=f'geral{index}.txt')
+        StoredFile.objects.create(room=outra, uploader=uploader, filename='outra.txt',
+                                  size=1, sha256='0' * 64, path='outra.txt')
+
+    def list_files(self, **fields):
+        response = self.client.post('/soap', data=soap_envelope('list_files', fields), content_type='text/xml')
+        self.assertEqual(response.status_code, 200)
+        return response.data.decode()
+
+    def test_filters_by_room(self):
+        body = self.list_files(room_name='geral')
+
+        self.assertIn('<file_count>3</file_count>', body)
+        self.assertNotIn('outra.txt', body)
+        self.assertIn('<uploader_username>ana</uploader_username>', body)
+
+    def test_paginates_with_cursor(self):
+        first = self.list_files(room_name='geral', limit='2')
+        self.assertIn('<file_count>2</file_count>', first)
+        cursor = first.split('<next_cursor>')[1].split('</next_cursor>')[0]
+
+        second = self.list_files(room_name='geral', limit='2', cursor=cursor)
+        self.assertIn('<file_count>1</file_count>', second)
+        self.assertNotIn('<next_cursor>', second)
+        self.assertIn('geral0.txt', second)
+
+
+class FileDownloadTests(TestCase):
+    """/api/files/<id>/ com Range, ETag e If-None-Match; download SOAP em blocos"""
+
+    def setUp(self):
+        self.upload_dir = tempfile.mkdtemp()
+        self.content = os.urandom(1000)
+        self.file_id = str(uuid.uuid4())
+        self.path = os.path.join(self.upload_dir, f'{self.file_id}_relatorio.pdf')
+        with open(self.path, 'wb') as f:
+            f.write(self.content)
+        StoredFile.objects.create(id=self.file_id, filename='relatorio.pdf', size=len(self.content),
+                                  sha256=hashlib.sha256(self.content).hexdigest(),
+                                  path=f'{self.file_id}_relatorio.pdf')
+        override = self.settings(UPLOAD_DIR=self.upload_dir)
+        override.enable()
+        self.addCleanup(override.disable)
+        self.url = f'/api/files/{self.file_id}/'
+
+    def tearDown(self):
+        os.remove(self.path)
+        os.rmdir(self.upload_dir)
+
+    def test_full_download_is_streamed_with_validators(self):
+        response = self.client.get(self.url)
+
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response.streaming)
+        self.assertEqual(b''.join(response.streaming_content), self.content)
+        self.assertEqual(response['Accept-Ranges'], 'bytes')
+        self.assertIn('relatorio.pdf', response['Content-Disposition'])
+
+        cached = self.client.get(self.url, HTTP_IF_NONE_MATCH=response['ETag'])
+        self.assertEqual(cached.status_code, 304)
+
+        # Comparação fraca: proxies podem reenviar o validador como W/"..."
+        weak = self.client.get(self.url, HTTP_IF_NONE_MATCH=f'"outro", W/{response["ETag"]}')
+        self.assertEqual(weak.status_code, 304)
+
+    def test_range_resumes_transfer(self):
+        response = self.client.get(self.url, HTTP_RANGE='bytes=100-199')
+        self.assertEqual(response.status_code, 206)
+        self.assertEqual(response['Content-Range'], 'bytes 100-199/1000')
+        self.assertEqual(b''.join(response.streaming_content), self.content[100:200])
+
+        suffix = self.client.get(self.url, HTTP_RANGE='bytes=-10')
+        self.assertEqual(b''.join(suffix.streaming_content), self.content[-10:])
+
+        self.assertEqual(self.client.get(self.url, HTTP_RANGE='bytes=5000-').status_code, 416)
+
+    def test_ranges_on_empty_file_are_unsatisfiable(self):
+        # Sem isto, bytes=-N viraria "Content-Range: bytes 0--1/0" com 206
+        for header in ('bytes=-10', 'bytes=0-'):
+            with self.assertRaises(ValueError):
+                parse_range(header, 0)
+
+    def test_if_range_with_stale_etag_sends_whole_file(self):
+        response = self.client.get(self.url, HTTP_RANGE='bytes=0-9', HTTP_IF_RANGE='"antigo"')
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(b''.join(response.streaming_content), self.content)
+
+    def test_if_range_requires_strong_etag(self):
+        etag = self.client.head(self.url)['ETag']
+
+        partial = self.client.get(self.url, HTTP_RANGE='bytes=0-9', HTTP_IF_RANGE=etag)
+        self.assertEqual(partial.status_code, 206)
+
+        weak = self.client.get(self.url, HTTP_RANGE='bytes=0-9', HTTP_IF_RANGE=f'W/{etag}')
+        self.assertEqual(weak.status_code, 200)
+
+    def test_unknown_file_is_404(self):
+        self.assertEqual(self.client.get(f'/api/files/{uuid.uuid4()}/').status_code, 404)
+        # Prefixo do id não basta: a busca é pela chave primária
+        self.assertEqual(self.client.get(f'/api/files/{self.file_id[:8]}/').status_code, 404)
+
+    def test_soap_download_streams_base64(self):
+        # Vários blocos: o base64 concatenado deve continuar válido
+        with mock.patch.object(soap_server, 'DOWNLOAD_CHUNK_SIZE', 30):
+            response = soap_test_client(self).post(
+                '/soap', data=soap_envelope('download_file', {'file_id': self.file_id}), content_type='text/xml'
+            )
+            self.assertTrue(response.is_streamed)
+            body = response.get_data()
+
+        file_data = body.split(b'<file_data>')[1].split(b'</file_data>')[0]
+        self.assertEqual(base64.b64decode(file_data), self.content)
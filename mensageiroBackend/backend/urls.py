@@ -9,6 +9,8 @@ router.register(r'rooms', views.ChatRoomViewSet)
 router.register(r'notifications', NotificationViewSet, basename='notification')
 
 urlpatterns = [
+    # Antes do router, que trataria 'stats' como id de notificação
+    path('api/notifications/stats/', views.notification_stats, name='notification_stats'),
     path('api/', include(router.urls)),
     path('api/users/register/', views.register_user, name='register'),
     path('api/users/login/', views.login_user, name='login'),
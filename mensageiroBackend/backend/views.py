@@ -4,8 +4,10 @@ from rest_framework.response import Response
 from rest_framework.permissions import AllowAny
 from django.utils import timezone
 from django.shortcuts import get_object_or_404
+from django.db import transaction
+from django.core.exceptions import ValidationError
 from django.contrib.auth import authenticate
-from django.http import JsonResponse, HttpResponse, Http404
+from django.http import JsonResponse
 from django.views.decorators.csrf import csrf_exempt
 from django.views.decorators.http import require_http_methods
 from django.utils.decorators import method_decorator
@@ -20,7 +22,16 @@ from .serializers import (
     SendMessageSerializer, UserSerializer, UserRegistrationSerializer, UserLoginSerializer, NotificationSerializer,
     CreateNotificationSerializer
 )
-from .rabbitmq_service import get_rabbitmq_service, RabbitMQService
+from .rabbitmq_service import get_rabbitmq_service
+from .outbox import enqueue_chat_message
+from .notifications import schedule_fanout
+from .membership import ensure_member, join_room, leave_room
+from .archive import message_page
+from .notification_counts import count_change, get_counts
+from .realtime import broadcast_message
+from .downloads import file_response
+from .storage import find_stored_file, stored_file_path
+from .pagination import decode_cursor, encode_cursor, parse_page_size, keyset_page, cursor_link
 
 class UserViewSet(viewsets.ModelViewSet):
     queryset = User.objects.all()
@@ -187,6 +198,14 @@ class ChatRoomViewSet(viewsets.ModelViewSet):
                 'href': f'/api/rooms/{room.id}/',
                 'method': 'DELETE'
             },
+            'join': {
+                'href': f'/api/rooms/{room.id}/join/',
+                'method': 'POST'
+            },
+            'leave': {
+                'href': f'/api/rooms/{room.id}/leave/',
+                'method': 'POST'
+            },
             'all_rooms': {
                 'href': '/api/rooms/',
                 'method': 'GET'
@@ -235,13 +254,20 @@ class ChatRoomViewSet(viewsets.ModelViewSet):
 
     @action(detail=True, methods=['get'])
     def messages(self, request, pk=None):
+        """Mensagens da sala paginadas por cursor (after/before/limit)"""
         room = self.get_object()
-        messages = room.messages.all()
+        path = f'/api/rooms/{room.id}/messages/'
+        try:
+            messages, page, page_links = _message_page(request, room, path)
+        except ValueError as e:
+            return Response({'error': str(e)}, status=status.HTTP_400_BAD_REQUEST)
+
         serializer = MessageSerializer(messages, many=True)
         
         response_data = {
             'room': ChatRoomSerializer(room).data,
             'messages': serializer.data,
+            **page,
             '_links': {
                 'room_details': {
                     'href': f'/api/rooms/{room.id}/',
@@ -254,7 +280,8 @@ class ChatRoomViewSet(viewsets.ModelViewSet):
                 'all_rooms': {
                     'href': '/api/rooms/',
                     'method': 'GET'
-                }
+                },
+                **{name: {**link, 'method': 'GET'} for name, link in page_links.items()}
             }
         }
         
@@ -272,57 +299,45 @@ class ChatRoomViewSet(viewsets.ModelViewSet):
             
             try:
                 sender = User.objects.get(id=sender_id, is_active=True)
-                message = Message.objects.create(
-                    room=room,
-                    sender=sender,
-                    content=content,
-                    message_type=message_type
-                )
                 
-                message_data = {
-                    'id': str(message.id),
-                    'room_name': room.name,
-                    'sender_username': sender.username,
-                    'content': message.content,
-                    'timestamp': message.timestamp.isoformat(),
-                    'message_type': message.message_type
-                }
+                # Mensagem, evento do RabbitMQ (outbox) e notificações na mesma
+                # transação; o relay publica depois, fora da requisição
+                with transaction.atomic():
+                    ensure_member(room, sender)
+                    message = Message.objects.create(
+                        room=room,
+                        sender=sender,
+                        content=content,
+                        message_type=message_type
+                    )
+                    _publish_message(message)
                 
-                rabbitmq_service = get_rabbitmq_service()
-                success = rabbitmq_service.publish_message(message_data)
+                response_data = {
+                    'message': 'Mensagem enviada com sucesso',
+                    'data': MessageSerializer(message).data
+                }
                 
-                if success:
-                    response_data = {
-                        'message': 'Mensagem enviada com sucesso',
-                        'data': MessageSerializer(message).data
-                    }
-                    
-                    # Adicionar HATEOAS
-                    response_data['_links'] = {
-                        'message_details': {
-                            'href': f'/api/messages/{message.id}/',
-                            'method': 'GET'
-                        },
-                        'room_messages': {
-                            'href': f'/api/rooms/{room.id}/messages/',
-                            'method': 'GET'
-                        },
-                        'room_details': {
-                            'href': f'/api/rooms/{room.id}/',
-                            'method': 'GET'
-                        },
-                        'sender_profile': {
-                            'href': f'/api/users/{sender.id}/',
-                            'method': 'GET'
-                        }
+                # Adicionar HATEOAS
+                response_data['_links'] = {
+                    'message_details': {
+                        'href': f'/api/messages/{message.id}/',
+                        'method': 'GET'
+                    },
+                    'room_messages': {
+                        'href': f'/api/rooms/{room.id}/messages/',
+                        'method': 'GET'
+                    },
+                    'room_details': {
+                        'href': f'/api/rooms/{room.id}/',
+                        'method': 'GET'
+                    },
+                    'sender_profile': {
+                        'href': f'/api/users/{sender.id}/',
+                        'method': 'GET'
                     }
-                    
-                    return Response(response_data, status=status.HTTP_201_CREATED)
-                else:
-                    return Response(
-                        {'error': 'Erro ao enviar mensagem para RabbitMQ'}, 
-                        status=status.HTTP_500_INTERNAL_SERVER_ERROR
-                    )
+                }
+                
+                return Response(response_data, status=status.HTTP_201_CREATED)
             except User.DoesNotExist:
                 return Response(
                     {'error': 'Usuário não encontrado'}, 
@@ -331,6 +346,73 @@ class ChatRoomViewSet(viewsets.ModelViewSet):
         
         return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
 
+    def _membership_user(self, request):
+        user_id = request.data.get('user_id')
+        if not user_id:
+            return None, Response({'error': 'user_id é obrigatório'}, status=status.HTTP_400_BAD_REQUEST)
+        try:
+            return User.objects.get(id=user_id, is_active=True), None
+        except (User.DoesNotExist, ValidationError):
+            return None, Response({'error': 'Usuário não encontrado'}, status=status.HTTP_404_NOT_FOUND)
+
+    @action(detail=True, methods=['post'])
+    def join(self, request, pk=None):
+        """Entrar na sala (passa a receber notificações e mensagens via WebSocket)"""
+        room = self.get_object()
+        user, error = self._membership_user(request)
+        if error:
+            return error
+        
+        membership, created = join_room(room, user)
+        
+        return Response({
+            'message': 'Usuário entrou na sala' if created else 'Usuário já é membro da sala',
+            'room': str(room.id),
+            'user_id': str(user.id),
+            'joined_at': membership.joined_at.isoformat(),
+            '_links': {
+                'leave': {
+                    'href': f'/api/rooms/{room.id}/leave/',
+                    'method': 'POST'
+                },
+                'messages': {
+                    'href': f'/api/messages/{room.name}/',
+                    'method': 'GET'
+                },
+                'room_details': {
+                    'href': f'/api/rooms/{room.id}/',
+                    'method': 'GET'
+                }
+            }
+        }, status=status.HTTP_201_CREATED if created else status.HTTP_200_OK)
+
+    @action(detail=True, methods=['post'])
+    def leave(self, request, pk=None):
+        """Sair da sala"""
+        room = self.get_object()
+        user, error = self._membership_user(request)
+        if error:
+            return error
+        
+        if not leave_room(room, user):
+            return Response({'error': 'Usuário não é membro da sala'}, status=status.HTTP_404_NOT_FOUND)
+        
+        return Response({
+            'message': 'Usuário saiu da sala',
+            'room': str(room.id),
+            'user_id': str(user.id),
+            '_links': {
+                'join': {
+                    'href': f'/api/rooms/{room.id}/join/',
+                    'method': 'POST'
+                },
+                'all_rooms': {
+                    'href': '/api/rooms/',
+                    'method': 'GET'
+                }
+            }
+        })
+
     def list(self, request, *args, **kwargs):
         """Listar salas com HATEOAS"""
         queryset = self.get_queryset()
@@ -354,12 +436,13 @@ class ChatRoomViewSet(viewsets.ModelViewSet):
         })
 
 class MessageViewSet(viewsets.ModelViewSet):
-    queryset = Message.objects.all()
+    queryset = Message.objects.select_related('room', 'sender')
     serializer_class = MessageSerializer
     permission_classes = [AllowAny]
 
     def get_queryset(self):
-        queryset = Message.objects.all()
+        # O serializer lê room.name e sender.username: evita 2 consultas por mensagem
+        queryset = Message.objects.select_related('room', 'sender')
         room_name = self.request.query_params.get('room', None)
         sender_id = self.request.query_params.get('sender', None)
         
@@ -556,34 +639,111 @@ def login_user(request):
     
     return Response({'error': 'Credenciais inválidas'}, status=401)
 
+def _message_page(request, room, path):
+    """
+    Página de mensagens da sala por cursor a partir de after/before/limit,
+    lendo também o arquivo quando o cursor passa da janela quente.
+
+    Retorna (mensagens, metadados da página, links next/previous); lança
+    ValueError se os parâmetros forem inválidos.
+    """
+    limit = parse_page_size(request.query_params.get('limit'))
+    after = decode_cursor(request.query_params.get('after'))
+    before = decode_cursor(request.query_params.get('before'))
+
+    messages, has_more = message_page(room.id, limit, after=after, before=before)
+
+    # Sem mensagens novas o cliente continua a partir do mesmo cursor
+    if messages:
+        next_cursor = encode_cursor(messages[-1].timestamp, messages[-1].id)
+        prev_cursor = encode_cursor(messages[0].timestamp, messages[0].id)
+    else:
+        next_cursor = request.query_params.get('after')
+        prev_cursor = request.query_params.get('before')
+
+    links = {}
+    if next_cursor:
+        links['next'] = {'href': cursor_link(path, after=next_cursor, limit=limit)}
+    if prev_cursor:
+        links['previous'] = {'href': cursor_link(path, before=prev_cursor, limit=limit)}
+
+    page = {
+        'count': len(messages),
+        'has_more': has_more,
+        'next_cursor': next_cursor,
+        'prev_cursor': prev_cursor
+    }
+    return messages, page, links
+
 @api_view(['GET'])
 def get_messages(request, room_name):
-    """Obter mensagens de uma sala com HATEOAS"""
+    """
+    Obter mensagens de uma sala com HATEOAS e paginação por cursor.
+
+    Parâmetros opcionais:
+    - after=<timestamp>,<id>: apenas mensagens mais novas (polling incremental)
+    - before=<timestamp>,<id>: mensagens mais antigas (histórico)
+    - limit: tamanho da página (máximo MAX_PAGE_SIZE)
+
+    Sem cursor, retorna as mensagens mais recentes da sala.
+    """
     try:
         room = ChatRoom.objects.get(name=room_name)
-        messages = Message.objects.filter(room=room).order_by('timestamp')
-        serializer = MessageSerializer(messages, many=True)
-        
-        # Adicionar links HATEOAS
-        for item in serializer.data:
-            item['_links'] = {
-                'self': {'href': f"/api/messages/{item['id']}/"},
-                'room': {'href': f"/api/rooms/{room.id}/"},
-                'sender': {'href': f"/api/users/{item['sender']}/"}
-            }
-        
-        return Response({
-            'messages': serializer.data,
-            'room': room_name,
-            '_links': {
-                'self': {'href': f"/api/messages/{room_name}/"},
-                'room': {'href': f"/api/rooms/{room.id}/"},
-                'send_message': {'href': '/api/send-message/'}
-            }
-        })
     except ChatRoom.DoesNotExist:
         return Response({'error': 'Sala não encontrada'}, status=404)
 
+    path = f"/api/messages/{room_name}/"
+    try:
+        messages, page, page_links = _message_page(request, room, path)
+    except ValueError as e:
+        return Response({'error': str(e)}, status=400)
+
+    serializer = MessageSerializer(messages, many=True)
+
+    # Adicionar links HATEOAS
+    for item in serializer.data:
+        item['_links'] = {
+            'self': {'href': f"/api/messages/{item['id']}/"},
+            'room': {'href': f"/api/rooms/{room.id}/"},
+            'sender': {'href': f"/api/users/{item['sender']}/"}
+        }
+
+    return Response({
+        'messages': serializer.data,
+        'room': room_name,
+        **page,
+        '_links': {
+            'self': {'href': path},
+            'room': {'href': f"/api/rooms/{room.id}/"},
+            'send_message': {'href': '/api/send-message/'},
+            **page_links
+        }
+    })
+
+def _publish_message(message):
+    """
+    Evento do RabbitMQ (outbox), notificações dos outros membros da sala e
+    push pelo WebSocket de uma mensagem nova; chamado na transação que a grava.
+    """
+    room, sender = message.room, message.sender
+    enqueue_chat_message(message)
+
+    # Notificações criadas em lote pelo worker
+    schedule_fanout(
+        room=room,
+        sender=sender,
+        notification_type='message',
+        title=f'Nova mensagem em #{room.name}',
+        message=f'{sender.username}: {message.content[:50]}{"..." if len(message.content) > 50 else ""}',
+        data={
+            'message_id': str(message.id),
+            'sender_id': str(sender.id),
+            'sender_username': sender.username
+        }
+    )
+
+    broadcast_message(message)
+
 @swagger_auto_schema(
     method='post',
     request_body=openapi.Schema(
@@ -603,44 +763,16 @@ def send_message(request):
         room = ChatRoom.objects.get(name=request.data['room_name'])
         sender = User.objects.get(id=request.data['sender_id'])
         
-        message = Message.objects.create(
-            room=room,
-            sender=sender,
-            content=request.data['content'],
-            message_type=request.data.get('message_type', 'text')
-        )
-        
-        # Enviar via RabbitMQ
-        rabbitmq = RabbitMQService()
-        rabbitmq.send_message(request.data['room_name'], {
-            'id': str(message.id),
-            'room': str(room.id),
-            'room_name': room.name,
-            'sender': str(sender.id),
-            'sender_username': sender.username,
-            'content': message.content,
-            'timestamp': message.timestamp.isoformat(),
-            'message_type': message.message_type
-        })
-        
-        # Criar notificações para outros usuários na sala
-        # Para um sistema real, você teria uma tabela de membros da sala
-        # Por ora, vamos notificar todos os outros usuários
-        other_users = User.objects.exclude(id=sender.id)
-        for user in other_users:
-            Notification.objects.create(
-                user=user,
+        # Mensagem, evento do RabbitMQ (outbox) e notificações na mesma transação
+        with transaction.atomic():
+            ensure_member(room, sender)
+            message = Message.objects.create(
                 room=room,
-                notification_type='message',
-                title=f'Nova mensagem em #{room.name}',
-                message=f'{sender.username}: {message.content[:50]}{"..." if len(message.content) > 50 else ""}',
-                priority='medium',
-                data={
-                    'message_id': str(message.id),
-                    'sender_id': str(sender.id),
-                    'sender_username': sender.username
-                }
+                sender=sender,
+                content=request.data['content'],
+                message_type=request.data.get('message_type', 'text')
             )
+            _publish_message(message)
         
         serializer = MessageSerializer(message)
         response_data = serializer.data
@@ -659,7 +791,7 @@ def send_message(request):
 def rabbitmq_status(request):
     """Status do RabbitMQ com HATEOAS"""
     try:
-        rabbitmq = RabbitMQService()
+        rabbitmq = get_rabbitmq_service()
         status = rabbitmq.get_connection_status()
         
         return Response({
@@ -681,26 +813,24 @@ def rabbitmq_status(request):
             }
         })
 
-@api_view(['GET'])
+@require_http_methods(['GET', 'HEAD'])
 def download_file(request, file_id):
-    """Download de arquivo via REST"""
-    try:
-        upload_dir = os.path.join(os.path.dirname(__file__), '..', 'uploads')
-        
-        # Procurar arquivo com o ID
-        for filename in os.listdir(upload_dir):
-            if filename.startswith(file_id):
-                file_path = os.path.join(upload_dir, filename)
-                
-                with open(file_path, 'rb') as f:
-                    response = HttpResponse(f.read())
-                    response['Content-Disposition'] = f'attachment; filename="{filename}"'
-                    return response
-        
-        raise Http404("Arquivo não encontrado")
-        
-    except Exception as e:
-        return Response({'error': str(e)}, status=404)
+    """
+    Download de arquivo via REST.
+
+    Suporta Range (downloads retomáveis), ETag/If-None-Match e If-Range;
+    o arquivo é enviado em blocos, sem ser lido inteiro na memória.
+    """
+    # Metadados pela chave primária, sem varrer o diretório de uploads
+    stored = find_stored_file(file_id)
+    if stored is None:
+        return JsonResponse({'error': 'Arquivo não encontrado'}, status=404)
+
+    path = stored_file_path(stored)
+    if not os.path.exists(path):
+        return JsonResponse({'error': 'Arquivo não encontrado'}, status=404)
+
+    return file_response(request, path, stored.filename)
 
 @api_view(['GET'])
 def kong_status(request):
@@ -822,15 +952,21 @@ def api_root(request):
     return Response(response_data)
 
 class NotificationViewSet(viewsets.ModelViewSet):
-    queryset = Notification.objects.all()
+    queryset = Notification.objects.select_related('user', 'room')
     serializer_class = NotificationSerializer
     permission_classes = [AllowAny]
     
     def get_queryset(self):
+        # O serializer lê user.username e room.name
+        queryset = Notification.objects.select_related('user', 'room')
         user_id = self.request.query_params.get('user_id')
         if user_id:
-            return Notification.objects.filter(user_id=user_id)
-        return Notification.objects.all()
+            queryset = queryset.filter(user_id=user_id)
+            # is_read=false|true, usado pelo link unread_notifications das estatísticas
+            is_read = self.request.query_params.get('is_read')
+            if is_read in ('true', 'false'):
+                queryset = queryset.filter(is_read=is_read == 'true')
+        return queryset
     
     def create(self, request, *args, **kwargs):
         serializer = CreateNotificationSerializer(data=request.data)
@@ -872,9 +1008,21 @@ class NotificationViewSet(viewsets.ModelViewSet):
         return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
     
     def list(self, request, *args, **kwargs):
-        """Listar notificações com HATEOAS"""
-        queryset = self.get_queryset()
-        serializer = self.get_serializer(queryset, many=True)
+        """
+        Listar notificações com HATEOAS, das mais recentes para as mais antigas.
+
+        Paginação por cursor: before=<next_cursor da página anterior> e
+        limit (máximo MAX_PAGE_SIZE).
+        """
+        try:
+            limit = parse_page_size(request.query_params.get('limit'))
+            before = decode_cursor(request.query_params.get('before'))
+        except ValueError as e:
+            return Response({'error': str(e)}, status=status.HTTP_400_BAD_REQUEST)
+
+        notifications, has_more = keyset_page(self.get_queryset(), 'created_at', limit, before=before)
+        notifications.reverse()
+        serializer = self.get_serializer(notifications, many=True)
         
         # Adicionar links HATEOAS
         for item in serializer.data:
@@ -884,13 +1032,29 @@ class NotificationViewSet(viewsets.ModelViewSet):
                 'delete': {'href': f"/api/notifications/{item['id']}/"}
             }
         
+        links = {
+            'self': {'href': '/api/notifications/'},
+            'create': {'href': '/api/notifications/'},
+            'mark_all_read': {'href': '/api/notifications/mark_all_read/'}
+        }
+        next_cursor = None
+        if has_more:
+            last = notifications[-1]
+            next_cursor = encode_cursor(last.created_at, last.id)
+            links['next'] = {'href': cursor_link(
+                '/api/notifications/',
+                user_id=request.query_params.get('user_id'),
+                is_read=request.query_params.get('is_read'),
+                before=next_cursor,
+                limit=limit
+            )}
+
         return Response({
             'notifications': serializer.data,
-            '_links': {
-                'self': {'href': '/api/notifications/'},
-                'create': {'href': '/api/notifications/'},
-                'mark_all_read': {'href': '/api/notifications/mark_all_read/'}
-            }
+            'count': len(notifications),
+            'has_more': has_more,
+            'next_cursor': next_cursor,
+            '_links': links
         })
     
     def retrieve(self, request, *args, **kwargs):
@@ -930,11 +1094,23 @@ class NotificationViewSet(viewsets.ModelViewSet):
         
         return Response(response_data)
     
+    def _set_read(self, notification, is_read):
+        """Grava is_read só se mudou, ajustando o contador de não lidas"""
+        changed = Notification.objects.filter(pk=notification.pk, is_read=not is_read).update(is_read=is_read)
+        if changed:
+            count_change(notification.user_id, unread=-1 if is_read else 1)
+        notification.is_read = is_read
+
+    def perform_update(self, serializer):
+        was_read = serializer.instance.is_read
+        notification = serializer.save()
+        if notification.is_read != was_read:
+            count_change(notification.user_id, unread=-1 if notification.is_read else 1)
+
     @action(detail=True, methods=['post'])
     def mark_as_read(self, request, pk=None):
         notification = self.get_object()
-        notification.is_read = True
-        notification.save()
+        self._set_read(notification, True)
         
         response_data = NotificationSerializer(notification).data
         response_data['_links'] = {
@@ -956,8 +1132,7 @@ class NotificationViewSet(viewsets.ModelViewSet):
     @action(detail=True, methods=['post'])
     def mark_as_unread(self, request, pk=None):
         notification = self.get_object()
-        notification.is_read = False
-        notification.save()
+        self._set_read(notification, False)
         
         response_data = NotificationSerializer(notification).data
         response_data['_links'] = {
@@ -981,7 +1156,9 @@ class NotificationViewSet(viewsets.ModelViewSet):
         """Marcar todas as notificações como lidas"""
         user_id = request.data.get('user_id')
         if user_id:
-            Notification.objects.filter(user_id=user_id, is_read=False).update(is_read=True)
+            marked = Notification.objects.filter(user_id=user_id, is_read=False).update(is_read=True)
+            if marked:
+                count_change(user_id, unread=-marked)
             return Response({
                 'message': 'Todas as notificações foram marcadas como lidas',
                 '_links': {
@@ -1002,46 +1179,44 @@ def notification_stats(request):
             status=status.HTTP_400_BAD_REQUEST
         )
     
-    try:
-        user = User.objects.get(id=user_id)
-        
-        total = Notification.objects.filter(user=user).count()
-        unread = Notification.objects.filter(user=user, is_read=False).count()
-        read = total - unread
-        
-        stats = {
-            'user_id': user_id,
-            'username': user.username,
-            'total_notifications': total,
-            'unread_notifications': unread,
-            'read_notifications': read,
-            'unread_percentage': round((unread / total * 100) if total > 0 else 0, 2),
-            '_links': {
-                'all_notifications': {
-                    'href': f'/api/notifications/?user_id={user_id}',
-                    'method': 'GET'
-                },
-                'unread_notifications': {
-                    'href': f'/api/notifications/?user_id={user_id}&is_read=false',
-                    'method': 'GET'
-                },
-                'mark_all_as_read': {
-                    'href': '/api/notifications/mark_all_as_read/',
-                    'method': 'POST',
-                    'body': {'user_id': user_id}
-                },
-                'user_profile': {
-                    'href': f'/api/users/{user_id}/',
-                    'method': 'GET'
-                }
-            }
-        }
-        
-        return Response(stats)
-        
-    except User.DoesNotExist:
+    # Contadores em cache; o banco só é consultado para recontar
+    counts = get_counts(user_id)
+    if counts is None:
         return Response(
             {'error': 'Usuário não encontrado'}, 
             status=status.HTTP_404_NOT_FOUND
         )
+    
+    total, unread = counts['total'], counts['unread']
+    read = total - unread
+
+    stats = {
+        'user_id': user_id,
+        'username': counts['username'],
+        'total_notifications': total,
+        'unread_notifications': unread,
+        'read_notifications': read,
+        'unread_percentage': round((unread / total * 100) if total > 0 else 0, 2),
+        '_links': {
+            'all_notifications': {
+                'href': f'/api/notifications/?user_id={user_id}',
+                'method': 'GET'
+            },
+            'unread_notifications': {
+                'href': f'/api/notifications/?user_id={user_id}&is_read=false',
+                'method': 'GET'
+            },
+            'mark_all_as_read': {
+                'href': '/api/notifications/mark_all_as_read/',
+                'method': 'POST',
+                'body': {'user_id': user_id}
+            },
+            'user_profile': {
+                'href': f'/api/users/{user_id}/',
+                'method': 'GET'
+            }
+        }
+    }
+
+    return Response(stats)
 
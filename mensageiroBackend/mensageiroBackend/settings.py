@@ -14,6 +14,7 @@ ALLOWED_HOSTS = ['*']
 
 # Application definition
 INSTALLED_APPS = [
+    'daphne',  # runserver com suporte a WebSocket (ASGI)
     'django.contrib.admin',
     'django.contrib.auth',
     'django.contrib.contenttypes',
@@ -58,13 +59,92 @@ TEMPLATES = [
 ]
 
 WSGI_APPLICATION = 'mensageiroBackend.wsgi.application'
+ASGI_APPLICATION = 'mensageiroBackend.asgi.application'
 
-# Database
-DATABASES = {
+# Channel layer usado por ChatConsumer para push de mensagens em tempo real.
+# Redis permite vários processos Daphne; com mais de uma instância, grupos e
+# canais são distribuídos entre elas por hash consistente do nome
+# (channels-redis). Todos os processos devem listar as instâncias na mesma
+# ordem. Ex.: CHANNEL_REDIS_HOSTS=redis://r1:6379/0,redis://r2:6379/0
+CHANNEL_REDIS_HOSTS = os.environ.get('CHANNEL_REDIS_HOSTS', 'redis://localhost:6379/0').split(',')
+
+CHANNEL_LAYERS = {
     'default': {
-        'ENGINE': 'django.db.backends.sqlite3',
-        'NAME': BASE_DIR / 'db.sqlite3',
+        'BACKEND': 'channels_redis.core.RedisChannelLayer',
+        'CONFIG': {
+            'hosts': CHANNEL_REDIS_HOSTS,
+            'prefix': 'mensageiro',
+            'capacity': 1000,  # mensagens pendentes por canal
+            'expiry': 60,  # segundos até uma mensagem não lida expirar
+        },
+    }
+}
+
+# Cache de membros das salas e contadores de notificações, compartilhado
+# pelo Daphne, WSGI, SOAP e outbox_relay: um processo precisa ver o que o
+# outro escreveu (entrada numa sala, notificações criadas pelo relay).
+# CACHE_REDIS_URL vazio usa memória local, só para um processo. Os testes
+# usam memória local (backend.test_runner).
+CACHE_REDIS_URL = os.environ.get('CACHE_REDIS_URL', 'redis://localhost:6379/1')
+if CACHE_REDIS_URL:
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.redis.RedisCache',
+            'LOCATION': CACHE_REDIS_URL,
+        }
+    }
+
+TEST_RUNNER = 'backend.test_runner.TestRunner'
+
+# Database
+# SQLite por padrão; DATABASE_ENGINE=postgresql usa o PostgreSQL (POSTGRES_*),
+# que aceita escritas concorrentes do Daphne, do WSGI e do serviço SOAP.
+DATABASE_ENGINE = os.environ.get('DATABASE_ENGINE', 'sqlite')
+# Conexões persistentes, reaproveitadas pelos workers entre requisições
+DB_CONN_MAX_AGE = int(os.environ.get('DB_CONN_MAX_AGE', 60))
+
+if DATABASE_ENGINE == 'postgresql':
+    # Pool no servidor: aponte POSTGRES_HOST/PORT para o PgBouncer e defina
+    # POSTGRES_PGBOUNCER=1 (modo transaction, sem cursores no servidor)
+    POSTGRES_PGBOUNCER = os.environ.get('POSTGRES_PGBOUNCER', '') == '1'
+    DATABASES = {
+        'default': {
+            'ENGINE': 'django.db.backends.postgresql',
+            'NAME': os.environ.get('POSTGRES_DB', 'mensageiro'),
+            'USER': os.environ.get('POSTGRES_USER', 'mensageiro'),
+            'PASSWORD': os.environ.get('POSTGRES_PASSWORD', ''),
+            'HOST': os.environ.get('POSTGRES_HOST', 'localhost'),
+            'PORT': os.environ.get('POSTGRES_PORT', '5432'),
+            'CONN_MAX_AGE': DB_CONN_MAX_AGE,
+            'CONN_HEALTH_CHECKS': True,
+            'DISABLE_SERVER_SIDE_CURSORS': POSTGRES_PGBOUNCER,
+            'OPTIONS': {
+                'application_name': os.environ.get('POSTGRES_APPLICATION_NAME', 'mensageiro'),
+            },
+        }
+    }
+else:
+    DATABASES = {
+        'default': {
+            # sqlite3 do Django com BEGIN IMMEDIATE (backend/sqlite/base.py)
+            'ENGINE': 'backend.sqlite',
+            'NAME': os.environ.get('SQLITE_PATH', BASE_DIR / 'db.sqlite3'),
+            'CONN_MAX_AGE': DB_CONN_MAX_AGE,
+            'CONN_HEALTH_CHECKS': True,
+            # Em arquivo: testes com mais de um processo abrem o mesmo banco
+            'TEST': {'NAME': BASE_DIR / 'test_db.sqlite3'},
+        }
     }
+
+# PRAGMAs aplicados a cada conexão SQLite (backend.sqlite). Em WAL leitores
+# e escritores de processos diferentes não se bloqueiam; com synchronous
+# NORMAL só o checkpoint faz fsync (uma queda de energia pode perder os
+# últimos commits, sem corromper o banco). Manutenção: sqlite_maintenance
+SQLITE_PRAGMAS = {
+    'busy_timeout': 5000,  # ms esperando a trava de escrita
+    'journal_mode': os.environ.get('SQLITE_JOURNAL_MODE', 'wal'),
+    'synchronous': 'normal',
+    'mmap_size': 256 * 1024 * 1024,
 }
 
 # Password validation
@@ -97,6 +177,24 @@ STATIC_ROOT = os.path.join(BASE_DIR, 'staticfiles')
 MEDIA_URL = '/media/'
 MEDIA_ROOT = os.path.join(BASE_DIR, 'media')
 
+# Arquivos enviados pelo serviço SOAP (e baixados via /api/files/<id>/)
+UPLOAD_DIR = os.path.join(BASE_DIR, 'uploads')
+
+# Servidor SOAP em produção (soap_service/serve.py)
+SOAP_HOST = '0.0.0.0'
+SOAP_PORT = 8001
+SOAP_WORKERS = 4  # processos (gunicorn); cada um chama django.setup() uma vez
+SOAP_THREADS = 8  # threads por processo
+SOAP_TIMEOUT = 300  # segundos; uploads grandes levam tempo
+
+# Logs do serviço SOAP (soap_service.telemetry)
+SOAP_LOG_SAMPLE_RATE = 1.0  # fração dos registros abaixo de WARNING que é emitida
+SOAP_LOG_CONTROL_FILE = os.path.join(BASE_DIR, 'soap_logging.json')  # nível/amostragem em tempo de execução
+
+# Blobs endereçados por conteúdo (backend.storage), relativos a UPLOAD_DIR
+BLOB_DIR = 'blobs'
+BLOB_GC_GRACE = 60 * 60  # segundos antes de um blob sem referências poder ser removido
+
 # Default primary key field type
 DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
 
@@ -151,14 +249,16 @@ REDOC_SETTINGS = {
 LOGGING = {
     'version': 1,
     'disable_existing_loggers': False,
+    # O nível de cada logger decide o que é emitido (soap_service pode
+    # passar a DEBUG em tempo de execução)
     'handlers': {
         'file': {
-            'level': 'INFO',
+            'level': 'DEBUG',
             'class': 'logging.FileHandler',
             'filename': os.path.join(BASE_DIR, 'mensageiro.log'),
         },
         'console': {
-            'level': 'INFO',
+            'level': 'DEBUG',
             'class': 'logging.StreamHandler',
         },
     },
@@ -173,6 +273,11 @@ LOGGING = {
             'level': 'INFO',
             'propagate': True,
         },
+        'soap_service': {
+            'handlers': ['file', 'console'],
+            'level': 'INFO',
+            'propagate': False,
+        },
     },
 }
 
@@ -181,4 +286,32 @@ RABBITMQ_HOST = 'localhost'
 RABBITMQ_PORT = 5672
 RABBITMQ_USER = 'guest'
 RABBITMQ_PASS = 'guest'
-RABBITMQ_VHOST = '/' 
+RABBITMQ_VHOST = '/'
+
+# Pool de conexões do publicador (backend.rabbitmq_service)
+RABBITMQ_POOL_SIZE = 4
+RABBITMQ_POOL_TIMEOUT = 5  # segundos aguardando um canal livre
+RABBITMQ_RECONNECT_BACKOFF = 0.5  # segundos, dobra a cada falha
+RABBITMQ_RECONNECT_BACKOFF_MAX = 30
+RABBITMQ_PUBLISHER_CONFIRMS = True  # basic_publish aguarda o ack do broker
+RABBITMQ_CONFIRM_TIMEOUT = 30  # segundos aguardando as confirmações de um lote do relay
+
+# Outbox transacional (backend.outbox, comando outbox_relay)
+OUTBOX_BATCH_SIZE = 200
+OUTBOX_POLL_INTERVAL = 0.5  # segundos entre consultas com o outbox vazio
+OUTBOX_RETENTION = 24 * 60 * 60  # segundos que eventos publicados são mantidos
+OUTBOX_MAX_ATTEMPTS = 5  # tentativas de um fan-out antes de marcá-lo como falho
+
+# Arquivo de mensagens (backend.archive, comando archive_messages): as mais
+# antigas que MESSAGE_HOT_DAYS saem da tabela messages para messages_archive
+MESSAGE_HOT_DAYS = 30
+MESSAGE_ARCHIVE_BATCH_SIZE = 500
+
+# Notificações criadas pelo worker em blocos de bulk_create
+NOTIFICATION_FANOUT_CHUNK = 500
+
+# Cache de "usuário é membro da sala", por sala e usuário (backend.membership)
+ROOM_MEMBERS_CACHE_TTL = 60  # segundos
+
+# Contadores de notificações por usuário (backend.notification_counts)
+NOTIFICATION_COUNTS_TTL = 5 * 60  # segundos até recontar no banco
@@ -19,6 +19,10 @@ echo Executando migracoes...
 python manage.py makemigrations
 python manage.py migrate
 
+echo.
+echo Iniciando relay do outbox (publicacao no RabbitMQ)...
+start "Outbox Relay" python manage.py outbox_relay
+
 echo.
 echo Iniciando servidor Django...
 echo Backend disponivel em: http://localhost:8000
@@ -0,0 +1,117 @@
+"""
+Teste de carga do serviço SOAP: requisições por segundo em upload,
+download e listagem, com várias conexões simultâneas.
+
+    python soap_service/loadtest.py --url http://localhost:8001/soap --concurrency 16 --requests 500
+
+Só usa a biblioteca padrão; rode contra o servidor de produção
+(soap_service/serve.py) para medir o efeito de --workers e --threads.
+"""
+import argparse
+import base64
+import http.client
+import os
+import re
+import statistics
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import urlsplit
+
+FILE_ID_RE = re.compile(rb'<file_id>([^<]+)</file_id>')
+
+
+def soap_envelope(operation, fields):
+    params = ''.join(f'<{name}>{value}</{name}>' for name, value in fields.items())
+    return (
+        '<?xml version="1.0" encoding="UTF-8"?>'
+        '<soap:Envelope xmlns:soap="http://schemas.xmlsoap.org/soap/envelope/" '
+        'xmlns:tns="http://mensageiro.soap.service">'
+        f'<soap:Body><tns:{operation}>{params}</tns:{operation}></soap:Body>'
+        '</soap:Envelope>'
+    ).encode()
+
+
+class Connections:
+    """Uma conexão keep-alive por thread"""
+
+    def __init__(self, url):
+        parts = urlsplit(url)
+        self.host, self.port, self.path = parts.hostname, parts.port or 80, parts.path or '/'
+        self.local = threading.local()
+
+    def post(self, body):
+        connection = getattr(self.local, 'connection', None)
+        if connection is None:
+            connection = self.local.connection = http.client.HTTPConnection(self.host, self.port, timeout=60)
+        try:
+            connection.request('POST', self.path, body, {'Content-Type': 'text/xml; charset=utf-8'})
+            response = connection.getresponse()
+            return response.status, response.read()
+        except (OSError, http.client.HTTPException):
+            connection.close()
+            self.local.connection = None
+            raise
+
+
+def run(connections, label, body, total, concurrency):
+    latencies, errors = [], 0
+    lock = threading.Lock()
+
+    def request(_):
+        nonlocal errors
+        start = time.perf_counter()
+        try:
+            status, _ = connections.post(body)
+            ok = status == 200
+        except (OSError, http.client.HTTPException):
+            ok = False
+        elapsed = time.perf_counter() - start
+        with lock:
+            latencies.append(elapsed)
+            errors += not ok
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        list(pool.map(request, range(total)))
+    seconds = time.perf_counter() - start
+
+    latencies.sort()
+    p95 = latencies[int(len(latencies) * 0.95) - 1] if latencies else 0
+    print(
+        f'{label:<9} {total / seconds:8.1f} req/s   '
+        f'média {statistics.mean(latencies) * 1000:7.1f} ms   p95 {p95 * 1000:7.1f} ms   erros {errors}'
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Teste de carga do serviço SOAP')
+    parser.add_argument('--url', default='http://localhost:8001/soap')
+    parser.add_argument('--concurrency', type=int, default=16)
+    parser.add_argument('--requests', type=int, default=500, help='Requisições por operação')
+    parser.add_argument('--size', type=int, default=256, help='Tamanho do arquivo em KB')
+    parser.add_argument('--room', default='loadtest')
+    args = parser.parse_args()
+
+    connections = Connections(args.url)
+    content = base64.b64encode(os.urandom(args.size * 1024)).decode()
+    upload = soap_envelope('upload_file', {
+        'username': 'loadtest', 'room_name': args.room, 'filename': 'carga.bin', 'file_data': content
+    })
+
+    # Arquivo usado nos downloads
+    status, body = connections.post(upload)
+    match = FILE_ID_RE.search(body)
+    if status != 200 or not match:
+        raise SystemExit(f'Upload inicial falhou (HTTP {status})')
+    download = soap_envelope('download_file', {'file_id': match.group(1).decode()})
+    listing = soap_envelope('list_files', {'room_name': args.room, 'limit': 50})
+
+    print(f'{args.requests} requisições por operação, {args.concurrency} conexões, arquivo de {args.size} KB\n')
+    run(connections, 'upload', upload, args.requests, args.concurrency)
+    run(connections, 'download', download, args.requests, args.concurrency)
+    run(connections, 'list', listing, args.requests, args.concurrency)
+
+
+if __name__ == '__main__':
+    main()
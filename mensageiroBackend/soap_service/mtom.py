@@ -0,0 +1,161 @@
+"""
+MTOM/XOP (multipart/related) para o FileService.
+
+Com MTOM o envelope SOAP vai na primeira parte e o conteúdo binário de
+file_data em partes separadas, sem base64, referenciado no XML por
+<xop:Include href="cid:..."/>. Requisições text/xml (base64 inline)
+continuam aceitas.
+"""
+import uuid
+from email.message import Message
+from urllib.parse import unquote
+
+XOP_NS = 'http://www.w3.org/2004/08/xop/include'
+MTOM_MEDIA_TYPE = 'multipart/related'
+
+# Limite para o bloco de cabeçalhos de cada parte
+MAX_HEADER_SIZE = 16 * 1024
+# Tamanho dos blocos lidos do disco ao montar a resposta
+WRITE_CHUNK_SIZE = 64 * 1024
+
+
+class MultipartError(ValueError):
+    """Corpo multipart/related inválido"""
+
+
+def parse_content_type(content_type):
+    """Retorna (tipo, parâmetros) de um cabeçalho Content-Type"""
+    message = Message()
+    message['content-type'] = content_type or ''
+    params = dict(message.get_params()[1:]) if message.get_params() else {}
+    return message.get_content_type(), params
+
+
+def is_mtom(content_type):
+    return parse_content_type(content_type)[0] == MTOM_MEDIA_TYPE
+
+
+def content_id(value):
+    """Normaliza Content-ID ('<id>') e href de xop:Include ('cid:id')"""
+    value = (value or '').strip()
+    if value.startswith('cid:'):
+        value = unquote(value[4:])
+    return value.strip('<>')
+
+
+class MultipartReader:
+    """
+    Lê as partes de um corpo multipart/related a partir de blocos de bytes.
+
+    Cada parte é entregue como (cabeçalhos, gerador de blocos do corpo);
+    o corpo nunca é mantido inteiro em memória.
+    """
+
+    def __init__(self, chunks, boundary):
+        self.chunks = iter(chunks)
+        self.delimiter = b'\r\n--' + boundary.encode('latin-1')
+        # O primeiro delimitador pode não ser precedido por CRLF
+        self.buffer = b'\r\n'
+
+    def _fill(self):
+        chunk = next(self.chunks, b'')
+        if not chunk:
+            raise MultipartError('Corpo multipart incompleto')
+        self.buffer += chunk
+
+    def _read_until(self, marker):
+        while True:
+            index = self.buffer.find(marker)
+            if index >= 0:
+                if index:
+                    yield self.buffer[:index]
+                self.buffer = self.buffer[index + len(marker):]
+                return
+
+            # Guarda o suficiente para achar um marcador dividido entre blocos
+            keep = len(marker) - 1
+            if len(self.buffer) > keep:
+                yield self.buffer[:-keep]
+                self.buffer = self.buffer[-keep:]
+            self._fill()
+
+    def _read_headers(self):
+        raw, size = [], 0
+        for block in self._read_until(b'\r\n\r\n'):
+            size += len(block)
+            if size > MAX_HEADER_SIZE:
+                raise MultipartError('Cabeçalhos da parte muito grandes')
+            raw.append(block)
+
+        headers = {}
+        for line in b''.join(raw).decode('latin-1').split('\r\n'):
+            if ':' in line:
+                name, value = line.split(':', 1)
+                headers[name.strip().lower()] = value.strip()
+        return headers
+
+    def parts(self):
+        # Ignora o preâmbulo
+        for _ in self._read_until(self.delimiter):
+            pass
+
+        while True:
+            while len(self.buffer) < 2:
+                self._fill()
+            if self.buffer.startswith(b'--'):
+                return
+
+            headers = self._read_headers()
+            body = self._read_until(self.delimiter)
+            yield headers, body
+            # Descarta o que o consumidor não leu da parte
+            for _ in body:
+                pass
+
+
+def accepts_mtom(request):
+    """Responde em MTOM a quem enviou MTOM ou pediu multipart/related"""
+    return is_mtom(request.content_type) or MTOM_MEDIA_TYPE in (request.headers.get('Accept') or '')
+
+
+def mtom_response(envelope, attachments):
+    """
+    Monta uma resposta multipart/related.
+
+    `envelope` são os bytes do envelope SOAP e `attachments` uma lista de
+    (content_id, caminho do arquivo); os arquivos são lidos em blocos
+    enquanto a resposta é enviada. Retorna (Content-Type, gerador do corpo).
+    """
+    boundary = f'MIMEBoundary_{uuid.uuid4().hex}'
+    root_id = f'root.{uuid.uuid4().hex}@mensageiro.soap.service'
+    content_type = (
+        f'{MTOM_MEDIA_TYPE}; type="application/xop+xml"; boundary="{boundary}"; '
+        f'start="<{root_id}>"; start-info="text/xml"'
+    )
+
+    def body():
+        yield (
+            f'--{boundary}\r\n'
+            'Content-Type: application/xop+xml; charset=UTF-8; type="text/xml"\r\n'
+            'Content-Transfer-Encoding: 8bit\r\n'
+            f'Content-ID: <{root_id}>\r\n\r\n'
+        ).encode()
+        yield envelope
+
+        for attachment_id, path in attachments:
+            yield (
+                f'\r\n--{boundary}\r\n'
+                'Content-Type: application/octet-stream\r\n'
+                'Content-Transfer-Encoding: binary\r\n'
+                f'Content-ID: <{attachment_id}>\r\n\r\n'
+            ).encode()
+            with open(path, 'rb') as f:
+                while True:
+                    chunk = f.read(WRITE_CHUNK_SIZE)
+                    if not chunk:
+                        break
+                    yield chunk
+
+        yield f'\r\n--{boundary}--\r\n'.encode()
+
+    return content_type, body()
@@ -0,0 +1,72 @@
+"""
+Servidor SOAP de produção.
+
+Usa gunicorn (vários processos com threads, worker gthread) e, no
+Windows, onde o gunicorn não roda, waitress (um processo com threads).
+Os valores padrão vêm de SOAP_* em settings.py.
+
+    python soap_service/serve.py --workers 4 --threads 8
+"""
+import argparse
+import os
+import sys
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'mensageiroBackend.settings')
+
+from django.conf import settings
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description='Servidor SOAP de produção')
+    parser.add_argument('--host', default=settings.SOAP_HOST)
+    parser.add_argument('--port', type=int, default=settings.SOAP_PORT)
+    parser.add_argument('--workers', type=int, default=settings.SOAP_WORKERS)
+    parser.add_argument('--threads', type=int, default=settings.SOAP_THREADS)
+    parser.add_argument('--timeout', type=int, default=settings.SOAP_TIMEOUT)
+    return parser.parse_args()
+
+
+def run_gunicorn(args):
+    from gunicorn.app.base import BaseApplication
+
+    class SoapApplication(BaseApplication):
+        def load_config(self):
+            self.cfg.set('bind', f'{args.host}:{args.port}')
+            self.cfg.set('workers', args.workers)
+            self.cfg.set('threads', args.threads)
+            self.cfg.set('worker_class', 'gthread')
+            self.cfg.set('timeout', args.timeout)
+            # Sem preload: cada worker importa a aplicação e configura o
+            # Django no próprio processo, sem conexões herdadas do master
+            self.cfg.set('preload_app', False)
+
+        def load(self):
+            from soap_service.wsgi import application
+            return application
+
+    SoapApplication().run()
+
+
+def run_waitress(args):
+    from waitress import serve
+    from soap_service.wsgi import application
+
+    serve(application, host=args.host, port=args.port, threads=args.threads,
+          channel_timeout=args.timeout)
+
+
+def main():
+    args = parse_args()
+    print(f"🚀 Servidor SOAP em http://{args.host}:{args.port}/soap")
+
+    if sys.platform == 'win32':
+        print(f"🔧 waitress: {args.threads} threads")
+        run_waitress(args)
+    else:
+        print(f"🔧 gunicorn: {args.workers} workers x {args.threads} threads")
+        run_gunicorn(args)
+
+
+if __name__ == '__main__':
+    main()
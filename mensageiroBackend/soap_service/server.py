@@ -9,17 +9,44 @@ sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 django.setup()
 
 from flask import Flask, request, Response
-import xml.etree.ElementTree as ET
+import logging
 import uuid
 import json
 import pika
 from datetime import datetime
 import base64
-from backend.models import User, ChatRoom, Message, Notification
-from backend.rabbitmq_service import get_rabbitmq_service
+from backend.models import User, ChatRoom, Message, StoredFile
+from django.db import close_old_connections, transaction
+from backend.outbox import enqueue_chat_message
+from backend.notifications import schedule_fanout
+from backend.membership import ensure_member
+from backend.realtime import broadcast_message
+from backend.pagination import decode_cursor, encode_cursor, keyset_page, parse_page_size
+from backend.storage import find_stored_file, store_blob, stored_file_path
+from soap_service.mtom import MTOM_MEDIA_TYPE, XOP_NS, accepts_mtom, mtom_response
+from soap_service.soap_stream import SoapRequestError, StreamedFile, parse_soap_request
+from soap_service.xml_writer import (
+    ENVELOPE_HEAD, ENVELOPE_TAIL, SERVICE_NS, XmlWriter, envelope, fault, operation_response
+)
+from soap_service.telemetry import METRICS, LogControl, OperationTimer, apply_log_settings, log_event, logger
 
 app = Flask(__name__)
 
+# Logs estruturados com amostragem; nível ajustável em produção (soap_logging)
+apply_log_settings(sample_rate=settings.SOAP_LOG_SAMPLE_RATE)
+log_control = LogControl(settings.SOAP_LOG_CONTROL_FILE)
+
+# Conexões do Django por thread, reaproveitadas entre requisições até
+# CONN_MAX_AGE (o Flask não dispara os sinais de requisição do Django)
+@app.before_request
+def before_request():
+    close_old_connections()
+    log_control.refresh()
+
+@app.teardown_request
+def teardown_request(exception):
+    close_old_connections()
+
 # Adicionar CORS headers a todas as respostas
 @app.after_request
 def after_request(response):
@@ -29,19 +56,11 @@ def after_request(response):
     response.headers['Access-Control-Max-Age'] = '3600'
     return response
 
-# Diretório para uploads
-UPLOAD_DIR = os.path.join(os.path.dirname(__file__), '..', 'uploads')
-os.makedirs(UPLOAD_DIR, exist_ok=True)
+# Diretório para uploads (settings.UPLOAD_DIR, compartilhado com o Django)
+os.makedirs(settings.UPLOAD_DIR, exist_ok=True)
 
-def create_soap_envelope(body_content):
-    """Cria envelope SOAP"""
-    return f"""<?xml version="1.0" encoding="UTF-8"?>
-<soap:Envelope xmlns:soap="http://schemas.xmlsoap.org/soap/envelope/"
-               xmlns:tns="http://mensageiro.soap.service">
-    <soap:Body>
-        {body_content}
-    </soap:Body>
-</soap:Envelope>"""
+# Downloads em base64 são enviados em blocos deste tamanho (múltiplo de 3)
+DOWNLOAD_CHUNK_SIZE = 3 * 16 * 1024
 
 def create_wsdl():
     """Gera WSDL do serviço"""
@@ -97,10 +116,13 @@ def create_wsdl():
     
     <message name="listFilesRequest">
         <part name="room_name" type="xsd:string"/>
+        <part name="limit" type="xsd:int"/>
+        <part name="cursor" type="xsd:string"/>
     </message>
     
     <message name="listFilesResponse">
         <part name="files" type="tns:FileInfo" maxOccurs="unbounded"/>
+        <part name="next_cursor" type="xsd:string"/>
     </message>
 
     <portType name="FileServicePortType">
@@ -144,322 +166,342 @@ def create_wsdl():
     </service>
 </definitions>"""
 
+# O WSDL não muda com o serviço no ar: codificado uma única vez
+WSDL_BYTES = create_wsdl().encode('utf-8')
+
 @app.route('/', methods=['GET'])
 def wsdl():
     """Retorna WSDL"""
     if request.args.get('wsdl') is not None:
-        return Response(create_wsdl(), mimetype='text/xml')
+        return Response(WSDL_BYTES, mimetype='text/xml')
     return "Serviço SOAP ativo. Acesse ?wsdl para ver o WSDL"
 
 @app.route('/soap', methods=['OPTIONS'])
 def soap_options():
     """Handle CORS preflight for SOAP endpoint"""
-    return '', 200
+    # Clientes consultam Accept-Post para decidir entre MTOM e base64 inline
+    return '', 200, {'Accept-Post': f'text/xml, {MTOM_MEDIA_TYPE}; type="application/xop+xml"'}
+
+@app.route('/metrics', methods=['GET'])
+def metrics():
+    """Tempos por operação e fase, acumulados neste processo"""
+    return Response(json.dumps(METRICS.snapshot()), mimetype='application/json')
 
 @app.route('/soap', methods=['POST'])
 def soap_service():
     """Processa requisições SOAP"""
+    params = {}
+    timer = OperationTimer()
+    response = None
     try:
-        print("=== DEBUG: Recebeu requisição SOAP ===")
-        print(f"DEBUG: Content-Type: {request.content_type}")
-        print(f"DEBUG: Tamanho dos dados: {len(request.data) if request.data else 0}")
-        
-        # Parse do XML SOAP
-        root = ET.fromstring(request.data)
-        print("DEBUG: XML parseado com sucesso")
+        log_event(logging.DEBUG, 'soap_received',
+                  content_type=request.content_type, content_length=request.content_length or 0)
         
-        # Encontrar a operação
-        body = root.find('.//{http://schemas.xmlsoap.org/soap/envelope/}Body')
-        if body is None:
-            print("DEBUG: Body SOAP não encontrado")
-            return create_error_response("Body SOAP não encontrado")
+        # Parse incremental do XML SOAP: file_data vai direto para o disco
+        with timer.phase('parse'):
+            operation, params = parse_soap_request(request.stream, settings.UPLOAD_DIR, request.content_type)
+        namespace, name = operation
+        timer.operation = name
         
-        print("DEBUG: Body SOAP encontrado")
+        # Decodificação, hash e gravação acontecem durante o parse
+        for value in params.values():
+            if isinstance(value, StreamedFile):
+                for phase, seconds in value.timings.items():
+                    timer.add(phase, seconds)
+                    timer.phases['parse'] -= seconds
         
-        # Verificar qual operação foi chamada
-        for child in body:
-            operation = child.tag.split('}')[-1] if '}' in child.tag else child.tag
-            print(f"DEBUG: Operação encontrada: {operation}")
-            
-            if operation == 'upload_file':
-                print("DEBUG: Chamando handle_upload_file")
-                return handle_upload_file(child)
-            elif operation == 'download_file':
-                print("DEBUG: Chamando handle_download_file")
-                return handle_download_file(child)
-            elif operation == 'list_files':
-                print("DEBUG: Chamando handle_list_files")
-                return handle_list_files(child)
-        
-        return create_error_response("Operação não reconhecida")
+        handler = SOAP_OPERATIONS.get((namespace or SERVICE_NS, name))
+        if handler is None:
+            response = create_error_response("Operação não reconhecida")
+        else:
+            response = handler(params, timer)
+        return response
         
-    except ET.ParseError as e:
-        print(f"DEBUG: Erro de parse XML: {e}")
-        return create_error_response(f"Erro ao parsear XML: {str(e)}")
+    except SoapRequestError as e:
+        log_event(logging.INFO, 'soap_invalid_request', error=e)
+        response = create_error_response(str(e))
+        return response
     except Exception as e:
-        print(f"DEBUG: Erro geral: {e}")
-        import traceback
-        traceback.print_exc()
-        return create_error_response(f"Erro interno: {str(e)}")
+        logger.exception('Erro ao processar requisição SOAP')
+        response = create_error_response(f"Erro interno: {str(e)}")
+        return response
+    finally:
+        # Arquivo temporário que não foi movido pelo upload (erro ou outra operação)
+        for value in params.values():
+            if isinstance(value, StreamedFile):
+                value.discard()
+        timer.finish('ok' if response is not None and response.status_code == 200 else 'fault')
 
-def handle_upload_file(element):
-    """Processa upload de arquivo"""
+def handle_upload_file(params, timer):
+    """Processa upload de arquivo (file_data já decodificado em disco)"""
     try:
-        print("=== DEBUG: Iniciando handle_upload_file ===")
-        
         # Extrair parâmetros
-        username = get_element_text(element, 'username') or 'guest'
-        room_name = get_element_text(element, 'room_name') or 'default'
-        filename = get_element_text(element, 'filename')
-        file_data_b64 = get_element_text(element, 'file_data')
-        description = get_element_text(element, 'description', '')
-        
-        print(f"DEBUG: Parâmetros - username: {username}, room_name: {room_name}, filename: {filename}")
+        username = params.get('username') or 'guest'
+        room_name = params.get('room_name') or 'default'
+        filename = params.get('filename')
+        file_data = params.get('file_data')
+        description = params.get('description', '')
         
         if not filename:
-            print("DEBUG: Erro - filename ausente")
             return create_error_response("Filename é obrigatório")
         
-        if not file_data_b64:
-            print("DEBUG: Erro - file_data ausente")
+        if not isinstance(file_data, StreamedFile) or not file_data.size:
             return create_error_response("File_data é obrigatório")
         
-        try:
-            # Decodificar dados do arquivo
-            file_data = base64.b64decode(file_data_b64)
-            print(f"DEBUG: Arquivo decodificado, tamanho: {len(file_data)} bytes")
-        except Exception as e:
-            print(f"DEBUG: Erro ao decodificar base64: {e}")
-            return create_error_response(f"Erro ao decodificar arquivo: {str(e)}")
+        file_size = file_data.size
         
         # Gerar ID único para o arquivo
         file_id = str(uuid.uuid4())
         
-        # Salvar arquivo
-        file_path = os.path.join(UPLOAD_DIR, f"{file_id}_{filename}")
-        print(f"DEBUG: Salvando arquivo em: {file_path}")
-        
-        with open(file_path, 'wb') as f:
-            f.write(file_data)
+        # Conteúdo já conhecido não é gravado de novo: o upload passa a
+        # referenciar o blob existente
+        with timer.phase('store'):
+            stored_name = store_blob(file_data.path, file_data.sha256)
+        file_path = os.path.join(settings.UPLOAD_DIR, stored_name)
         
         # Buscar ou criar usuário e sala
+        user = room = None
         try:
-            user, created = User.objects.get_or_create(username=username)
-            room, created = ChatRoom.objects.get_or_create(name=room_name)
-            print(f"DEBUG: Usuário: {user.username}, Sala: {room.name}")
-        except Exception as e:
-            print(f"DEBUG: Erro ao buscar/criar usuário/sala: {e}")
+            with timer.phase('db'):
+                user, created = User.objects.get_or_create(username=username)
+                room, created = ChatRoom.objects.get_or_create(name=room_name)
+        except Exception:
+            logger.exception('Erro ao buscar/criar usuário %s ou sala %s', username, room_name)
             # Continuar mesmo se der erro no banco
         
-        # Criar mensagem no chat
+        # Metadados do arquivo: sem eles o arquivo não pode ser baixado
+        try:
+            with timer.phase('db'):
+                StoredFile.objects.create(
+                    id=file_id,
+                    room=room,
+                    uploader=user,
+                    filename=filename,
+                    size=file_size,
+                    sha256=file_data.sha256,
+                    path=stored_name
+                )
+        except Exception as e:
+            logger.exception('Erro ao registrar arquivo %s', file_id)
+            # O blob pode ser compartilhado; sem referências, a coleta o remove
+            return create_error_response(f"Erro ao registrar arquivo: {str(e)}")
+        
+        # Criar mensagem no chat, evento do RabbitMQ (outbox) e notificações
+        # numa única transação; o relay publica no broker fora da requisição
         try:
             message_content = f"📎 Arquivo compartilhado: {filename}"
             if description:
                 message_content += f" - {description}"
             
-            message = Message.objects.create(
-                room=room,
-                sender=user,
-                content=message_content,
-                message_type='system'
-            )
-            print(f"DEBUG: Mensagem criada: {message.id}")
-            
-            # Publicar no RabbitMQ
-            message_data = {
-                'id': str(message.id),
-                'room_name': room.name,
-                'sender_username': user.username,
-                'content': message.content,
-                'timestamp': message.timestamp.isoformat(),
-                'message_type': 'system',
-                'file_info': {
-                    'file_id': file_id,
-                    'filename': filename,
-                    'file_size': str(len(file_data)),
-                    'file_path': file_path
-                }
-            }
-            
-            rabbitmq_service = get_rabbitmq_service()
-            rabbitmq_service.publish_message(message_data)
-            print("DEBUG: Mensagem publicada no RabbitMQ")
-            
-            # Criar notificações para outros usuários na sala
-            try:
-                other_users = User.objects.exclude(id=user.id)
-                for other_user in other_users:
-                    Notification.objects.create(
-                        user=other_user,
+            with timer.phase('db'), transaction.atomic():
+                ensure_member(room, user)
+                message = Message.objects.create(
+                    room=room,
+                    sender=user,
+                    content=message_content,
+                    message_type='system'
+                )
+                
+                with timer.phase('publish'):
+                    enqueue_chat_message(message, file_info={
+                        'file_id': file_id,
+                        'filename': filename,
+                        'file_size': str(file_size),
+                        'file_path': file_path
+                    })
+                    
+                    # Notificações para os outros usuários: criadas em lote pelo worker
+                    schedule_fanout(
                         room=room,
+                        sender=user,
                         notification_type='file_upload',
                         title=f'Arquivo compartilhado em #{room.name}',
                         message=f'{user.username} compartilhou: {filename}',
-                        priority='medium',
                         data={
                             'file_id': file_id,
                             'filename': filename,
-                            'file_size': str(len(file_data)),
+                            'file_size': str(file_size),
                             'uploader_id': str(user.id),
                             'uploader_username': user.username
                         }
                     )
-                print(f"DEBUG: Criadas {other_users.count()} notificações de arquivo")
-            except Exception as notif_error:
-                print(f"DEBUG: Erro ao criar notificações: {notif_error}")
+                    
+                    broadcast_message(message)
+            # 'db' inclui o tempo de 'publish', que acontece dentro da transação
+            timer.phases['db'] -= timer.phases.get('publish', 0.0)
             
-        except Exception as e:
-            print(f"DEBUG: Erro ao criar mensagem/publicar RabbitMQ: {e}")
+        except Exception:
+            logger.exception('Erro ao criar mensagem/notificações do arquivo %s', file_id)
             # Continuar mesmo se der erro
         
-        # Criar resposta SOAP
-        response_body = f"""<upload_file_response>
-            <success>true</success>
-            <message>Arquivo enviado com sucesso</message>
-            <file_id>{file_id}</file_id>
-            <filename>{filename}</filename>
-            <file_size>{len(file_data)}</file_size>
-            <upload_date>{datetime.now().isoformat()}</upload_date>
-            <uploader_username>{username}</uploader_username>
-            <room_name>{room_name}</room_name>
-        </upload_file_response>"""
+        log_event(logging.DEBUG, 'soap_upload_stored', file_id=file_id, size=file_size, room=room_name)
         
-        print("DEBUG: Criando resposta de sucesso")
-        response_xml = create_soap_envelope(response_body)
-        print(f"DEBUG: XML de resposta: {response_xml[:200]}...")
+        # Criar resposta SOAP
+        response_xml = operation_response('upload_file_response', {
+            'success': 'true',
+            'message': 'Arquivo enviado com sucesso',
+            'file_id': file_id,
+            'filename': filename,
+            'file_size': file_size,
+            'upload_date': datetime.now().isoformat(),
+            'uploader_username': username,
+            'room_name': room_name
+        })
         return Response(response_xml, mimetype='text/xml')
         
     except Exception as e:
-        print(f"DEBUG: Erro geral na função: {str(e)}")
-        import traceback
-        traceback.print_exc()
+        logger.exception('Erro no upload')
         return create_error_response(f"Erro interno no upload: {str(e)}")
 
-def handle_download_file(element):
+def handle_download_file(params, timer):
     """Processa download de arquivo"""
     try:
-        print("=== DEBUG: Iniciando handle_download_file ===")
-        file_id = get_element_text(element, 'file_id')
-        
-        print(f"DEBUG: Procurando arquivo com ID: {file_id}")
+        file_id = params.get('file_id')
         
         if not file_id:
-            print("DEBUG: Erro - file_id ausente")
             return create_error_response("ID do arquivo é obrigatório")
         
-        # Procurar arquivo
-        for filename in os.listdir(UPLOAD_DIR):
-            if filename.startswith(file_id):
-                file_path = os.path.join(UPLOAD_DIR, filename)
-                print(f"DEBUG: Arquivo encontrado: {file_path}")
-                
-                # Extrair nome original
-                original_filename = filename.split('_', 1)[1] if '_' in filename else filename
-                
-                with open(file_path, 'rb') as f:
-                    file_data = f.read()
-                
-                print(f"DEBUG: Arquivo lido, tamanho: {len(file_data)} bytes")
-                
-                file_data_b64 = base64.b64encode(file_data).decode('utf-8')
-                print(f"DEBUG: Arquivo codificado em base64, tamanho: {len(file_data_b64)} chars")
-                
-                response_body = f"""<download_file_response>
-                    <success>true</success>
-                    <message>Arquivo baixado com sucesso</message>
-                    <file_id>{file_id}</file_id>
-                    <filename>{original_filename}</filename>
-                    <file_size>{len(file_data)}</file_size>
-                    <file_data>{file_data_b64}</file_data>
-                </download_file_response>"""
-                
-                print("DEBUG: Criando resposta de download")
-                response_xml = create_soap_envelope(response_body)
-                return Response(response_xml, mimetype='text/xml')
+        # Procurar arquivo pelos metadados (consulta pela chave primária)
+        with timer.phase('db'):
+            stored = find_stored_file(file_id)
+        file_path = stored_file_path(stored) if stored else None
+        if file_path is None or not os.path.exists(file_path):
+            log_event(logging.DEBUG, 'soap_download_not_found', file_id=file_id)
+            return create_error_response("Arquivo não encontrado")
+        
+        file_id = str(stored.id)
+        original_filename = stored.filename
+        
+        if accepts_mtom(request):
+            return create_mtom_download_response(file_id, original_filename, file_path)
         
-        print("DEBUG: Arquivo não encontrado")
-        return create_error_response("Arquivo não encontrado")
+        # file_data é codificado em base64 enquanto a resposta é enviada
+        writer = XmlWriter()
+        writer.start('download_file_response')
+        writer.fields({
+            'success': 'true',
+            'message': 'Arquivo baixado com sucesso',
+            'file_id': file_id,
+            'filename': original_filename,
+            'file_size': os.path.getsize(file_path)
+        })
+        writer.start('file_data')
+        head = ENVELOPE_HEAD + writer.flush()
+        tail = b'</file_data></download_file_response>' + ENVELOPE_TAIL
+        return Response(stream_base64_envelope(head, file_path, tail), mimetype='text/xml')
         
     except Exception as e:
-        print(f"DEBUG: Erro no download: {str(e)}")
-        import traceback
-        traceback.print_exc()
+        logger.exception('Erro no download')
         return create_error_response(f"Erro no download: {str(e)}")
 
-def handle_list_files(element):
+def handle_list_files(params, timer):
     """Lista arquivos de uma sala ou todos os arquivos"""
     try:
-        print("=== DEBUG: Iniciando handle_list_files ===")
-        room_name = get_element_text(element, 'room_name', '')
-        
-        print(f"DEBUG: Listando arquivos para sala: {room_name if room_name else 'todas'}")
-        
-        files_xml = ""
-        file_count = 0
+        room_name = params.get('room_name', '')
         
         try:
-            for filename in os.listdir(UPLOAD_DIR):
-                if '_' in filename:
-                    file_id, original_name = filename.split('_', 1)
-                    file_path = os.path.join(UPLOAD_DIR, filename)
-                    file_stat = os.stat(file_path)
-                    
-                    # Se room_name foi especificado, buscar no banco para filtrar
-                    # Por simplicidade, vamos retornar todos os arquivos por enquanto
-                    
-                    files_xml += f"""
-                    <file>
-                        <file_id>{file_id}</file_id>
-                        <filename>{original_name}</filename>
-                        <file_size>{file_stat.st_size}</file_size>
-                        <upload_date>{datetime.fromtimestamp(file_stat.st_mtime).isoformat()}</upload_date>
-                        <room_name>{room_name or 'unknown'}</room_name>
-                    </file>"""
-                    file_count += 1
-        except Exception as e:
-            print(f"DEBUG: Erro ao listar diretório: {e}")
-            files_xml = ""
+            limit = parse_page_size(params.get('limit'))
+            before = decode_cursor(params.get('cursor'))
+        except ValueError as e:
+            return create_error_response(f"Parâmetros de paginação inválidos: {e}")
         
-        print(f"DEBUG: Encontrados {file_count} arquivos")
+        # Metadados indexados por (sala, data): sem varrer o diretório
+        files = StoredFile.objects.select_related('room', 'uploader')
+        if room_name:
+            files = files.filter(room__name=room_name)
+        with timer.phase('db'):
+            page, has_more = keyset_page(files, 'created_at', limit, before=before)
+        # Mais recentes primeiro
+        page.reverse()
         
-        response_body = f"""<list_files_response>
-            <success>true</success>
-            <message>Arquivos listados com sucesso</message>
-            <file_count>{file_count}</file_count>
-            <files>
-                {files_xml}
-            </files>
-        </list_files_response>"""
+        next_cursor = None
+        if has_more and page:
+            next_cursor = encode_cursor(page[-1].created_at, page[-1].id)
         
-        print("DEBUG: Criando resposta de listagem")
-        response_xml = create_soap_envelope(response_body)
-        return Response(response_xml, mimetype='text/xml')
+        return Response(render_file_list(page, next_cursor), mimetype='text/xml')
         
     except Exception as e:
-        print(f"DEBUG: Erro geral na listagem: {e}")
-        import traceback
-        traceback.print_exc()
+        logger.exception('Erro ao listar arquivos')
         return create_error_response(f"Erro ao listar arquivos: {str(e)}")
 
-def get_element_text(parent, tag_name, default=None):
-    """Extrai texto de um elemento XML"""
-    for child in parent:
-        local_name = child.tag.split('}')[-1] if '}' in child.tag else child.tag
-        if local_name == tag_name:
-            return child.text
-    return default
+# Operações por nome qualificado; a operação enviada sem namespace é
+# tratada como do namespace do serviço
+SOAP_OPERATIONS = {
+    (SERVICE_NS, 'upload_file'): handle_upload_file,
+    (SERVICE_NS, 'download_file'): handle_download_file,
+    (SERVICE_NS, 'list_files'): handle_list_files,
+}
+
+def render_file_list(files, next_cursor=None):
+    """Gera a resposta de list_files em blocos, em tempo linear no número de arquivos"""
+    yield ENVELOPE_HEAD
+    writer = XmlWriter()
+    writer.start('list_files_response')
+    writer.fields({
+        'success': 'true',
+        'message': 'Arquivos listados com sucesso',
+        'file_count': len(files)
+    })
+    if next_cursor:
+        writer.field('next_cursor', next_cursor)
+    writer.start('files')
+    for stored in files:
+        writer.start('file')
+        writer.fields({
+            'file_id': stored.id,
+            'filename': stored.filename,
+            'file_size': stored.size,
+            'upload_date': stored.created_at.isoformat(),
+            'uploader_username': stored.uploader.username if stored.uploader else 'unknown',
+            'room_name': stored.room.name if stored.room else 'unknown'
+        })
+        writer.end('file')
+        if writer.ready():
+            yield writer.flush()
+    writer.end('files')
+    writer.end('list_files_response')
+    yield writer.flush()
+    yield ENVELOPE_TAIL
+
+def stream_base64_envelope(head, file_path, tail):
+    """Gera o envelope com file_data codificado em base64 bloco a bloco"""
+    yield head
+    with open(file_path, 'rb') as f:
+        while True:
+            # Múltiplo de 3 bytes: os blocos codificados se concatenam sem padding
+            chunk = f.read(DOWNLOAD_CHUNK_SIZE)
+            if not chunk:
+                break
+            yield base64.b64encode(chunk)
+    yield tail
+
+def create_mtom_download_response(file_id, filename, file_path):
+    """Resposta de download em MTOM: o arquivo vai bruto numa parte separada"""
+    attachment_id = f"{file_id}@mensageiro.soap.service"
+    writer = XmlWriter()
+    writer.start('download_file_response')
+    writer.fields({
+        'success': 'true',
+        'message': 'Arquivo baixado com sucesso',
+        'file_id': file_id,
+        'filename': filename,
+        'file_size': os.path.getsize(file_path)
+    })
+    writer.start('file_data')
+    writer.start('xop:Include', **{'xmlns:xop': XOP_NS, 'href': f'cid:{attachment_id}'})
+    writer.end('xop:Include')
+    writer.end('file_data')
+    writer.end('download_file_response')
+    
+    content_type, body = mtom_response(envelope(writer), [(attachment_id, file_path)])
+    return Response(body, content_type=content_type)
 
 def create_error_response(error_message):
     """Cria resposta de erro SOAP"""
-    fault_body = f"""
-    <soap:Fault>
-        <faultcode>Server</faultcode>
-        <faultstring>{error_message}</faultstring>
-    </soap:Fault>"""
-    
-    return Response(create_soap_envelope(fault_body), mimetype='text/xml', status=500)
+    return Response(fault(error_message), mimetype='text/xml', status=500)
 
 if __name__ == '__main__':
+    # Servidor de desenvolvimento; em produção use soap_service/serve.py
     print("🚀 Servidor SOAP iniciando...")
     print("📍 URL: http://localhost:8001")
     print("📋 WSDL: http://localhost:8001?wsdl")
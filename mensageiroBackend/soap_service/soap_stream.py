@@ -0,0 +1,291 @@
+"""
+Leitura incremental de requisições SOAP.
+
+O envelope é lido do stream da requisição em blocos e processado por um
+parser SAX: os parâmetros simples da operação viram um dicionário e o
+conteúdo base64 de file_data é decodificado em blocos direto para um
+arquivo temporário, sem manter o arquivo inteiro em memória.
+
+Requisições MTOM (multipart/related) trazem file_data como
+<xop:Include href="cid:..."/>; a parte binária referenciada é gravada
+em disco sem decodificação.
+"""
+import base64
+import binascii
+import hashlib
+import os
+import time
+import uuid
+import xml.sax
+from xml.sax.handler import ContentHandler, feature_external_ges, feature_namespaces
+
+from soap_service.mtom import XOP_NS, MultipartError, MultipartReader, content_id, is_mtom, parse_content_type
+
+SOAP_ENV_NS = 'http://schemas.xmlsoap.org/soap/envelope/'
+
+# Tamanho dos blocos lidos do stream da requisição
+READ_CHUNK_SIZE = 64 * 1024
+# Limite para campos de texto (username, filename...); file_data não tem limite
+MAX_FIELD_SIZE = 64 * 1024
+# Campos cujo conteúdo base64 é gravado em disco durante o parse
+STREAMED_FIELDS = {'file_data'}
+
+
+class SoapRequestError(ValueError):
+    """Envelope SOAP inválido"""
+
+
+class StreamedFile:
+    """
+    Arquivo recebido (base64 ou anexo MTOM) gravado em disco com tamanho e
+    SHA-256; acumula o tempo gasto em cada etapa (decode, hash, disk_write)
+    """
+
+    def __init__(self, upload_dir):
+        self.path = os.path.join(upload_dir, f'.{uuid.uuid4()}.part')
+        self.size = 0
+        self.digest = hashlib.sha256()
+        self.output = None
+        self.timings = {'decode': 0.0, 'hash': 0.0, 'disk_write': 0.0}
+
+    @property
+    def sha256(self):
+        return self.digest.hexdigest()
+
+    def open(self):
+        self.output = open(self.path, 'wb')
+        return self
+
+    def write(self, data):
+        start = time.perf_counter()
+        self.output.write(data)
+        written = time.perf_counter()
+        self.digest.update(data)
+        self.timings['disk_write'] += written - start
+        self.timings['hash'] += time.perf_counter() - written
+        self.size += len(data)
+
+    def close(self):
+        if self.output is not None:
+            self.output.close()
+            self.output = None
+
+    def discard(self):
+        self.close()
+        if os.path.exists(self.path):
+            os.remove(self.path)
+
+
+class XopInclude:
+    """Referência a um anexo MTOM, resolvida após ler todas as partes"""
+
+    def __init__(self, href):
+        self.content_id = content_id(href)
+
+
+class Base64StreamDecoder:
+    """Decodifica base64 recebido em pedaços arbitrários e grava em um arquivo"""
+
+    def __init__(self, output):
+        self.output = output
+        self.pending = ''
+
+    def write(self, text):
+        # Espaços e quebras de linha são comuns em base64 dentro de XML
+        self.pending += ''.join(text.split())
+        usable = len(self.pending) - len(self.pending) % 4
+        if usable:
+            self._decode(self.pending[:usable])
+            self.pending = self.pending[usable:]
+
+    def close(self):
+        if self.pending:
+            raise binascii.Error('base64 com tamanho inválido')
+
+    def _decode(self, text):
+        if not text.isascii():
+            raise binascii.Error('caracteres inválidos em base64')
+        start = time.perf_counter()
+        data = base64.b64decode(text, validate=True)
+        self.output.timings['decode'] += time.perf_counter() - start
+        self.output.write(data)
+
+
+class SoapRequestHandler(ContentHandler):
+    """Extrai a operação e seus parâmetros do Body do envelope"""
+
+    def __init__(self, upload_dir):
+        super().__init__()
+        self.upload_dir = upload_dir
+        self.operation = None
+        self.params = {}
+        self.files = []
+        self.path = []
+        self.field = None
+        self.text = []
+        self.text_size = 0
+        self.decoder = None
+
+    def startElementNS(self, name, qname, attrs):
+        self.path.append(name)
+        depth = len(self.path)
+
+        if self.operation is None and depth == 3 and self.path[1] == (SOAP_ENV_NS, 'Body'):
+            # Nome qualificado: (namespace ou None, nome local)
+            self.operation = name
+        elif self.operation is not None and depth == 4:
+            self.field = name[1]
+            self.text, self.text_size = [], 0
+        elif depth == 5 and name == (XOP_NS, 'Include') and self.field in STREAMED_FIELDS:
+            self.params[self.field] = XopInclude(attrs.get((None, 'href')))
+
+    def endElementNS(self, name, qname):
+        if len(self.path) == 4 and self.field is not None:
+            if self.decoder is not None:
+                self._close_file()
+            elif self.field not in self.params:
+                self.params[self.field] = ''.join(self.text)
+            self.field = None
+        self.path.pop()
+
+    def characters(self, content):
+        if self.field is None or len(self.path) != 4:
+            return
+        if self.field in STREAMED_FIELDS:
+            # O arquivo só é criado quando chega conteúdo base64 inline
+            if self.decoder is None and content.strip():
+                self._open_file()
+            if self.decoder is not None:
+                self.decoder.write(content)
+            return
+
+        self.text_size += len(content)
+        if self.text_size > MAX_FIELD_SIZE:
+            raise SoapRequestError(f'Campo {self.field} excede {MAX_FIELD_SIZE} caracteres')
+        self.text.append(content)
+
+    def new_file(self):
+        streamed = StreamedFile(self.upload_dir)
+        self.files.append(streamed)
+        return streamed
+
+    def _open_file(self):
+        streamed = self.new_file().open()
+        self.decoder = Base64StreamDecoder(streamed)
+        self.params[self.field] = streamed
+
+    def _close_file(self):
+        try:
+            self.decoder.close()
+        finally:
+            self.decoder.output.close()
+            self.decoder = None
+
+    def abort(self):
+        """Fecha e remove arquivos parciais após um erro"""
+        self.decoder = None
+        for streamed in self.files:
+            streamed.discard()
+
+
+def _read_chunks(stream, chunk_size):
+    while True:
+        chunk = stream.read(chunk_size)
+        if not chunk:
+            return
+        yield chunk
+
+
+def _make_parser(handler):
+    parser = xml.sax.make_parser()
+    parser.setFeature(feature_namespaces, True)
+    parser.setFeature(feature_external_ges, False)
+    parser.setContentHandler(handler)
+    return parser
+
+
+def _parse_xml(chunks, handler):
+    parser = _make_parser(handler)
+    for chunk in chunks:
+        parser.feed(chunk)
+    parser.close()
+
+
+def _parse_mtom(chunks, content_type, handler):
+    """Envelope na parte raiz; as demais partes vão para o disco por Content-ID"""
+    _, params = parse_content_type(content_type)
+    boundary = params.get('boundary')
+    if not boundary:
+        raise SoapRequestError('Content-Type multipart sem boundary')
+    root_id = content_id(params.get('start'))
+
+    attachments = {}
+    root_parsed = False
+    for headers, body in MultipartReader(chunks, boundary).parts():
+        part_id = content_id(headers.get('content-id'))
+        if not root_parsed and (not root_id or part_id == root_id):
+            _parse_xml(body, handler)
+            root_parsed = True
+            continue
+
+        streamed = handler.new_file().open()
+        try:
+            for block in body:
+                streamed.write(block)
+        finally:
+            streamed.close()
+        attachments[part_id] = streamed
+
+    if not root_parsed:
+        raise SoapRequestError('Parte raiz do MTOM não encontrada')
+
+    # Substitui as referências xop:Include pelos anexos
+    for field, value in list(handler.params.items()):
+        if isinstance(value, XopInclude):
+            if value.content_id not in attachments:
+                raise SoapRequestError(f'Anexo {value.content_id} não encontrado')
+            handler.params[field] = attachments.pop(value.content_id)
+
+    # Anexos não referenciados
+    for streamed in attachments.values():
+        streamed.discard()
+
+
+def parse_soap_request(stream, upload_dir, content_type=None, chunk_size=READ_CHUNK_SIZE):
+    """
+    Lê o envelope de `stream` em blocos e retorna (operação, parâmetros),
+    com a operação como (namespace, nome local).
+
+    Aceita text/xml com base64 inline ou MTOM/XOP (multipart/related).
+    Parâmetros em STREAMED_FIELDS são StreamedFile; quem os recebe é
+    responsável por mover ou remover o arquivo. Lança SoapRequestError se
+    o envelope, o multipart ou o base64 forem inválidos.
+    """
+    handler = SoapRequestHandler(upload_dir)
+    chunks = _read_chunks(stream, chunk_size)
+
+    try:
+        if is_mtom(content_type):
+            _parse_mtom(chunks, content_type, handler)
+        else:
+            _parse_xml(chunks, handler)
+    except SoapRequestError:
+        handler.abort()
+        raise
+    except MultipartError as e:
+        handler.abort()
+        raise SoapRequestError(str(e))
+    except xml.sax.SAXParseException as e:
+        handler.abort()
+        raise SoapRequestError(f'Erro ao parsear XML: {e}')
+    except binascii.Error as e:
+        handler.abort()
+        raise SoapRequestError(f'Erro ao decodificar arquivo: {e}')
+    except BaseException:
+        handler.abort()
+        raise
+
+    if handler.operation is None:
+        raise SoapRequestError('Body SOAP não encontrado')
+
+    return handler.operation, handler.params
@@ -0,0 +1,159 @@
+"""
+Logs e métricas de tempo do serviço SOAP.
+
+Os registros são estruturados (evento seguido de chave=valor) e só são
+formatados se forem emitidos. Registros abaixo de WARNING passam por
+amostragem; nível e taxa de amostragem podem ser trocados com o serviço
+no ar pelo arquivo SOAP_LOG_CONTROL_FILE (comando soap_logging), lido
+por todos os workers.
+
+Cada requisição mede o tempo gasto em cada fase (parse, decode, hash,
+disk_write, store, db, publish) e gera um registro 'soap_request'; os
+totais por operação ficam em METRICS (GET /metrics).
+"""
+import json
+import logging
+import os
+import random
+import threading
+import time
+from contextlib import contextmanager
+
+logger = logging.getLogger('soap_service')
+
+
+class SamplingFilter(logging.Filter):
+    """Deixa passar uma fração dos registros abaixo de WARNING"""
+
+    def __init__(self, rate=1.0):
+        super().__init__()
+        self.rate = rate
+
+    def filter(self, record):
+        return record.levelno >= logging.WARNING or self.rate >= 1 or random.random() < self.rate
+
+
+sampler = SamplingFilter()
+logger.addFilter(sampler)
+
+
+def _format_value(value):
+    if isinstance(value, float):
+        value = f'{value:.2f}'
+    value = str(value)
+    return f'"{value}"' if not value or ' ' in value or '"' in value else value
+
+
+class LogFields:
+    """Evento e campos formatados como 'evento chave=valor' só quando emitidos"""
+
+    def __init__(self, event, fields):
+        self.event = event
+        self.fields = fields
+
+    def __str__(self):
+        pairs = ' '.join(f'{name}={_format_value(value)}' for name, value in self.fields.items())
+        return f'{self.event} {pairs}' if pairs else self.event
+
+
+def log_event(level, event, **fields):
+    if logger.isEnabledFor(level):
+        logger.log(level, '%s', LogFields(event, fields))
+
+
+def apply_log_settings(level=None, sample_rate=None):
+    if level is not None:
+        logger.setLevel(level.upper() if isinstance(level, str) else level)
+    if sample_rate is not None:
+        sampler.rate = float(sample_rate)
+
+
+class LogControl:
+    """
+    Nível e amostragem lidos de um arquivo JSON ({"level": "DEBUG",
+    "sample_rate": 0.1}), conferido no máximo a cada `interval` segundos.
+    """
+
+    def __init__(self, path, interval=1.0):
+        self.path = path
+        self.interval = interval
+        self.checked_at = 0.0
+        self.mtime = None
+        self.lock = threading.Lock()
+
+    def refresh(self):
+        now = time.monotonic()
+        if now - self.checked_at < self.interval or not self.lock.acquire(blocking=False):
+            return
+        try:
+            self.checked_at = now
+            try:
+                mtime = os.stat(self.path).st_mtime_ns
+            except FileNotFoundError:
+                return
+            if mtime == self.mtime:
+                return
+            self.mtime = mtime
+            with open(self.path) as f:
+                config = json.load(f)
+            apply_log_settings(config.get('level'), config.get('sample_rate'))
+        except (OSError, ValueError) as e:
+            logger.warning('Configuração de log inválida em %s: %s', self.path, e)
+        finally:
+            self.lock.release()
+
+
+class OperationMetrics:
+    """Totais por operação e fase no processo atual"""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.operations = {}
+
+    def record(self, operation, status, total, phases):
+        with self.lock:
+            stats = self.operations.setdefault(operation, {'count': 0, 'faults': 0, 'phases': {}})
+            stats['count'] += 1
+            stats['faults'] += status != 'ok'
+            for name, seconds in {'total': total, **phases}.items():
+                phase = stats['phases'].setdefault(name, {'total_ms': 0.0, 'max_ms': 0.0})
+                phase['total_ms'] += seconds * 1000
+                phase['max_ms'] = max(phase['max_ms'], seconds * 1000)
+
+    def snapshot(self):
+        with self.lock:
+            return json.loads(json.dumps(self.operations))
+
+
+METRICS = OperationMetrics()
+
+
+class OperationTimer:
+    """Tempo de cada fase de uma requisição SOAP"""
+
+    def __init__(self, operation='unknown'):
+        self.operation = operation
+        self.started = time.perf_counter()
+        self.phases = {}
+
+    def add(self, name, seconds):
+        self.phases[name] = self.phases.get(name, 0.0) + seconds
+
+    @contextmanager
+    def phase(self, name):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.add(name, time.perf_counter() - start)
+
+    def finish(self, status, **fields):
+        """Registra a requisição; o tempo vai até o início da resposta"""
+        total = time.perf_counter() - self.started
+        METRICS.record(self.operation, status, total, self.phases)
+        log_event(
+            logging.INFO, 'soap_request',
+            operation=self.operation, status=status, total_ms=total * 1000,
+            **{f'{name}_ms': seconds * 1000 for name, seconds in self.phases.items()},
+            **fields
+        )
@@ -0,0 +1,11 @@
+"""
+Aplicação WSGI do serviço SOAP.
+
+Importar este módulo configura o Django (django.setup() em server.py)
+uma vez por processo; use com qualquer servidor WSGI, por exemplo:
+
+    gunicorn soap_service.wsgi:application --workers 4 --threads 8
+"""
+from soap_service.server import app
+
+application = app
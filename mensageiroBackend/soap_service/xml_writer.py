@@ -0,0 +1,79 @@
+"""
+Geração das respostas SOAP em blocos de bytes.
+
+Todo texto passa por escape de XML. Os elementos são acumulados numa
+lista e entregues em blocos de ~FLUSH_SIZE bytes, de modo que respostas
+grandes (listagens, downloads) são geradas em tempo linear e enviadas
+enquanto são montadas.
+"""
+from xml.sax.saxutils import escape, quoteattr
+
+SOAP_ENV_NS = 'http://schemas.xmlsoap.org/soap/envelope/'
+SERVICE_NS = 'http://mensageiro.soap.service'
+
+ENVELOPE_HEAD = (
+    '<?xml version="1.0" encoding="UTF-8"?>'
+    f'<soap:Envelope xmlns:soap="{SOAP_ENV_NS}" xmlns:tns="{SERVICE_NS}">'
+    '<soap:Body>'
+).encode()
+ENVELOPE_TAIL = b'</soap:Body></soap:Envelope>'
+
+# Tamanho aproximado dos blocos entregues ao servidor WSGI
+FLUSH_SIZE = 64 * 1024
+
+
+class XmlWriter:
+    """Acumula XML e devolve blocos de bytes quando passam de FLUSH_SIZE"""
+
+    def __init__(self, flush_size=FLUSH_SIZE):
+        self.flush_size = flush_size
+        self.parts = []
+        self.size = 0
+
+    def raw(self, xml):
+        self.parts.append(xml)
+        self.size += len(xml)
+
+    def start(self, name, **attrs):
+        attributes = ''.join(f' {key}={quoteattr(str(value))}' for key, value in attrs.items())
+        self.raw(f'<{name}{attributes}>')
+
+    def end(self, name):
+        self.raw(f'</{name}>')
+
+    def field(self, name, value):
+        self.raw(f'<{name}>{escape(str(value))}</{name}>')
+
+    def fields(self, values):
+        for name, value in values.items():
+            self.field(name, value)
+
+    def ready(self):
+        return self.size >= self.flush_size
+
+    def flush(self):
+        chunk = ''.join(self.parts).encode('utf-8')
+        self.parts, self.size = [], 0
+        return chunk
+
+
+def envelope(body):
+    """Envelope completo com o conteúdo de um XmlWriter"""
+    return ENVELOPE_HEAD + body.flush() + ENVELOPE_TAIL
+
+
+def operation_response(name, values):
+    """Resposta <name> com campos simples"""
+    writer = XmlWriter()
+    writer.start(name)
+    writer.fields(values)
+    writer.end(name)
+    return envelope(writer)
+
+
+def fault(message, code='Server'):
+    writer = XmlWriter()
+    writer.start('soap:Fault')
+    writer.fields({'faultcode': code, 'faultstring': message})
+    writer.end('soap:Fault')
+    return envelope(writer)
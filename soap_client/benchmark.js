@@ -0,0 +1,75 @@
+const MensageiroSOAPClient = require("./client")
+const crypto = require("crypto")
+const fs = require("fs")
+
+// Uso: node benchmark.js [tamanho em MB] [repetições]
+const SIZE_MB = Number(process.argv[2] || 8)
+const RUNS = Number(process.argv[3] || 5)
+
+// Executa a operação `runs` vezes sem os logs do cliente e retorna a linha de resultado
+async function measure(label, runs, bytes, operation) {
+  const log = console.log
+  console.log = () => {}
+  const start = process.hrtime.bigint()
+  try {
+    for (let i = 0; i < runs; i++) {
+      const ok = await operation()
+      if (!ok) throw new Error(`${label} falhou`)
+    }
+  } finally {
+    console.log = log
+  }
+  const seconds = Number(process.hrtime.bigint() - start) / 1e9
+  const throughput = (bytes * runs) / (1024 * 1024) / seconds
+  return `   ${label.padEnd(10)} ${((seconds / runs) * 1000).toFixed(1).padStart(8)} ms/op  ${throughput.toFixed(1).padStart(7)} MB/s`
+}
+
+async function runBenchmark() {
+  console.log("⏱️  === BENCHMARK DO CLIENTE SOAP: base64 inline x MTOM/XOP ===\n")
+
+  const client = new MensageiroSOAPClient()
+  const connected = await client.connect()
+  if (!connected) {
+    console.log("❌ Falha na conexão - encerrando benchmark")
+    client.rl.close()
+    return
+  }
+  const mtomSupported = client.useMtom
+
+  const fileName = "benchmark_file.bin"
+  const downloadPath = `downloaded_${fileName}`
+  const bytes = SIZE_MB * 1024 * 1024
+  fs.writeFileSync(fileName, crypto.randomBytes(bytes))
+  console.log(`\n📝 Arquivo de ${SIZE_MB} MB, ${RUNS} repetições por operação\n`)
+
+  const modes = mtomSupported ? [false, true] : [false]
+
+  for (const useMtom of modes) {
+    console.log(`📦 ${useMtom ? "MTOM/XOP" : "base64 inline"}`)
+    client.useMtom = useMtom
+    let fileId = null
+
+    console.log(
+      await measure("upload", RUNS, bytes, async () => {
+        const info = await client.uploadFile("benchmark", "benchmark", fileName)
+        fileId = (info && info.file_id) || fileId
+        // uploadFile retorna null apenas em falha
+        return info !== null
+      }),
+    )
+    if (fileId) {
+      console.log(await measure("download", RUNS, bytes, () => client.downloadFile(fileId, downloadPath)))
+    }
+    console.log("")
+  }
+
+  if (!mtomSupported) {
+    console.log("⚠️  Servidor não anuncia MTOM (Accept-Post); apenas base64 foi medido")
+  }
+
+  fs.unlinkSync(fileName)
+  if (fs.existsSync(downloadPath)) fs.unlinkSync(downloadPath)
+  client.rl.close()
+}
+
+runBenchmark().catch(console.error)
@@ -1,13 +1,18 @@
 const soap = require("soap")
 const fs = require("fs")
+const http = require("http")
 const path = require("path")
 const readline = require("readline")
 
 const SOAP_URL = "http://localhost:8001?wsdl"
+const SOAP_ENDPOINT = "http://localhost:8001/soap"
+const XOP_NS = "http://www.w3.org/2004/08/xop/include"
 
 class MensageiroSOAPClient {
   constructor() {
     this.client = null
+    // null = ainda não negociado; true = MTOM/XOP; false = base64 inline
+    this.useMtom = null
     this.rl = readline.createInterface({
       input: process.stdin,
       output: process.stdout,
@@ -17,8 +22,11 @@ class MensageiroSOAPClient {
   async connect() {
     try {
       console.log("🔗 Conectando ao serviço SOAP...")
-      this.client = await soap.createClientAsync(SOAP_URL)
+      // parseReponseAttachments: lê respostas multipart/related (MTOM)
+      this.client = await soap.createClientAsync(SOAP_URL, { parseReponseAttachments: true })
+      this.useMtom = await this.supportsMtom()
       console.log("✅ Conectado com sucesso!")
+      console.log(`📦 Transferência de arquivos: ${this.useMtom ? "MTOM/XOP (binário)" : "base64 inline"}`)
       console.log("📋 Serviços disponíveis:", Object.keys(this.client.describe()))
       return true
     } catch (error) {
@@ -28,6 +36,18 @@ class MensageiroSOAPClient {
     }
   }
 
+  // Servidores com MTOM anunciam multipart/related no Accept-Post do OPTIONS /soap
+  supportsMtom() {
+    return new Promise((resolve) => {
+      const request = http.request(SOAP_ENDPOINT, { method: "OPTIONS" }, (response) => {
+        response.resume()
+        resolve((response.headers["accept-post"] || "").includes("multipart/related"))
+      })
+      request.on("error", () => resolve(false))
+      request.end()
+    })
+  }
+
   async uploadFile(username, roomName, filePath, description = "") {
     try {
       if (!fs.existsSync(filePath)) {
@@ -36,7 +56,6 @@ class MensageiroSOAPClient {
 
       const fileData = fs.readFileSync(filePath)
       const filename = path.basename(filePath)
-      const fileDataBase64 = fileData.toString("base64")
 
       console.log(`📤 Enviando arquivo: ${filename}`)
       console.log(`👤 Usuário: ${username}`)
@@ -44,13 +63,30 @@ class MensageiroSOAPClient {
       console.log(`📝 Descrição: ${description || "Sem descrição"}`)
       console.log(`📊 Tamanho: ${fileData.length} bytes`)
 
-      const result = await this.client.upload_fileAsync({
+      let fileField
+      let options = {}
+
+      if (this.useMtom) {
+        // MTOM: o arquivo vai bruto numa parte multipart, referenciado por xop:Include
+        const contentId = `file_data.${Date.now()}@mensageiro.soap.client`
+        fileField = { $xml: `<xop:Include xmlns:xop="${XOP_NS}" href="cid:${encodeURIComponent(contentId)}"/>` }
+        options = {
+          forceMTOM: true,
+          attachments: [{ mimetype: "application/octet-stream", contentId, name: filename, body: fileData }],
+        }
+      } else {
+        fileField = fileData.toString("base64")
+      }
+
+      const args = {
         username: username,
         room_name: roomName,
         filename: filename,
-        file_data: fileDataBase64,
+        file_data: fileField,
         description: description,
-      })
+      }
+
+      const result = await this.client.upload_fileAsync(args, options)
 
       if (result[0] && result[0].response && result[0].response.success) {
         console.log("✅ Upload realizado com sucesso!")
@@ -80,12 +116,12 @@ class MensageiroSOAPClient {
     try {
       console.log(`📥 Baixando arquivo com ID: ${fileId}`)
 
-      const result = await this.client.download_fileAsync({
-        file_id: fileId,
-      })
+      // Requisição MTOM recebe resposta MTOM, com o arquivo bruto como anexo
+      const result = await this.client.download_fileAsync({ file_id: fileId }, this.useMtom ? { forceMTOM: true } : {})
+      const attachment = this.useMtom ? this.responseAttachment() : null
 
-      if (result[0] && result[0].file_data) {
-        const fileData = Buffer.from(result[0].file_data, "base64")
+      if (attachment || (result[0] && result[0].file_data)) {
+        const fileData = attachment || Buffer.from(result[0].file_data, "base64")
         fs.writeFileSync(outputPath, fileData)
         console.log(`✅ Arquivo baixado com sucesso: ${outputPath}`)
         console.log(`📊 Tamanho: ${fileData.length} bytes`)
@@ -100,6 +136,17 @@ class MensageiroSOAPClient {
     }
   }
 
+  // Anexo binário da última resposta MTOM (a parte que não é o envelope)
+  responseAttachment() {
+    const parts = (this.client.lastResponseAttachments && this.client.lastResponseAttachments.parts) || []
+    const attachment = parts.find((part) => {
+      const headers = part.headers || {}
+      const contentType = headers["content-type"] || headers["Content-Type"] || ""
+      return !contentType.includes("application/xop+xml")
+    })
+    return attachment ? attachment.body : null
+  }
+
   async listFiles(roomName) {
     try {
       console.log(`📋 Listando arquivos da sala: ${roomName}`)
@@ -178,6 +225,7 @@ class MensageiroSOAPClient {
         console.log("   • Protocolo: SOAP 1.1")
         console.log("   • Transporte: HTTP")
         console.log("   • Formato: XML")
+        console.log(`   • Arquivos: ${this.useMtom ? "MTOM/XOP (multipart/related)" : "base64 inline"}`)
 
         console.log("\n🔄 Como o cliente utiliza o WSDL:")
         console.log("   1. Faz requisição GET para obter o WSDL")